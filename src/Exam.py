@@ -3,6 +3,20 @@
 written May-July 2020 by Kaili Vesik: kvesik@gmail.com
 """
 
+import sys
+
+
+# one shared frozenset per distinct combination of question types (most questions have none, or the same few)
+_qtypesets = {}
+
+
+# Returns the shared frozenset containing the given question types
+# Parameters:   questiontypes (iterable of strings): question type tags, eg ["UR", "signlanguage"]
+def internqtypes(questiontypes):
+    qtypes = frozenset(sys.intern(qtype) for qtype in questiontypes)
+    return _qtypesets.setdefault(qtypes, qtypes)
+
+
 # no longer used
 # # this class represents one exam, consisting of a set of questions assigned to
 # # a particular student on a particular day at a particular time
@@ -21,6 +35,7 @@ written May-July 2020 by Kaili Vesik: kvesik@gmail.com
 
 
 # this class represents one question, with characteristics as drawn from the questions spreadsheet
+# questions are compared and hashed by uniqueid only, so they can be used in sets and as dictionary keys
 class Question:
 
     # class (static) variables
@@ -29,14 +44,20 @@ class Question:
     HARD = "hard"
     VHARD = "very hard"
 
-    def __init__(self, uniqueid="", topic="", difficulty="", source="", datecompleted=None, questiontypes=[], instructions="",data1 = "", data2 = "", image1 = "", image1caption = "", image2 = "", image2caption = "", imagearrangement = "vertical", notes = "", omit = False, instrnotes = ""):
+    # no per-instance __dict__; saves a lot of memory across a large question bank or exam history
+    __slots__ = ("uniqueid", "topic", "difficulty", "source", "datecompleted", "questiontypes", "instructions",
+                 "data1", "data2", "image1", "image1caption", "image2", "image2caption", "imagearrangement",
+                 "notes", "omit", "instrnotes")
+
+    def __init__(self, uniqueid="", topic="", difficulty="", source="", datecompleted=None, questiontypes=(), instructions="",data1 = "", data2 = "", image1 = "", image1caption = "", image2 = "", image2caption = "", imagearrangement = "vertical", notes = "", omit = False, instrnotes = ""):
 
         self.uniqueid = uniqueid
-        self.topic = topic
-        self.difficulty = difficulty
-        self.source = source
+        # categorical fields are repeated across many questions, so share one copy of each string
+        self.topic = sys.intern(topic)
+        self.difficulty = sys.intern(difficulty)
+        self.source = sys.intern(source)
         self.datecompleted = datecompleted # date object
-        self.questiontypes = questiontypes
+        self.questiontypes = internqtypes(questiontypes)
         self.instructions = instructions
         self.data1 = data1
         self.data2 = data2
@@ -44,11 +65,35 @@ class Question:
         self.image1caption = image1caption
         self.image2 = image2
         self.image2caption = image2caption
-        self.imagearrangement = imagearrangement
+        self.imagearrangement = sys.intern(imagearrangement)
         self.notes = notes
         self.omit = omit
         self.instrnotes = instrnotes
 
+    def __eq__(self, other):
+        if not isinstance(other, Question):
+            return NotImplemented
+        return self.uniqueid == other.uniqueid
+
+    def __hash__(self):
+        return hash(self.uniqueid)
+
+    def __getstate__(self):
+        return {attr: getattr(self, attr) for attr in Question.__slots__}
+
+    # also accepts the __dict__ of Questions pickled before this class had __slots__
+    #   (eg in older existing exams files), re-interning their categorical fields on the way in
+    def __setstate__(self, state):
+        if isinstance(state, tuple):  # (__dict__, slots) pair, as pickled by default for slotted classes
+            state = {**(state[0] or {}), **(state[1] or {})}
+        defaults = Question()
+        for attr in Question.__slots__:
+            setattr(self, attr, state.get(attr, getattr(defaults, attr)))
+        self.topic = sys.intern(self.topic)
+        self.difficulty = sys.intern(self.difficulty)
+        self.source = sys.intern(self.source)
+        self.questiontypes = internqtypes(self.questiontypes)
+        self.imagearrangement = sys.intern(self.imagearrangement)
 
     def print(self):
         print(self.uniqueid + " - " + self.source + " - " + self.instructions[0:30] + " ...")
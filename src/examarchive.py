@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import io
+import json
+import shutil
+import hashlib
+import tarfile
+import zipfile
+import tempfile
+from datetime import datetime
+
+
+# kinds of archive that generated files can be written to
+ARCHIVE_ZIP = "zip"
+ARCHIVE_TAR = "tar"
+# name of the index of everything else in an archive (always the last member)
+MANIFESTNAME = "manifest.json"
+# a member being written is kept in memory until it gets this big, and then in a temporary file
+SPOOLBYTES = 1024 * 1024
+# how much of a member to copy into the archive at a time
+COPYBYTES = 1024 * 1024
+# members at least this big need zip64 extensions in a zip archive
+ZIP64BYTES = 2 ** 31 - 1
+
+
+# Returns the kind of archive (see ARCHIVE_* constants) that the given path names, going by its extension
+# Parameters:   path (string): path to the archive
+def getarchivekind(path):
+    if path.endswith("." + ARCHIVE_TAR):
+        return ARCHIVE_TAR
+    return ARCHIVE_ZIP
+
+
+# this class writes generated files into one zip or tar archive (rather than each to its own file in a folder),
+# along with a manifest listing each one's name, size, and sha256 hash
+class ExamArchive:
+
+    # Parameters:   path (string): the archive file to create (its extension determines the kind of archive)
+    #               rootdir (string): the folder that member names are relative to
+    #                   (default None: the folder the archive is in)
+    def __init__(self, path, rootdir=None):
+        self.path = path
+        self.kind = getarchivekind(path)
+        self.rootdir = rootdir if rootdir is not None else os.path.dirname(os.path.abspath(path))
+        self.manifest = []  # one dictionary per member, in the order written
+        if self.kind == ARCHIVE_TAR:
+            self.archive = tarfile.open(path, "w")
+        else:
+            self.archive = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exctype, excvalue, traceback):
+        self.close()
+
+    # Returns the name in the archive for the file at the given path
+    # Parameters:   path (string): where the file would have been written if not for the archive
+    def getmembername(self, path):
+        return os.path.relpath(os.path.abspath(path), self.rootdir).replace(os.sep, "/")
+
+    # Returns a MemberWriter to write the file at the given path into the archive with; the file is added to the
+    #   archive when the MemberWriter is closed
+    # Several members can be written at once this way (eg a day's exams, its instructor copy and its tsv), which a
+    #   zip archive can't take directly, and a tar archive needs to know how big each member is before it's added,
+    #   so each one is kept in a temporary file until it's complete (in memory only while it's small)
+    # Parameters:   path (string): where the file would have been written if not for the archive (see getmembername)
+    def openmember(self, path):
+        return MemberWriter(self.getmembername(path), tempfile.SpooledTemporaryFile(max_size=SPOOLBYTES),
+                            self.addwrittenmember)
+
+    # Adds a member that's been written with a MemberWriter from openmember to the archive
+    # Parameters:   writer (MemberWriter): the closed writer
+    def addwrittenmember(self, writer):
+        writer.spool.seek(0)
+        self.addmember(writer.name, writer.spool, writer.numbytes, writer.sha256.hexdigest())
+        writer.spool.close()
+
+    # Adds a file to the archive from a file on disk (eg one written by a MemberCollector), and deletes the file
+    # Parameters:   name (string): the member's name in the archive
+    #               filepath (string): path to the file holding the member's contents
+    #               numbytes (integer): size of the file
+    #               sha256 (string): hex sha256 hash of the file's contents
+    def addmemberfromfile(self, name, filepath, numbytes, sha256):
+        with open(filepath, "rb") as memberf:
+            self.addmember(name, memberf, numbytes, sha256)
+        os.remove(filepath)
+
+    # Adds a file with the given name and contents to the archive
+    # Parameters:   name (string): the member's name in the archive
+    #               data (bytes): the contents of the file
+    def writenamedmember(self, name, data):
+        self.addmember(name, io.BytesIO(data), len(data), hashlib.sha256(data).hexdigest())
+
+    # Adds a file to the archive, copying it in a piece at a time from a file object, and lists it in the manifest
+    # Parameters:   name (string): the member's name in the archive
+    #               memberf (binary file object): the member's contents, from the current position on
+    #               numbytes (integer): how many bytes there are to copy
+    #               sha256 (string): hex sha256 hash of the contents
+    def addmember(self, name, memberf, numbytes, sha256):
+        if self.kind == ARCHIVE_TAR:
+            info = tarfile.TarInfo(name)
+            info.size = numbytes
+            info.mtime = datetime.now().timestamp()
+            self.archive.addfile(info, memberf)
+        else:
+            with self.archive.open(name, "w", force_zip64=(numbytes >= ZIP64BYTES)) as archivef:
+                shutil.copyfileobj(memberf, archivef, COPYBYTES)
+        self.manifest.append({"name": name, "bytes": numbytes, "sha256": sha256})
+
+    # Adds the manifest (if anything was written) and closes the archive
+    def close(self):
+        if self.archive is None:
+            return
+        manifest = {"created": datetime.now().isoformat(timespec="seconds"), "files": self.manifest}
+        manifestdata = json.dumps(manifest, indent=2).encode("utf-8")
+        if self.kind == ARCHIVE_TAR:
+            info = tarfile.TarInfo(MANIFESTNAME)
+            info.size = len(manifestdata)
+            info.mtime = datetime.now().timestamp()
+            self.archive.addfile(info, io.BytesIO(manifestdata))
+        else:
+            self.archive.writestr(MANIFESTNAME, manifestdata)
+        self.archive.close()
+        self.archive = None
+
+
+# this class is a binary file object for one member of an archive: what's written to it is kept in spool (and hashed
+# as it goes) until it's closed, when it's handed over to be added to the archive (see ExamArchive.openmember)
+class MemberWriter:
+
+    # Parameters:   name (string): the member's name in the archive
+    #               spool (binary file object): where to keep what's written until it's closed
+    #               onclose (function): called with this MemberWriter once it's closed
+    def __init__(self, name, spool, onclose):
+        self.name = name
+        self.spool = spool
+        self.onclose = onclose
+        self.sha256 = hashlib.sha256()
+        self.numbytes = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exctype, excvalue, traceback):
+        self.close()
+
+    # Returns the number of bytes written
+    # Parameters:   data (bytes-like object): what to add to the member
+    def write(self, data):
+        self.spool.write(data)
+        self.sha256.update(data)
+        self.numbytes += len(data)
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.onclose(self)
+
+
+# this class collects files that are headed for an ExamArchive, eg in a worker process that can't write to the archive
+# itself: each one is written to a file of its own in spooldir, and the collected members are then added to the
+# archive with addmemberfromfile (so only their names, not their contents, need to be passed back)
+class MemberCollector:
+
+    # Parameters:   rootdir (string): the folder that member names are relative to (see ExamArchive)
+    #               spooldir (string): the folder to write the files in until they're added to the archive
+    def __init__(self, rootdir, spooldir):
+        self.rootdir = rootdir
+        self.spooldir = spooldir
+        self.members = []  # (name, path to file, number of bytes, sha256) for each file, in the order closed
+
+    # see ExamArchive.openmember
+    def openmember(self, path):
+        name = os.path.relpath(os.path.abspath(path), self.rootdir).replace(os.sep, "/")
+        return MemberWriter(name, tempfile.NamedTemporaryFile(dir=self.spooldir, delete=False), self.collectmember)
+
+    # Records a member that's been written with a MemberWriter from openmember
+    # Parameters:   writer (MemberWriter): the closed writer
+    def collectmember(self, writer):
+        writer.spool.close()
+        self.members.append((writer.name, writer.spool.name, writer.numbytes, writer.sha256.hexdigest()))
+
+
+# Returns the manifest of the given archive (see ExamArchive.close)
+# Parameters:   path (string): path to the archive
+def readmanifest(path):
+    return json.loads(readmembers(path, [MANIFESTNAME])[0][1].decode("utf-8"))
+
+
+# Returns a list of (name, bytes) for the given members of the given archive, in the order given
+# Parameters:   path (string): path to the archive
+#               names (list of strings): names of the members to read
+def readmembers(path, names):
+    members = []
+    if getarchivekind(path) == ARCHIVE_TAR:
+        with tarfile.open(path, "r") as archive:
+            for name in names:
+                members.append((name, archive.extractfile(name).read()))
+    else:
+        with zipfile.ZipFile(path, "r") as archive:
+            for name in names:
+                members.append((name, archive.read(name)))
+    return members
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import io
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+import contextlib
+from datetime import date, datetime, timedelta
+import examio
+import examselect
+import generateexams
+from examio import WILD, PLANNER_JOINT
+
+
+# sizes of synthetic data to benchmark with: name --> (number of questions, number of students)
+PRESETS = {
+    "small": (2000, 200),
+    "medium": (20000, 2000),
+    "large": (100000, 20000),
+}
+DEFAULTPRESET = "small"
+# how many times to run each stage before timing it, and how many times to time it
+DEFAULTWARMUP = 1
+DEFAULTREPEATS = 3
+# how many questions to pick in the selectquestion stage
+SELECTIONS = 20000
+
+# what the synthetic data looks like
+NUMTOPICS = 8
+DIFFICULTIES = [("easy", 0.35), ("medium", 0.35), ("hard", 0.2), ("very hard", 0.1)]
+QUESTIONTYPES = ["UR", "signlanguage", "tone", "morphology", "fieldwork", "IPA"]
+QUESTIONSPERSOURCE = 4
+EXAMDAYS = 10
+SLOTSPERDAY = 24
+FIRSTEXAMDAY = date(2030, 4, 1)  # a Monday
+GROUPEDSHARE = 0.4  # share of students in a group
+PRIORSHARE = 0.7  # share of students with a prior exam
+# exam format (as in a config file)
+TOPICS = ["Topic1", "Topic2", "Topic3", "Topic4", "Topic5", WILD]
+DIFFS = ["easy", "medium", "medium", "hard", "easy", "medium"]
+WILDTOPICS = ["Topic2", "Topic4", "Topic6"]
+EXAMTYPE = "final"
+PRIOREXAMTYPE = "midterm"
+BANKCOLUMNS = ["UniqueID", "Topic", "Difficulty", "Source", "DateCompleted", "QuestionType(s)", "Instructions_latex",
+               "Data1_latex", "Data2_latex", "Image1", "Image1Caption", "Image2", "Image2Caption", "ImageArrangement",
+               "Notes", "Omit?", "Instructor_comments"]
+
+# every stage, in the order they're run
+STAGES = ["parsebank", "loadbankcached", "readsignups", "sessionsetup", "selectquestion", "collectexams",
+          "planjoint", "generatelatex", "recordhistory", "readhistory", "stats"]
+
+
+# Writes a synthetic question bank .tsv with the given number of questions
+# Parameters:   path (string): the file to write
+#               numquestions (integer): how many questions to put in it
+#               rng (random.Random): source of randomness
+def writesyntheticbank(path, numquestions, rng):
+    diffnames = [d for d, share in DIFFICULTIES]
+    diffweights = [share for d, share in DIFFICULTIES]
+    with io.open(path, "w", encoding="utf-8", newline="") as bfile:
+        writer = csv.writer(bfile, delimiter="\t", lineterminator="\n")
+        writer.writerow(BANKCOLUMNS)
+        for i in range(numquestions):
+            topic = "Topic" + str(rng.randrange(NUMTOPICS) + 1)
+            # questions from the same handout share a source (and a topic, and a date)
+            sourcenum = i // QUESTIONSPERSOURCE
+            completed = date(2029, 9, 1) + timedelta(days=(sourcenum * 7) % 200)
+            writer.writerow([
+                "QU" + str(1600000000000 + i), topic, rng.choices(diffnames, diffweights)[0],
+                "Handout " + str(sourcenum) + " (" + topic + ")",
+                completed.isoformat() if rng.random() > 0.03 else "",
+                ",".join(rng.sample(QUESTIONTYPES, rng.choice([0, 0, 1, 1, 2]))),
+                "Answer the questions below about dataset " + str(i) + ".",
+                "\\textipa{" + "".join(rng.choices("aeioubdgptkmnsz", k=12)) + "}" if rng.random() < 0.5 else "",
+                "", "", "", "", "", "vertical" if rng.random() < 0.5 else "", "", "x" if rng.random() < 0.02 else "",
+                "answer key for question " + str(i),
+            ])
+
+
+# Writes a synthetic signups .tsv for the given students, spread over EXAMDAYS weekdays; returns the last exam date
+# Parameters:   path (string): the file to write
+#               sids (list of strings): the students signing up
+#               rng (random.Random): source of randomness
+def writesyntheticsignups(path, sids, rng):
+    days = []
+    day = FIRSTEXAMDAY
+    while len(days) < EXAMDAYS:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    order = list(sids)
+    rng.shuffle(order)
+    with io.open(path, "w", encoding="utf-8", newline="") as sfile:
+        writer = csv.writer(sfile, delimiter="\t", lineterminator="\n")
+        writer.writerow(["Orig_order", "Day", "Time", "SID"])
+        for i, sid in enumerate(order):
+            day = days[i * EXAMDAYS // len(order)]
+            slot = i % SLOTSPERDAY
+            writer.writerow([i + 1, day.isoformat() + " " + day.strftime("%A"),
+                             str(9 + slot // 3) + ":" + str((slot % 3) * 20).zfill(2), sid])
+    return days[-1]
+
+
+# Returns a list of groups (each a list of 2 to 4 student ids) covering about GROUPEDSHARE of the given students
+# Parameters:   sids (list of strings): the students
+#               rng (random.Random): source of randomness
+def makesyntheticgroups(sids, rng):
+    grouped = rng.sample(sids, int(len(sids) * GROUPEDSHARE))
+    groups = []
+    while len(grouped) > 1:
+        size = min(rng.choice([2, 3, 4]), len(grouped))
+        groups.append(grouped[:size])
+        grouped = grouped[size:]
+    return groups
+
+
+# Returns a synthetic history of earlier exams (dictionary of studentID --> examtype --> [list of Questions]) for
+#   about PRIORSHARE of the given students, each with one question for every slot of the exam format
+# Parameters:   sids (list of strings): the students
+#               allquestions (dictionary of topic --> difficulty --> [list of Questions]): the question bank
+#               rng (random.Random): source of randomness
+def makesyntheticexams(sids, allquestions, rng):
+    flat = [q for topic in sorted(allquestions.keys()) for diff in sorted(allquestions[topic].keys())
+            for q in allquestions[topic][diff]]
+    return {sid: {PRIOREXAMTYPE: rng.sample(flat, len(TOPICS))} for sid in sids if rng.random() < PRIORSHARE}
+
+
+# this class holds the synthetic data (and the files it's kept in) that every stage is run on
+class BenchData:
+
+    # Parameters:   numquestions (integer): how many questions in the bank
+    #               numstudents (integer): how many students sign up
+    #               seed (string): seed for generating the data (and the exams)
+    def __init__(self, numquestions, numstudents, seed):
+        self.numquestions = numquestions
+        self.numstudents = numstudents
+        self.seed = seed
+        self.dir = tempfile.mkdtemp(prefix="exambench_")
+        rng = random.Random(seed)
+        self.sids = [str(i).zfill(6) for i in range(numstudents)]
+        self.bankpath = os.path.join(self.dir, "bank.tsv")
+        writesyntheticbank(self.bankpath, numquestions, rng)
+        self.signupspath = os.path.join(self.dir, "signups.tsv")
+        self.lastday = writesyntheticsignups(self.signupspath, self.sids, rng)
+        self.groups = makesyntheticgroups(self.sids, rng)
+        with quiet():
+            self.allquestions = examio.readquestionsfromfile(self.bankpath)
+            self.signups = examio.readsignupsfromfile(self.signupspath, True, EXAMTYPE, None, self.lastday)
+        self.priorexams = makesyntheticexams(self.sids, self.allquestions, rng)
+        self.numruns = 0
+
+    # Returns a path inside this data's folder that hasn't been used yet, for a stage's output
+    # Parameters:   name (string): what to call it
+    def newpath(self, name):
+        self.numruns += 1
+        return os.path.join(self.dir, name + str(self.numruns))
+
+    # Returns a new ExamSession for this data, with its own copy of the prior exams
+    # Parameters:   planner (string): see ExamSession
+    def newsession(self, planner=generateexams.PLANNER_GREEDY):
+        existingexams = {sid: dict(exams) for sid, exams in self.priorexams.items()}
+        return generateexams.ExamSession(
+            "BENCH 100", EXAMTYPE, True, self.allquestions, self.signups, self.groups, existingexams,
+            min(self.signups.keys()), False, generateexams.ORDER_SPECIFIED, TOPICS, DIFFS, [], WILDTOPICS,
+            self.seed, planner)
+
+    # Deletes this data's folder
+    def cleanup(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+# Returns a context manager that discards anything printed inside it (the pipeline is chatty, and printing to a
+#   terminal would be timed along with it)
+def quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+# Each of these returns a function that runs one stage on the given BenchData; anything they do before returning it
+#   (ie setting up) isn't timed
+
+def stage_parsebank(data):
+    return lambda: examio.parsequestionsfile(data.bankpath)
+
+
+def stage_loadbankcached(data):
+    examio.readquestionsfromfile(data.bankpath)  # makes sure the cache is there
+    return lambda: examio.readquestionsfromfile(data.bankpath)
+
+
+def stage_readsignups(data):
+    return lambda: examio.readsignupsfromfile(data.signupspath, True, EXAMTYPE, None, data.lastday)
+
+
+def stage_sessionsetup(data):
+    return lambda: data.newsession()
+
+
+def stage_selectquestion(data):
+    selector = examselect.QuestionSelector(data.allquestions)
+    rng = random.Random(data.seed)
+    sids = [sid for sid in data.sids if sid in data.priorexams.keys()] or data.sids
+    seen = {sid: [q for qs in data.priorexams.get(sid, {}).values() for q in qs] for sid in sids}
+
+    def run():
+        for i in range(SELECTIONS):
+            sid = sids[i % len(sids)]
+            selector.selectquestion(TOPICS[i % 5], DIFFS[i % 5], seen[sid][:i % 4],
+                                    seenids={q.uniqueid for q in seen[sid]},
+                                    seensources={q.source for q in seen[sid]}, rng=rng)
+    return run
+
+
+def stage_collectexams(data):
+    session = data.newsession()
+
+    def run():
+        for examdate in sorted(data.signups.keys()):
+            for timeslot, sid in data.signups[examdate]:
+                session.collectquestionsforoneexam(sid, examdate)
+    return run
+
+
+def stage_planjoint(data):
+    session = data.newsession(PLANNER_JOINT)
+    return lambda: session.planexams(sorted(data.signups.keys()))
+
+
+def stage_generatelatex(data):
+    session = data.newsession()
+    folder = data.newpath("exams")
+    os.makedirs(folder)
+    return lambda: session.generatelatexexams(folder, data.lastday, "Excellent (3) ~~~ Poor (0)")
+
+
+def stage_recordhistory(data):
+    session = data.newsession()
+    with quiet():
+        for examdate in sorted(data.signups.keys()):
+            for timeslot, sid in data.signups[examdate]:
+                session.collectquestionsforoneexam(sid, examdate)
+    folder = data.newpath("history")
+    os.makedirs(folder)
+    data.historyfolder = folder
+    return lambda: examio.recordexistingexamstofile(session.existingexams, examio.EXISTINGEXAMSFILE, folder,
+                                                    session.examdetails)
+
+
+def stage_readhistory(data):
+    if getattr(data, "historyfolder", None) is None:
+        stage_recordhistory(data)()
+    return lambda: examio.readexistingexamsfromfile(examio.EXISTINGEXAMSFILE, data.historyfolder, data.allquestions)
+
+
+def stage_stats(data):
+    import examstats  # needs pandas, like the stats themselves
+    if getattr(data, "historyfolder", None) is None:
+        stage_recordhistory(data)()
+    store = examio.openexamstore(examio.EXISTINGEXAMSFILE, data.historyfolder)
+    return lambda: examstats.getstats(store, data.allquestions, data.groups)
+
+
+# Returns a dictionary of timings for one stage: every timed run's seconds, and their min, median, and mean
+# Parameters:   stage (function): one of the stage_* functions above
+#               data (BenchData): the data to run it on
+#               warmup (integer): how many untimed runs first
+#               repeats (integer): how many timed runs
+def timestage(stage, data, warmup, repeats):
+    seconds = []
+    for i in range(warmup + repeats):
+        with quiet():
+            run = stage(data)
+            starttime = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - starttime
+        if i >= warmup:
+            seconds.append(elapsed)
+    ordered = sorted(seconds)
+    return {
+        "seconds": [round(s, 4) for s in seconds],
+        "min": round(ordered[0], 4),
+        "median": round(ordered[len(ordered) // 2], 4),
+        "mean": round(sum(seconds) / len(seconds), 4),
+    }
+
+
+# Runs the given stages on synthetic data of the given size; returns the results as a dictionary (for saving as JSON)
+# Parameters:   numquestions (integer): how many questions in the bank
+#               numstudents (integer): how many students sign up
+#               stages (list of strings): which stages to run (see STAGES)
+#               warmup (integer): how many untimed runs of each stage first
+#               repeats (integer): how many timed runs of each stage
+#               seed (string): seed for generating the data
+def runbenchmarks(numquestions, numstudents, stages=STAGES, warmup=DEFAULTWARMUP, repeats=DEFAULTREPEATS,
+                  seed="exambench"):
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "questions": numquestions,
+        "students": numstudents,
+        "warmup": warmup,
+        "repeats": repeats,
+        "seed": seed,
+        "stages": {},
+    }
+    print("making synthetic data: " + str(numquestions) + " questions, " + str(numstudents) + " students")
+    data = BenchData(numquestions, numstudents, seed)
+    try:
+        for name in stages:
+            results["stages"][name] = timestage(globals()["stage_" + name], data, warmup, repeats)
+            print("\t" + name.ljust(16) + str(results["stages"][name]["median"]).rjust(10) + " s (median)")
+    finally:
+        data.cleanup()
+    return results
+
+
+# Prints each stage's median time next to the same stage's median in earlier results, and their ratio
+# Parameters:   results (dictionary): see runbenchmarks
+#               previous (dictionary): earlier results, eg read from a saved JSON file
+def printcomparison(results, previous):
+    print("compared with " + previous.get("created", "earlier results") + " (" + str(previous.get("questions")) +
+          " questions, " + str(previous.get("students")) + " students):")
+    for name, timing in results["stages"].items():
+        before = previous.get("stages", {}).get(name)
+        if before is None or before["median"] == 0:
+            continue
+        print("\t" + name.ljust(16) + str(before["median"]).rjust(10) + " --> " + str(timing["median"]).ljust(10) +
+              " (" + str(round(timing["median"] / before["median"], 2)) + "x)")
+
+
+def main():
+    usage = "usage: python exambench.py [" + "|".join(PRESETS.keys()) + "] [--questions N] [--students N] " + \
+            "[--stages a,b,...] [--warmup N] [--repeats N] [--out results.json] [--compare earlier.json]"
+    args = sys.argv[1:]
+    options = {}  # flag --> value
+    preset = DEFAULTPRESET
+    try:
+        while len(args) > 0:
+            if args[0].startswith("--"):
+                options[args[0]] = args[1]
+                args = args[2:]
+            else:
+                preset = args[0]
+                args = args[1:]
+        numquestions, numstudents = PRESETS[preset]
+        numquestions = int(options.get("--questions", numquestions))
+        numstudents = int(options.get("--students", numstudents))
+        warmup = int(options.get("--warmup", DEFAULTWARMUP))
+        repeats = int(options.get("--repeats", DEFAULTREPEATS))
+        stages = options["--stages"].split(",") if "--stages" in options.keys() else STAGES
+        if any(stage not in STAGES for stage in stages) or repeats < 1 or warmup < 0:
+            raise ValueError
+    except (IndexError, KeyError, ValueError):
+        print(usage)
+        print("stages: " + ", ".join(STAGES))
+        sys.exit(1)
+
+    results = runbenchmarks(numquestions, numstudents, stages, warmup, repeats)
+    outpath = options.get("--out", "exambench_" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(outpath, "w", encoding="utf-8") as rfile:
+        json.dump(results, rfile, indent=2)
+    print("saved results to " + outpath)
+    if "--compare" in options.keys():
+        with open(options["--compare"], "r", encoding="utf-8") as pfile:
+            printcomparison(results, json.load(pfile))
+
+
+if __name__ == "__main__":
+    main()
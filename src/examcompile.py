@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import signal
+import subprocess
+import time
+import concurrent.futures
+import examarchive
+
+
+COMPILER = "xelatex"
+# stop on the first error rather than waiting for input that will never come
+COMPILERARGS = ["-interaction=nonstopmode", "-halt-on-error"]
+# seconds that one file may take to compile before it's killed
+COMPILETIMEOUT = 120
+# how much of the end of the log to keep in the report for a failed compile
+LOGTAILLINES = 30
+
+# result of compiling one file
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+STATUS_NOCOMPILER = "nocompiler"
+STATUS_CACHED = "cached"  # the same source (and images) compiled before, so that pdf was reused
+
+# images referenced by generated .tex files, eg \includegraphics[width=.9\linewidth]{../images/sample1.png}
+INCLUDEGRAPHICSPATTERN = re.compile(rb"\\includegraphics(?:\[[^\]]*\])?\{([^}]*)\}")
+
+
+# Returns the last numlines lines of the given text file (empty if it doesn't exist)
+# Parameters:   logpath (string): path to the file
+#               numlines (integer): number of lines to return
+def getlogtail(logpath, numlines=LOGTAILLINES):
+    if not os.path.isfile(logpath):
+        return ""
+    with open(logpath, "r", encoding="utf-8", errors="replace") as logf:
+        return "".join(logf.readlines()[-numlines:])
+
+
+# Returns a hex string identifying the pdf that the given .tex file compiles to: a hash of the .tex file itself,
+#   the contents of every image it includes (by path relative to its folder), and how it's compiled
+# Parameters:   texpath (string): path to the .tex file
+def gettexhash(texpath):
+    with open(texpath, "rb") as texf:
+        return gettexsourcehash(texf.read(), os.path.dirname(os.path.abspath(texpath)))
+
+
+# Returns a hex string identifying the pdf that the given LaTeX source compiles to (see gettexhash)
+# Parameters:   source (bytes): the contents of a .tex file
+#               texdir (string): the folder it's compiled in (that image paths are relative to)
+def gettexsourcehash(source, texdir):
+    texhash = hashlib.sha256()
+    texhash.update(" ".join([COMPILER] + COMPILERARGS).encode("utf-8") + b"\0")
+    texhash.update(source)
+    for imagepath in sorted(set(INCLUDEGRAPHICSPATTERN.findall(source))):
+        texhash.update(b"\0" + imagepath + b"\0")
+        fullimagepath = os.path.join(texdir, imagepath.decode("utf-8"))
+        if os.path.isfile(fullimagepath):
+            with open(fullimagepath, "rb") as imagef:
+                texhash.update(hashlib.sha256(imagef.read()).digest())
+        else:
+            texhash.update(b"missing")
+    return texhash.hexdigest()
+
+
+# Runs xelatex on one .tex file, in its own process group so that it (and anything it starts) can be killed if it
+#   takes too long; returns its exit code, or None if it was killed
+# Parameters:   texdir (string): the folder to compile in
+#               texname (string): name of the .tex file (in texdir)
+#               jobdir (string): the folder for the pdf, log, and other files xelatex writes
+#               timeout (number): seconds after which to give up and kill the compile
+def runcompiler(texdir, texname, jobdir, timeout):
+    process = subprocess.Popen([COMPILER] + COMPILERARGS + ["-output-directory=" + jobdir, texname],
+                               cwd=texdir, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=(os.name == "posix"))
+    try:
+        return process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+        process.wait()
+        return None
+
+
+# Copies the given pdf into the cache; it's copied under a temporary name first, so another run never sees half a pdf
+# Parameters:   builtpdf (string): path to the pdf that was just compiled
+#               cachedpdf (string): its path in the cache (see compiletex)
+def addtocache(builtpdf, cachedpdf):
+    os.makedirs(os.path.dirname(cachedpdf), exist_ok=True)
+    temppdf = cachedpdf + "." + os.path.basename(builtpdf) + ".tmp"
+    shutil.copyfile(builtpdf, temppdf)
+    os.replace(temppdf, cachedpdf)
+
+
+# Compiles one .tex file to pdf with xelatex, in its own process group so that it (and anything it starts)
+#   can be killed if it takes too long; auxiliary files go in a folder of their own, which is removed if the compile
+#   succeeds (the pdf is moved next to the .tex file) and kept (with the log) if it doesn't
+# Returns a dictionary describing what happened:
+#   "tex" (string): the .tex file compiled
+#   "pdf" (string): the pdf produced (None if none was)
+#   "status" (string): one of the STATUS_* constants
+#   "returncode" (integer): exit code of xelatex (None if it didn't finish)
+#   "seconds" (float): how long it took
+#   "log" (string): path to the full log (None if the compile succeeded)
+#   "logtail" (string): the end of the log, if the compile didn't succeed
+#   "hash" (string): see gettexhash (None if there's no cache)
+# Parameters:   texpath (string): path to the .tex file to compile; it's compiled from within its own folder
+#                   so that relative paths (eg ../images) resolve as they would by hand
+#               timeout (number): seconds after which to give up and kill the compile
+#               cachedir (string): folder of previously compiled pdfs, named by hash (see gettexhash); if the same
+#                   source has been compiled before its pdf is copied from here instead, and if not the new pdf is
+#                   added here (default None: always compile)
+def compiletex(texpath, timeout=COMPILETIMEOUT, cachedir=None):
+    texdir, texname = os.path.split(os.path.abspath(texpath))
+    jobname = os.path.splitext(texname)[0]
+    jobdir = os.path.join(texdir, jobname + "_build")
+    logpath = os.path.join(jobdir, jobname + ".log")
+    result = {"tex": texpath, "pdf": None, "status": STATUS_FAILED, "returncode": None, "seconds": 0.0,
+              "log": logpath, "logtail": "", "hash": None}
+
+    starttime = time.perf_counter()
+    cachedpdf = None
+    if cachedir is not None:
+        result["hash"] = gettexhash(texpath)
+        cachedpdf = os.path.join(cachedir, result["hash"] + ".pdf")
+        if os.path.isfile(cachedpdf):
+            result["pdf"] = os.path.join(texdir, jobname + ".pdf")
+            shutil.copyfile(cachedpdf, result["pdf"])
+            result["status"] = STATUS_CACHED
+            result["log"] = None
+            result["seconds"] = round(time.perf_counter() - starttime, 3)
+            return result
+
+    os.makedirs(jobdir, exist_ok=True)
+    result["returncode"] = runcompiler(texdir, texname, jobdir, timeout)
+    if result["returncode"] is None:
+        result["status"] = STATUS_TIMEOUT
+    result["seconds"] = round(time.perf_counter() - starttime, 3)
+
+    builtpdf = os.path.join(jobdir, jobname + ".pdf")
+    if result["returncode"] == 0 and os.path.isfile(builtpdf):
+        result["pdf"] = os.path.join(texdir, jobname + ".pdf")
+        if cachedpdf is not None:
+            addtocache(builtpdf, cachedpdf)
+        os.replace(builtpdf, result["pdf"])
+        result["status"] = STATUS_OK
+        result["log"] = None
+        shutil.rmtree(jobdir, ignore_errors=True)
+    else:
+        result["logtail"] = getlogtail(logpath)
+    return result
+
+
+# Compiles the given .tex files at the same time (several xelatex processes at once);
+#   returns a list of dictionaries (see compiletex), one per file, in the same order as texpaths
+# Parameters:   texpaths (list of strings): paths to the .tex files to compile
+#               workers (integer): how many files to compile at once (default None: one per CPU core)
+#               timeout (number): seconds after which to give up on any one file
+#               cachedir (string): folder of previously compiled pdfs (see compiletex; default None: no cache)
+def compilealltex(texpaths, workers=None, timeout=COMPILETIMEOUT, cachedir=None):
+    if shutil.which(COMPILER) is None:
+        print(COMPILER + " not found; is it installed and on your PATH? not compiling any pdfs")
+        return [{"tex": texpath, "pdf": None, "status": STATUS_NOCOMPILER, "returncode": None, "seconds": 0.0,
+                 "log": None, "logtail": "", "hash": None} for texpath in texpaths]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # each job spends its time waiting on its own xelatex process, so threads are enough
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(lambda texpath: compiletex(texpath, timeout, cachedir), texpaths))
+
+
+# Compiles one .tex file from an archive (see examarchive): it's written to a folder of its own, next to the archive
+#   (so that relative paths like ../images resolve as they would for a folder of generated files), compiled there,
+#   and the folder is removed if the compile succeeds
+# Returns a dictionary as for compiletex, where "tex" is the name of the member in the archive,
+#   "pdf" is the name the pdf should have in an archive, and "pdfdata" (bytes) is the pdf itself (None if none)
+# Parameters:   name (string): name of the .tex file in the archive
+#               source (bytes): contents of the .tex file
+#               workdir (string): folder in which to make the folder to compile in
+#               timeout (number): seconds after which to give up and kill the compile
+#               cachedir (string): folder of previously compiled pdfs (see compiletex; default None: no cache)
+def compilearchivedtex(name, source, workdir, timeout=COMPILETIMEOUT, cachedir=None):
+    jobname = os.path.splitext(os.path.basename(name))[0]
+    jobdir = os.path.join(workdir, jobname + "_build")
+    texname = jobname + ".tex"
+    result = {"tex": name, "pdf": None, "status": STATUS_FAILED, "returncode": None, "seconds": 0.0,
+              "log": os.path.join(jobdir, jobname + ".log"), "logtail": "", "hash": None, "pdfdata": None}
+
+    starttime = time.perf_counter()
+    cachedpdf = None
+    if cachedir is not None:
+        result["hash"] = gettexsourcehash(source, jobdir)
+        cachedpdf = os.path.join(cachedir, result["hash"] + ".pdf")
+        if os.path.isfile(cachedpdf):
+            with open(cachedpdf, "rb") as pdff:
+                result["pdfdata"] = pdff.read()
+            result["pdf"] = os.path.splitext(name)[0] + ".pdf"
+            result["status"] = STATUS_CACHED
+            result["log"] = None
+            result["seconds"] = round(time.perf_counter() - starttime, 3)
+            return result
+
+    os.makedirs(jobdir, exist_ok=True)
+    with open(os.path.join(jobdir, texname), "wb") as texf:
+        texf.write(source)
+    result["returncode"] = runcompiler(jobdir, texname, jobdir, timeout)
+    if result["returncode"] is None:
+        result["status"] = STATUS_TIMEOUT
+    result["seconds"] = round(time.perf_counter() - starttime, 3)
+
+    builtpdf = os.path.join(jobdir, jobname + ".pdf")
+    if result["returncode"] == 0 and os.path.isfile(builtpdf):
+        if cachedpdf is not None:
+            addtocache(builtpdf, cachedpdf)
+        with open(builtpdf, "rb") as pdff:
+            result["pdfdata"] = pdff.read()
+        result["pdf"] = os.path.splitext(name)[0] + ".pdf"
+        result["status"] = STATUS_OK
+        result["log"] = None
+        shutil.rmtree(jobdir, ignore_errors=True)
+    else:
+        result["logtail"] = getlogtail(result["log"])
+    return result
+
+
+# Compiles every .tex file in the given archive (see examarchive), several at once, and writes the pdfs to a
+#   second archive of the same kind, named after the first with "_pdfs" added;
+#   returns a list of dictionaries (see compilearchivedtex, but without "pdfdata"), one per .tex file
+# Parameters:   archivepath (string): path to the archive
+#               workers (integer): how many files to compile at once (default None: one per CPU core)
+#               timeout (number): seconds after which to give up on any one file
+#               cachedir (string): folder of previously compiled pdfs (see compiletex; default None: no cache)
+def compilearchive(archivepath, workers=None, timeout=COMPILETIMEOUT, cachedir=None):
+    texnames = [member["name"] for member in examarchive.readmanifest(archivepath)["files"]
+                if member["name"].endswith(".tex")]
+    if shutil.which(COMPILER) is None:
+        print(COMPILER + " not found; is it installed and on your PATH? not compiling any pdfs")
+        return [{"tex": name, "pdf": None, "status": STATUS_NOCOMPILER, "returncode": None, "seconds": 0.0,
+                 "log": None, "logtail": "", "hash": None} for name in texnames]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    workdir = os.path.dirname(os.path.abspath(archivepath))
+    archivebase, archiveext = os.path.splitext(archivepath)
+    results = []
+    with examarchive.ExamArchive(archivebase + "_pdfs" + archiveext, workdir) as pdfarchive:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            jobs = pool.map(lambda member: compilearchivedtex(member[0], member[1], workdir, timeout, cachedir),
+                            examarchive.readmembers(archivepath, texnames))
+            # written in order, as each one is done
+            for result in jobs:
+                if result["pdfdata"] is not None:
+                    pdfarchive.writenamedmember(result["pdf"], result["pdfdata"])
+                del result["pdfdata"]
+                results.append(result)
+    return results
+
+
+# Prints a summary of the given compile results (and the end of the log for each one that failed),
+#   and writes them all to a .json file
+# Parameters:   results (list of dictionaries): as returned by compilealltex
+#               reportpath (string): path of the .json file to write (default None: don't write one)
+def reportcompileresults(results, reportpath=None):
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    print("compiled " + str(len(results)) + " file(s): " +
+          ", ".join(str(count) + " " + status for status, count in sorted(counts.items())))
+    for result in results:
+        if result["status"] in [STATUS_FAILED, STATUS_TIMEOUT]:
+            print("\n" + result["status"] + ": " + result["tex"] + " (full log in " + str(result["log"]) + ")")
+            print(result["logtail"])
+
+    if reportpath is not None:
+        with open(reportpath, "w", encoding="utf-8") as reportf:
+            json.dump(results, reportf, indent=2)
+
+
+# Compiles .tex files named on the command line (eg to retry some that failed), or every .tex file in an archive,
+#   and prints the results
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python examcompile.py file1.tex [file2.tex ...]  OR  python examcompile.py archive.zip")
+        sys.exit(1)
+    if len(sys.argv) == 2 and os.path.splitext(sys.argv[1])[1][1:] in [examarchive.ARCHIVE_ZIP, examarchive.ARCHIVE_TAR]:
+        reportcompileresults(compilearchive(sys.argv[1]))
+    else:
+        reportcompileresults(compilealltex(sys.argv[1:]))
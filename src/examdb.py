@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    sid TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS exams (
+    examid INTEGER PRIMARY KEY,
+    sid TEXT NOT NULL REFERENCES students(sid),
+    examtype TEXT NOT NULL,
+    examdate TEXT,
+    created TEXT NOT NULL,
+    UNIQUE (sid, examtype)
+);
+CREATE TABLE IF NOT EXISTS questions (
+    uniqueid TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    source TEXT NOT NULL,
+    questiontypes TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS examquestions (
+    examid INTEGER NOT NULL REFERENCES exams(examid) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    uniqueid TEXT NOT NULL REFERENCES questions(uniqueid),
+    tier INTEGER,
+    PRIMARY KEY (examid, position)
+);
+CREATE INDEX IF NOT EXISTS exams_examtype ON exams(examtype);
+CREATE INDEX IF NOT EXISTS examquestions_uniqueid ON examquestions(uniqueid);
+"""
+
+# question types are stored in one column, separated by this
+QTYPESEPARATOR = ","
+
+
+# this class stores which students have had which questions on which exams, in an SQLite database file
+# every change is written in a transaction, so a run that's interrupted partway leaves the data as it was,
+# and other processes can read the file at the same time
+class ExamStore:
+
+    # Parameters:   dbpath (string): path to the database file (created if it doesn't exist yet)
+    def __init__(self, dbpath):
+        self.dbpath = dbpath
+        self.connection = sqlite3.connect(dbpath, timeout=30, isolation_level=None)  # we manage transactions
+        self.transactiondepth = 0
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    # Context manager for a group of changes that should be written all together or not at all
+    #   (transactions can be nested; only the outermost one commits)
+    @contextmanager
+    def transaction(self):
+        if self.transactiondepth == 0:
+            self.connection.execute("BEGIN IMMEDIATE")
+        self.transactiondepth += 1
+        try:
+            yield self
+        except BaseException:
+            self.transactiondepth -= 1
+            if self.transactiondepth == 0:
+                self.connection.execute("ROLLBACK")
+            raise
+        self.transactiondepth -= 1
+        if self.transactiondepth == 0:
+            self.connection.execute("COMMIT")
+
+    # Returns True iff there are no exams stored yet
+    def isempty(self):
+        return self.connection.execute("SELECT 1 FROM exams LIMIT 1").fetchone() is None
+
+    # Returns a list of the exam types that have been stored
+    def getexamtypes(self):
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT examtype FROM exams ORDER BY examtype")]
+
+    # Returns a list of the student ids that have at least one exam stored
+    def getsids(self):
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT sid FROM exams ORDER BY sid")]
+
+    # Returns the examid for sid's exam of type examtype, or None if there isn't one
+    # Parameters:   sid (string): student id whose exam to look up
+    #               examtype (string): type of exam to look up
+    def getexamid(self, sid, examtype):
+        row = self.connection.execute(
+            "SELECT examid FROM exams WHERE sid = ? AND examtype = ?", (sid, examtype)).fetchone()
+        return row[0] if row is not None else None
+
+    # Returns the list of question uniqueids (in order) on sid's exam of type examtype, or None if there isn't one
+    # Parameters:   sid (string): student id whose exam to look up
+    #               examtype (string): type of exam to look up
+    def getexamquestionids(self, sid, examtype):
+        examid = self.getexamid(sid, examtype)
+        if examid is None:
+            return None
+        return [row[0] for row in self.connection.execute(
+            "SELECT uniqueid FROM examquestions WHERE examid = ? ORDER BY position", (examid,))]
+
+    # Returns everything stored, in the same compact form as examio.compactexistingexams, ie a dictionary with
+    #   "exams": dictionary of studentID --> examtype --> [list of question uniqueids] and
+    #   "questions": dictionary of uniqueid --> (topic, difficulty, source, [list of question types])
+    def readexams(self):
+        exams = {}
+        rows = self.connection.execute(
+            "SELECT e.sid, e.examtype, eq.uniqueid FROM exams e JOIN examquestions eq ON eq.examid = e.examid "
+            "ORDER BY e.examid, eq.position")
+        for sid, examtype, uniqueid in rows:
+            exams.setdefault(sid, {}).setdefault(examtype, []).append(uniqueid)
+        # exams whose questions have all been removed still count as existing
+        for sid, examtype in self.connection.execute("SELECT sid, examtype FROM exams"):
+            exams.setdefault(sid, {}).setdefault(examtype, [])
+
+        questions = {}
+        for uniqueid, topic, difficulty, source, qtypes in self.connection.execute(
+                "SELECT uniqueid, topic, difficulty, source, questiontypes FROM questions"):
+            questions[uniqueid] = (topic, difficulty, source, [qt for qt in qtypes.split(QTYPESEPARATOR) if qt != ""])
+        return {"exams": exams, "questions": questions}
+
+    # Returns a dictionary of table name --> list of rows (as tuples) for the "exams" (examid, sid, examtype,
+    #   examdate), "examquestions" (examid, position, uniqueid, tier), and "questions" (uniqueid, topic, difficulty,
+    #   source, questiontypes) tables, eg for analysis; examdate is an ISO format string and tier an integer (either may
+    #   be None if not recorded), and questiontypes are separated by QTYPESEPARATOR
+    # (for big histories, fetching each table and joining them afterwards is several times quicker than a JOIN here)
+    def readtablerows(self):
+        return {
+            "exams": self.connection.execute("SELECT examid, sid, examtype, examdate FROM exams").fetchall(),
+            "examquestions": self.connection.execute(
+                "SELECT examid, position, uniqueid, tier FROM examquestions").fetchall(),
+            "questions": self.connection.execute(
+                "SELECT uniqueid, topic, difficulty, source, questiontypes FROM questions").fetchall(),
+        }
+
+    # Returns a dictionary of studentID --> examtype --> date for every stored exam (None if its date wasn't recorded)
+    def readexamdates(self):
+        dates = {}
+        for sid, examtype, examdate in self.connection.execute("SELECT sid, examtype, examdate FROM exams"):
+            dates.setdefault(sid, {})[examtype] = date.fromisoformat(examdate) if examdate is not None else None
+        return dates
+
+    # Records the details of the given Questions needed for uniqueness checks (if they're not there already)
+    # Parameters:   questions (list of Questions): the questions to record
+    def addquestions(self, questions):
+        self.connection.executemany(
+            "INSERT INTO questions (uniqueid, topic, difficulty, source, questiontypes) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (uniqueid) DO UPDATE SET topic = excluded.topic, difficulty = excluded.difficulty, "
+            "source = excluded.source, questiontypes = excluded.questiontypes",
+            [(q.uniqueid, q.topic, q.difficulty, q.source, QTYPESEPARATOR.join(sorted(q.questiontypes)))
+             for q in questions])
+
+    # Stores sid's exam of type examtype as consisting of the given questions (replacing any such exam already stored)
+    # Parameters:   sid (string): student id whose exam this is
+    #               examtype (string): type of exam
+    #               questions (list of Questions): the questions on this exam, in order
+    #               examdate (date object): the date of this exam (default None: unknown)
+    #               tiers (list of integers): how far uniqueness constraints had to be relaxed to choose
+    #                   each question (see examselect.TIER_* constants; default None: unknown)
+    def addexam(self, sid, examtype, questions, examdate=None, tiers=None):
+        if tiers is None:
+            tiers = [None] * len(questions)
+        with self.transaction():
+            self.addquestions(questions)
+            self.connection.execute("INSERT OR IGNORE INTO students (sid) VALUES (?)", (sid,))
+            self.connection.execute(
+                "INSERT INTO exams (sid, examtype, examdate, created) VALUES (?, ?, ?, ?) "
+                # re-recording an exam without its date keeps the date that's already stored
+                "ON CONFLICT (sid, examtype) DO UPDATE SET examdate = COALESCE(excluded.examdate, exams.examdate)",
+                (sid, examtype, examdate.isoformat() if examdate is not None else None,
+                 datetime.now().isoformat(timespec="seconds")))
+            examid = self.getexamid(sid, examtype)
+            self.connection.execute("DELETE FROM examquestions WHERE examid = ?", (examid,))
+            self.connection.executemany(
+                "INSERT INTO examquestions (examid, position, uniqueid, tier) VALUES (?, ?, ?, ?)",
+                [(examid, position, q.uniqueid, tier) for position, (q, tier) in enumerate(zip(questions, tiers))])
+
+    # Removes sid's exam of type examtype; returns True iff there was such an exam
+    # Parameters:   sid (string): student id whose exam to remove
+    #               examtype (string): type of exam to remove
+    def removeexam(self, sid, examtype):
+        with self.transaction():
+            cursor = self.connection.execute("DELETE FROM exams WHERE sid = ? AND examtype = ?", (sid, examtype))
+        return cursor.rowcount > 0
+
+    # Replaces the question ID'd by oldqid with the Question newq on sid's exam of type examtype, in one slot only
+    #   (so if an exam has the same question twice, the other copy stays); returns the number of questions replaced
+    #   (0 if the exam or question wasn't found)
+    # Parameters:   sid (string): student id whose exam to change
+    #               examtype (string): type of exam to change
+    #               oldqid (string): uniqueid of the question to replace
+    #               newq (Question): the question to use instead
+    #               tier (integer): how far uniqueness constraints had to be relaxed to choose newq
+    #                   (see examselect.TIER_* constants; default None: unknown)
+    #               position (integer): which question on the exam to replace, counting from 0; it's only replaced if
+    #                   it is oldqid (default None: the first one that is)
+    def replacequestion(self, sid, examtype, oldqid, newq, tier=None, position=None):
+        with self.transaction():
+            examid = self.getexamid(sid, examtype)
+            if examid is None:
+                return 0
+            if position is None:
+                position = self.connection.execute(
+                    "SELECT MIN(position) FROM examquestions WHERE examid = ? AND uniqueid = ?",
+                    (examid, oldqid)).fetchone()[0]
+                if position is None:
+                    return 0
+            self.addquestions([newq])
+            cursor = self.connection.execute(
+                "UPDATE examquestions SET uniqueid = ?, tier = ? WHERE examid = ? AND position = ? AND uniqueid = ?",
+                (newq.uniqueid, tier, examid, position, oldqid))
+        return cursor.rowcount
+
+    # Stores every exam in existingexams (or just the given ones) that isn't already stored with exactly the same
+    #   questions; returns the number of exams written
+    # Each exam is compared with what's stored by looking it up on its own, so recording a few exams costs the
+    #   same however long the history is
+    # Parameters:   existingexams (dictionary of studentID --> examtype --> [list of Questions]):
+    #                   questions that have been used for which students on which exam(s)
+    #               examdetails (dictionary of (studentID, examtype) --> dictionary): optional "examdate" and "tiers"
+    #                   for any of the exams (see addexam)
+    #               changed (iterable of (studentID, examtype)): the only exams in existingexams that might differ
+    #                   from what's stored, eg the ones chosen in this run (default None: check every exam)
+    def recordexams(self, existingexams, examdetails=None, changed=None):
+        if examdetails is None:
+            examdetails = {}
+        if changed is None:
+            changed = [(sid, examtype) for sid in existingexams.keys() for examtype in existingexams[sid].keys()]
+        numwritten = 0
+        with self.transaction():
+            for sid, examtype in changed:
+                questions = existingexams.get(sid, {}).get(examtype)
+                if questions is None or self.getexamquestionids(sid, examtype) == [q.uniqueid for q in questions]:
+                    continue
+                details = examdetails.get((sid, examtype), {})
+                self.addexam(sid, examtype, questions, details.get("examdate"), details.get("tiers"))
+                numwritten += 1
+        return numwritten
+
+    # Stores everything in the given compact existing exams (see readexams), eg from an older snapshot file
+    # Parameters:   compactexams (dictionary): existing exams in the form returned by readexams
+    def importexams(self, compactexams):
+        with self.transaction():
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO questions (uniqueid, topic, difficulty, source, questiontypes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(qid, topic, difficulty, source, QTYPESEPARATOR.join(sorted(qtypes)))
+                 for qid, (topic, difficulty, source, qtypes) in compactexams["questions"].items()])
+            created = datetime.now().isoformat(timespec="seconds")
+            for sid, sidexams in compactexams["exams"].items():
+                self.connection.execute("INSERT OR IGNORE INTO students (sid) VALUES (?)", (sid,))
+                for examtype, qids in sidexams.items():
+                    self.connection.execute("DELETE FROM exams WHERE sid = ? AND examtype = ?", (sid, examtype))
+                    examid = self.connection.execute(
+                        "INSERT INTO exams (sid, examtype, created) VALUES (?, ?, ?)",
+                        (sid, examtype, created)).lastrowid
+                    self.connection.executemany(
+                        "INSERT INTO examquestions (examid, position, uniqueid) VALUES (?, ?, ?)",
+                        [(examid, position, qid) for position, qid in enumerate(qids)])
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import csv
+import json
+import importlib.util
+
+
+# formats that question assignments can be exported in
+EXPORT_CSV = "csv"
+EXPORT_JSONL = "jsonl"
+EXPORT_PARQUET = "parquet"
+EXPORTFORMATS = [EXPORT_CSV, EXPORT_JSONL, EXPORT_PARQUET]
+# packages that pandas can use to write parquet files (at least one must be installed to export parquet)
+PARQUETENGINES = ["pyarrow", "fastparquet"]
+# how many records go into each parquet part file (and so are held in memory at once)
+PARQUETCHUNKROWS = 50000
+
+# one record per question on each student's exam
+EXPORTFIELDS = ["Person", "ExamType", "ExamDate", "Time", "Position", "QuestionID", "Topic", "Difficulty", "Source",
+                "Question_latex", "Image1", "Image1Caption", "Image2", "Image2Caption"]
+
+
+# Returns the name of an installed package that pandas can use to write parquet files, or None if there isn't one
+def getparquetengine():
+    for engine in PARQUETENGINES:
+        if importlib.util.find_spec(engine) is not None:
+            return engine
+    return None
+
+
+# Returns a tuple of values (in the order of EXPORTFIELDS) describing one question on one student's exam
+# Parameters:   sid (string): student whose exam this is
+#               examtype (string): the type of exam
+#               examdate (date object): the date of the exam
+#               time (string): the timeslot of the exam
+#               position (integer): the question number on the exam
+#               question (Question): the question
+#               questionlatex (string): the question's LaTeX markup, as it goes in a tsv (see makequestiontex)
+def makerecord(sid, examtype, examdate, time, position, question, questionlatex):
+    return (sid, examtype, examdate.isoformat() if examdate is not None else "", time, position, question.uniqueid,
+            question.topic, question.difficulty, question.source, questionlatex,
+            question.image1, question.image1caption, question.image2, question.image2caption)
+
+
+# this class writes records (see makerecord) to a .csv file as they come, with fields quoted as necessary
+class CSVExporter:
+
+    # Parameters:   path (string): the file to write
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(EXPORTFIELDS)
+        self.numrecords = 0
+
+    # Parameters:   record (tuple): the record to write
+    def write(self, record):
+        self.writer.writerow(record)
+        self.numrecords += 1
+
+    def close(self):
+        self.file.close()
+
+
+# this class writes records (see makerecord) to a JSON Lines file as they come: one JSON object per line
+class JSONLExporter:
+
+    # Parameters:   path (string): the file to write
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8", newline="\n")
+        self.numrecords = 0
+
+    # Parameters:   record (tuple): the record to write
+    def write(self, record):
+        self.file.write(json.dumps(dict(zip(EXPORTFIELDS, record)), ensure_ascii=False) + "\n")
+        self.numrecords += 1
+
+    def close(self):
+        self.file.close()
+
+
+# this class writes records (see makerecord) to a folder of parquet files, PARQUETCHUNKROWS records per file,
+# so that only that many are ever held in memory (pandas.read_parquet can read the whole folder at once)
+class ParquetExporter:
+
+    # Parameters:   path (string): the folder to write (created if necessary)
+    #               engine (string): the package pandas should use to write parquet (see getparquetengine)
+    def __init__(self, path, engine):
+        self.path = path
+        self.engine = engine
+        self.records = []
+        self.numparts = 0
+        self.numrecords = 0
+        os.makedirs(path, exist_ok=True)
+
+    # Parameters:   record (tuple): the record to write
+    def write(self, record):
+        self.records.append(record)
+        self.numrecords += 1
+        if len(self.records) >= PARQUETCHUNKROWS:
+            self.flush()
+
+    # Writes the records collected so far as one more part file
+    def flush(self):
+        if len(self.records) == 0:
+            return
+        # only needed here, and slow to import
+        import pandas as pd
+        chunk = pd.DataFrame.from_records(self.records, columns=EXPORTFIELDS)
+        chunk.to_parquet(os.path.join(self.path, "part-" + str(self.numparts).zfill(5) + ".parquet"),
+                         engine=self.engine, index=False)
+        self.numparts += 1
+        self.records = []
+
+    def close(self):
+        self.flush()
+
+
+# this class collects records in memory that are headed for an exporter, eg in a worker process that can't write to
+# the export file itself; the collected records are then written to the exporter in order
+class RecordCollector:
+
+    def __init__(self):
+        self.records = []
+
+    # Parameters:   record (tuple): the record to collect
+    def write(self, record):
+        self.records.append(record)
+
+
+# Returns an exporter (see above) for the given format
+# Parameters:   exportformat (string): one of EXPORTFORMATS
+#               basepath (string): path to export to, without an extension (one is added for the format)
+def makeexporter(exportformat, basepath):
+    if exportformat == EXPORT_CSV:
+        return CSVExporter(basepath + ".csv")
+    elif exportformat == EXPORT_JSONL:
+        return JSONLExporter(basepath + ".jsonl")
+    else:
+        return ParquetExporter(basepath + ".parquet", getparquetengine())
@@ -8,15 +8,36 @@ updated May 2021 by Kaili Vesik
 import os
 import sys
 import io
+import gc
 import pickle
-import subprocess
-import pandas as pd
+import hashlib
 import re
 from datetime import date, datetime, timedelta
 from Exam import Question
+import examdb
 
 
 WILD = "WILD"
+# ways of choosing the questions for a session's exams (see ExamSession.planexams)
+PLANNER_GREEDY = "greedy"
+PLANNER_JOINT = "joint"
+# identifies (the version of) the compact format in which existing exams were stored in snapshot files
+HISTORYFORMATKEY = "__format__"
+HISTORYFORMAT = 2
+# file extensions for existing exams: the database, and the older timestamped snapshot files
+HISTORYDBSUFFIX = ".db"
+# name (without extension) of the existing exams database in the exams folder
+EXISTINGEXAMSFILE = "existingexams_donotedit"
+SNAPSHOTSUFFIX = ".dict"
+# file extension for the parsed copy of a question bank that's kept next to it (see readquestionsfromfile)
+BANKCACHESUFFIX = ".cache"
+# identifies (the version of) the format of those files; change it whenever parsing or Question changes,
+#   so that caches written by older versions are ignored
+BANKCACHEFORMAT = 1
+# the Question attributes stored in those files, in the order Question's constructor takes them
+BANKCACHEFIELDS = ("uniqueid", "topic", "difficulty", "source", "datecompleted", "questiontypes", "instructions",
+                   "data1", "data2", "image1", "image1caption", "image2", "image2caption", "imagearrangement",
+                   "notes", "omit", "instrnotes")
 
 
 # Returns the date object which is the most recent Friday strictly before (not equal to) the input date
@@ -38,77 +59,187 @@ def getfriofthisweek(thedate):
 
 
 
+# Returns the given path if there is such a file, or else the same name in the 'data' folder if it's there,
+#   or else None
+# Parameters:   name (string): path or name of the file to look for
+def finddatafile(name):
+    for filepath in [name, "../data/" + name]:
+        if os.path.isfile(filepath):
+            return filepath
+    return None
+
+
+# Returns the given path if there is such a file, or else the same name in the 'config' folder if it's there,
+#   or else None
+# Parameters:   name (string): path or name of the file to look for
+def findconfigfile(name):
+    for filepath in [name, "../config/" + name]:
+        if os.path.isfile(filepath):
+            return filepath
+    return None
+
+
 # Returns all exam questions in file as a dictionary of topic-->difficulty-->[list of Questions]
+# Parsing a big question bank takes a while, so the parsed questions are also saved next to it (with
+#   BANKCACHESUFFIX added to its name) and read from there instead next time, as long as the .tsv hasn't changed
+# Parameters:   questionsfilepath (string): path to the .tsv file containing exam question data
+#               usecache (boolean): whether to use (and update) the saved copy (default True)
+def readquestionsfromfile(questionsfilepath, usecache=True):
+    if not usecache:
+        return parsequestionsfile(questionsfilepath)
+    cachepath = questionsfilepath + BANKCACHESUFFIX
+    key = getbankfingerprint(questionsfilepath)
+    allquestions = readbankcache(cachepath, key, questionsfilepath)
+    if allquestions is None:
+        if "sha256" not in key.keys():
+            key["sha256"] = getfilehash(questionsfilepath)
+        allquestions = parsequestionsfile(questionsfilepath)
+        writebankcache(cachepath, key, allquestions)
+    return allquestions
+
+
+# Returns a dictionary identifying the current contents of the given file: its path, size, and modification time
+#   (its sha256 hash is only added when needed; see readbankcache)
+# Parameters:   filepath (string): path to the file
+def getbankfingerprint(filepath):
+    stat = os.stat(filepath)
+    return {"format": BANKCACHEFORMAT, "fields": BANKCACHEFIELDS, "path": os.path.abspath(filepath),
+            "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+# Returns the sha256 hash of the given file's contents, as a hex string
+# Parameters:   filepath (string): path to the file
+def getfilehash(filepath):
+    with open(filepath, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# Returns the questions saved in the given cache file as a dictionary of topic-->difficulty-->[list of Questions],
+#   or None if there is no such file or it wasn't made from the same contents of the same question bank
+# If the question bank's path or modification time changed but its contents didn't (eg it was copied, or saved
+#   again without changes), the cache file is still used, and updated to match
+# Parameters:   cachepath (string): path to the cache file
+#               key (dictionary): the question bank's current fingerprint (see getbankfingerprint)
+#               questionsfilepath (string): path to the question bank the cache was made from
+def readbankcache(cachepath, key, questionsfilepath):
+    if not os.path.isfile(cachepath):
+        return None
+    try:
+        with open(cachepath, "rb") as cfile:
+            storedkey = pickle.load(cfile)
+            if storedkey.get("format") != key["format"] or storedkey.get("fields") != key["fields"] \
+                    or storedkey.get("size") != key["size"]:
+                return None
+            samestat = storedkey.get("path") == key["path"] and storedkey.get("mtime_ns") == key["mtime_ns"]
+            if not samestat:
+                key["sha256"] = getfilehash(questionsfilepath)
+                if storedkey.get("sha256") != key["sha256"]:
+                    return None
+            # building lots of small objects is much quicker without the garbage collector stepping in every so often
+            gcwasenabled = gc.isenabled()
+            gc.disable()
+            try:
+                columns = pickle.load(cfile)
+                questions = list(map(Question, *columns))
+            finally:
+                if gcwasenabled:
+                    gc.enable()
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, TypeError, ValueError) as e:
+        print("ignoring unreadable question bank cache " + cachepath + ": " + str(e))
+        return None
+
+    allquestions = {}  # dictionary of topic-->difficulty-->[list of Questions]
+    for q in questions:
+        allquestions.setdefault(q.topic, {}).setdefault(q.difficulty, []).append(q)
+    if not samestat:
+        storedkey.update(key)
+        writebankcache(cachepath, storedkey, allquestions)
+    return allquestions
+
+
+# Saves the given questions to the given cache file (see readbankcache), as the fingerprint followed by one list
+#   per Question attribute (see BANKCACHEFIELDS); if the file can't be written, the questions just aren't cached
+# Parameters:   cachepath (string): path to the cache file
+#               key (dictionary): the question bank's fingerprint, including its hash (see getbankfingerprint)
+#               allquestions (dictionary of topic-->difficulty-->[list of Questions]): the parsed question bank
+def writebankcache(cachepath, key, allquestions):
+    questions = [q for topic in allquestions.keys() for difficulty in allquestions[topic].keys()
+                 for q in allquestions[topic][difficulty]]
+    columns = [[getattr(q, field) for q in questions] for field in BANKCACHEFIELDS]
+    temppath = cachepath + ".tmp"
+    try:
+        with open(temppath, "wb") as cfile:
+            pickle.dump(key, cfile, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(columns, cfile, protocol=pickle.HIGHEST_PROTOCOL)
+        # only replace the old cache once the new one is complete
+        os.replace(temppath, cachepath)
+    except OSError as e:
+        print("couldn't save question bank cache " + cachepath + ": " + str(e))
+
+
+# Returns all exam questions in file as a dictionary of topic-->difficulty-->[list of Questions], read and
+#   parsed from the .tsv itself (see readquestionsfromfile)
 # Parameters:   questionsfilepath (string): path to the .tsv file containing exam question data
-def readquestionsfromfile(questionsfilepath):
+def parsequestionsfile(questionsfilepath):
+    # pandas takes longer to import than everything else put together, so it's only imported once a .tsv
+    # actually has to be parsed (eg examutils doesn't need it until a question is replaced)
+    import pandas as pd
     allquestions = {}  # dictionary of topic-->difficulty-->[list of Questions]
     with io.open(questionsfilepath, "r", encoding="utf-8") as qfile:
-        df = pd.read_csv(qfile, sep="\t", keep_default_na=False)  # read column names from file
-        colnames = [cname.lower() for cname in df.columns.values.tolist()]
-        df.columns = colnames
-
-        # be somewhat flexible with column names, as long as they start with these strings
-        uniqueidcol = next(cname for cname in colnames if cname.startswith("uniqueid"))
-        topiccol = next(cname for cname in colnames if cname.startswith("topic"))
-        diffcol = next(cname for cname in colnames if cname.startswith("difficulty"))
-        # whichever source column is furthest right is the one we'll use
-        sourcecol = [cname for cname in colnames if cname.startswith("source")][-1]  # eg "Source2021S"
-        datecompletedcol = next(cname for cname in colnames if cname.startswith("datecompleted"))
-        qtypescol = next(cname for cname in colnames if cname.startswith("questiontype"))
-        instrcol = next(cname for cname in colnames if cname.startswith("instructions"))
-        data1col = next(cname for cname in colnames if cname.startswith("data1"))
-        data2col = next(cname for cname in colnames if cname.startswith("data2"))
-        image1col = next(cname for cname in colnames if cname.startswith("image1") and "caption" not in cname)
-        image2col = next(cname for cname in colnames if cname.startswith("image2") and "caption" not in cname)
-        image1capcol = next(cname for cname in colnames if cname.startswith("image1") and "caption" in cname)
-        image2capcol = next(cname for cname in colnames if cname.startswith("image2") and "caption" in cname)
-        imgarrcol = next(cname for cname in colnames if cname.startswith("imagearrangement"))
-        notescol = next(cname for cname in colnames if cname.startswith("notes"))
-        omitcol = next(cname for cname in colnames if cname.startswith("omit"))
-        instructorcommentscol = next(cname for cname in colnames
-                                     if cname.startswith("instructor") and "comments" in cname)
-
-        for index, row in df.iterrows():
-            # get data for each row (question)
-            uniqueid = row[uniqueidcol]
-            topic = row[topiccol]
-            difficulty = row[diffcol]
-            source = row[sourcecol]
-            datecompleted = makedate(row[datecompletedcol])
-            questiontypes = []
-            typestext = row[qtypescol]
-            if typestext != "":
-                types = typestext.split(",")
-                questiontypes = [qtype.strip() for qtype in types]
-            instr = row[instrcol]
-            data1 = row[data1col]
-            data2 = row[data2col]
-            image1 = row[image1col]
-            image1caption = row[image1capcol]
-            image2 = row[image2col]
-            image2caption = row[image2capcol]
-            imagearrangement = row[imgarrcol]
-            notes = row[notescol]
-            omit = False
-            if row[omitcol] != "":
-                omit = True
-            instrnotes = row[instructorcommentscol]
-
-            # currently omitted/incomplete (no topic or difficulty) questions are not even included
-            # in the question bank; this might be worth changing in future
-            if omit is True or topic == "" or difficulty == "":
-                continue
-
-            if topic not in allquestions.keys():
-                allquestions[topic] = {}
-            if difficulty not in allquestions[topic].keys():
-                allquestions[topic][difficulty] = []
-
-            currentq = Question(
-                uniqueid, topic, difficulty, source, datecompleted, questiontypes,
-                instr, data1, data2, image1, image1caption, image2, image2caption, imagearrangement,
-                notes, omit, instrnotes)
-            allquestions[topic][difficulty].append(currentq)
+        # read every cell as text, so that (eg) numeric-looking data isn't reformatted
+        df = pd.read_csv(qfile, sep="\t", keep_default_na=False, dtype=str)  # read column names from file
+    colnames = [cname.lower() for cname in df.columns.values.tolist()]
+    df.columns = colnames
+
+    # be somewhat flexible with column names, as long as they start with these strings
+    uniqueidcol = next(cname for cname in colnames if cname.startswith("uniqueid"))
+    topiccol = next(cname for cname in colnames if cname.startswith("topic"))
+    diffcol = next(cname for cname in colnames if cname.startswith("difficulty"))
+    # whichever source column is furthest right is the one we'll use
+    sourcecol = [cname for cname in colnames if cname.startswith("source")][-1]  # eg "Source2021S"
+    datecompletedcol = next(cname for cname in colnames if cname.startswith("datecompleted"))
+    qtypescol = next(cname for cname in colnames if cname.startswith("questiontype"))
+    instrcol = next(cname for cname in colnames if cname.startswith("instructions"))
+    data1col = next(cname for cname in colnames if cname.startswith("data1"))
+    data2col = next(cname for cname in colnames if cname.startswith("data2"))
+    image1col = next(cname for cname in colnames if cname.startswith("image1") and "caption" not in cname)
+    image2col = next(cname for cname in colnames if cname.startswith("image2") and "caption" not in cname)
+    image1capcol = next(cname for cname in colnames if cname.startswith("image1") and "caption" in cname)
+    image2capcol = next(cname for cname in colnames if cname.startswith("image2") and "caption" in cname)
+    imgarrcol = next(cname for cname in colnames if cname.startswith("imagearrangement"))
+    notescol = next(cname for cname in colnames if cname.startswith("notes"))
+    omitcol = next(cname for cname in colnames if cname.startswith("omit"))
+    instructorcommentscol = next(cname for cname in colnames
+                                 if cname.startswith("instructor") and "comments" in cname)
+
+    # currently omitted/incomplete (no topic or difficulty) questions are not even included
+    # in the question bank; this might be worth changing in future
+    keep = (df[omitcol] == "") & (df[topiccol] != "") & (df[diffcol] != "")
+    df = df[keep]
+
+    # parse whole columns at once rather than row by row (see makedate for the per-value equivalent)
+    datematches = df[datecompletedcol].str.extract("([0-9]{4}-[0-9]{2}-[0-9]{2})", expand=False)
+    parseddates = pd.to_datetime(datematches, format="%Y-%m-%d", errors="coerce")
+    datescompleted = [d.date() if not pd.isna(d) else None for d in parseddates]
+    typestexts = df[qtypescol].str.split(",")
+    questiontypes = [[qtype.strip() for qtype in types] if types != [""] else [] for types in typestexts]
+
+    for (uniqueid, topic, difficulty, source, datecompleted, qtypes, instr, data1, data2,
+         image1, image1caption, image2, image2caption, imagearrangement, notes, instrnotes) in zip(
+            df[uniqueidcol], df[topiccol], df[diffcol], df[sourcecol], datescompleted, questiontypes,
+            df[instrcol], df[data1col], df[data2col], df[image1col], df[image1capcol], df[image2col],
+            df[image2capcol], df[imgarrcol], df[notescol], df[instructorcommentscol]):
+
+        if topic not in allquestions.keys():
+            allquestions[topic] = {}
+        if difficulty not in allquestions[topic].keys():
+            allquestions[topic][difficulty] = []
+
+        currentq = Question(
+            uniqueid, topic, difficulty, source, datecompleted, qtypes,
+            instr, data1, data2, image1, image1caption, image2, image2caption, imagearrangement,
+            notes, False, instrnotes)
+        allquestions[topic][difficulty].append(currentq)
 
     return allquestions
 
@@ -127,67 +258,140 @@ def makedate(thedate):
         return returndate
 
 
-# Writes to binary file the current state of info re which students have had which questions on which exams
+# Returns the compact form of existingexams (as stored in the database, or older snapshot files): a dictionary with
+#   "exams": dictionary of studentID --> examtype --> [list of question uniqueids] and
+#   "questions": dictionary of uniqueid --> (topic, difficulty, source, [list of question types]),
+#   ie just enough about each question to check uniqueness constraints without the question bank
 # Parameters:   existingexams (dictionary of studentID --> examtype --> [list of Questions]):
 #                   questions that have been used for which students on which exam(s)
-#               existingexamsfilename (string): name of the file (ignoring timsetamp suffix)
-#                     where this data will be recorded for next generation
-#               existingexamsdir (string): absolute or relative path to directory containing existing exam data file
-#                    (default ".": current working dir)
-def recordexistingexamstofile(existingexams, existingexamsfilename, existingexamsdir="."):
+def compactexistingexams(existingexams):
+    exams = {}
+    questions = {}
+    for sid in existingexams.keys():
+        exams[sid] = {}
+        for extype, qs in existingexams[sid].items():
+            exams[sid][extype] = [q.uniqueid for q in qs]
+            for q in qs:
+                if q.uniqueid not in questions:
+                    questions[q.uniqueid] = (q.topic, q.difficulty, q.source, sorted(q.questiontypes))
+    return {HISTORYFORMATKEY: HISTORYFORMAT, "exams": exams, "questions": questions}
+
+
+# Returns the full dictionary of studentID --> examtype --> [list of Questions] for the given compact form
+#   (see compactexistingexams); each uniqueid is resolved to the corresponding Question in allquestions,
+#   or if it's no longer in the bank, to a Question with only the details that were stored
+# Parameters:   compactexams (dictionary): existing exams as returned by compactexistingexams
+#               allquestions (dictionary of topic --> difficulty --> [list of Questions]): the question bank
+#                   (default None: don't look anything up in the bank)
+def expandexistingexams(compactexams, allquestions=None):
+    qsbyid = {}
+    if allquestions is not None:
+        qsbyid = {q.uniqueid: q for topic in allquestions.keys()
+                  for diff in allquestions[topic].keys() for q in allquestions[topic][diff]}
+    for uniqueid, (topic, difficulty, source, questiontypes) in compactexams["questions"].items():
+        if uniqueid not in qsbyid.keys():
+            if allquestions is not None:
+                print("question " + uniqueid + " from existing exams is no longer in the question bank")
+            qsbyid[uniqueid] = Question(uniqueid, topic, difficulty, source, questiontypes=questiontypes)
+
+    existing = {}
+    for sid, sidexams in compactexams["exams"].items():
+        existing[sid] = {extype: [qsbyid[qid] for qid in qids] for extype, qids in sidexams.items()}
+    return existing
 
-    appendtopath = "/"
-    if existingexamsdir.endswith("/"):
-        appendtopath = ""
 
-    timestampedfilepath = existingexamsdir + appendtopath + \
-                          existingexamsfilename+datetime.now().strftime("%Y%m%d%H%M%S")
-    print("recording existing exams to "+timestampedfilepath)
-    with open(timestampedfilepath, "wb") as xfile:
-        pickle.dump(existingexams, xfile)
+# Returns the ExamStore (database) in which existing exams are kept, creating it if necessary
+# The first time this is called for a directory that only has snapshot files from before exams were kept
+#   in a database, the most recent snapshot is imported into the new database (snapshots are left as they are)
+# Parameters:   existingexamsfilename (string): name of the database file, without extension
+#               existingexamsdir (string): absolute or relative path to directory containing existing exam data
+#                   (default ".": current working dir)
+def openexamstore(existingexamsfilename, existingexamsdir="."):
+    dbpath = os.path.join(existingexamsdir, existingexamsfilename + HISTORYDBSUFFIX)
+    isnew = not os.path.isfile(dbpath)
+    store = examdb.ExamStore(dbpath)
+    if isnew:
+        compactexams = readexistingexamsfromsnapshot(existingexamsfilename + SNAPSHOTSUFFIX, existingexamsdir)
+        if compactexams is not None:
+            print("importing existing exams into " + dbpath)
+            store.importexams(compactexams)
+    return store
+
+
+# Writes to the existing exams database the current state of info re which students have had which questions
+#   on which exams (only exams that have changed since they were last recorded are written)
+# Parameters:   existingexams (dictionary of studentID --> examtype --> [list of Questions]):
+#                   questions that have been used for which students on which exam(s)
+#               existingexamsfilename (string): name of the database file (without extension)
+#                     where this data will be recorded for next generation
+#               existingexamsdir (string): absolute or relative path to directory containing existing exam data
+#                    (default ".": current working dir)
+#               examdetails (dictionary of (studentID, examtype) --> dictionary): optional details ("examdate" and
+#                   "tiers") to record for any of the exams (default None: no details)
+#               changed (iterable of (studentID, examtype)): the only exams that might have changed since they were
+#                   last recorded (default None: check them all)
+def recordexistingexamstofile(existingexams, existingexamsfilename, existingexamsdir=".", examdetails=None,
+                              changed=None):
+    store = openexamstore(existingexamsfilename, existingexamsdir)
+    numwritten = store.recordexams(existingexams, examdetails, changed)
+    store.close()
+    print("recorded " + str(numwritten) + " new or changed exam(s) to " + store.dbpath)
 
 
 # Returns the current state of info re which students have had which questions on which exams,
 #   as a (possibly empty) dictionary of studentID --> examtype --> [list of Questions]
-# Parameters:   existingexamsfilename (string): name of the file (ignoring timsetamp suffix)
+# Parameters:   existingexamsfilename (string): name of the database file (without extension)
 #                   where this data was stored at last generation
-#               existingexamsdir (string): absolute or relative path to directory containing existing exam data file
+#               existingexamsdir (string): absolute or relative path to directory containing existing exam data
 #                   (default ".": current working dir)
-def readexistingexamsfromfile(existingexamsfilename, existingexamsdir="."):
-    existing = {}
-
-    appendtopath = "/"
-    if existingexamsdir.endswith("/"):
-        appendtopath = ""
-
-    existingexamsfiles = [f for f in os.listdir(existingexamsdir) if f.startswith(existingexamsfilename)]
-    if len(existingexamsfiles) > 0:  # ie, some exams do exist already and we're not starting from scratch
-        # use the most recent one (all start with the same name so will be sorted by timestamp suffix)
-        mostrecentfilename = sorted(existingexamsfiles)[-1]
-        mostrecentfilepath = existingexamsdir + appendtopath + mostrecentfilename
-        print("reading existing exams from "+mostrecentfilepath)
-        if os.path.isfile(mostrecentfilepath):
-            with open(mostrecentfilepath, "rb") as xfile:
-                existing = pickle.load(xfile)
+#               allquestions (dictionary of topic --> difficulty --> [list of Questions]): the question bank
+#                   from which to fill in the stored question ids (default None: Questions will only have
+#                   the details needed for uniqueness checks)
+def readexistingexamsfromfile(existingexamsfilename, existingexamsdir=".", allquestions=None):
+    store = openexamstore(existingexamsfilename, existingexamsdir)
+    print("reading existing exams from " + store.dbpath)
+    existing = expandexistingexams(store.readexams(), allquestions)
+    store.close()
     return existing
 
 
-
-
-
-# Generate PDF from one .tex source, using XeLaTeX
-#   *** only use this if you are 100% confident the LaTeX is compilable; otherwise python and xetex both hang
+# Returns the info re which students have had which questions on which exams from the most recent snapshot file,
+#   in compact form (see compactexistingexams), or None if there are no snapshot files
+#   (exams used to be recorded in timestamped snapshot files, rather than in a database)
+# Parameters:   snapshotfilename (string): name of the snapshot files (ignoring timestamp suffix)
+#               existingexamsdir (string): absolute or relative path to directory containing snapshot files
+#                   (default ".": current working dir)
+def readexistingexamsfromsnapshot(snapshotfilename, existingexamsdir="."):
+    snapshotfiles = [f for f in os.listdir(existingexamsdir)
+                     if f.startswith(snapshotfilename) and f[len(snapshotfilename):].isdigit()]
+    if len(snapshotfiles) == 0:
+        return None
+    # use the most recent one (all start with the same name so will be sorted by timestamp suffix)
+    mostrecentfilepath = os.path.join(existingexamsdir, sorted(snapshotfiles)[-1])
+    print("reading existing exams from " + mostrecentfilepath)
+    with open(mostrecentfilepath, "rb") as xfile:
+        stored = pickle.load(xfile)
+    if HISTORYFORMATKEY not in stored.keys():
+        # older file with entire Questions in it
+        stored = compactexistingexams(stored)
+    return stored
+
+
+
+
+# Generate PDF from one .tex source, using XeLaTeX (with a time limit, so it can't hang; see examcompile)
+# Returns a dictionary describing the result (see examcompile.compiletex)
 # Parameters:   texsourcefile (string): path to the .tex file to compile
 def generatepdf(texsourcefile):
-    x = subprocess.call("xelatex " + texsourcefile)
-    if x != 0:
-        # never seem to get here, even if the source isn't compilable...
+    import examcompile  # see readconfigfile
+    result = examcompile.compilealltex([texsourcefile])[0]
+    if result["status"] != examcompile.STATUS_OK:
         print("something went wrong with file  " + texsourcefile + " ... :(")
+    return result
 
 
 # Looks for a command-line argument with the path to a config file;
 #   if not found, asks user for input
-# Sets random seed
 # Returns:  questionspath (string): path to .tsv file containing exam questions
 #           signupspath (string): path to .tsv file containing timeslot signup info
 #           hassignupslots (boolean): True iff students are scheduled for various days/times (as per signupspath)
@@ -204,6 +408,25 @@ def generatepdf(texsourcefile):
 #           difficulties (list of strings): difficulties to include in exam (one entry per question)
 #           specifictopicdiffpairs (list of 2-tuples of strings): which topics *must* go with certain difficulties
 #           wildcardtopics (list of strings): topics from which to draw wildcard question(s), if applicable
+#           rubric (string): the line of text that should be printed at the bottom of each page
+#           options (dictionary of string --> value): settings for optional features, each with a default if it's
+#               not in the config file:
+#               "workers" (integer): number of processes to generate exam days in parallel (default 1: no parallelism)
+#               "randomseed" (string): seed from which to derive each student's random choices, for reproducible
+#                   exams (default None: exams are chosen randomly each time)
+#               "planner" (string): PLANNER_GREEDY to choose each student's exam in turn, or PLANNER_JOINT to choose
+#                   all of a session's exams together (default PLANNER_GREEDY)
+#               "compile" (boolean): whether to compile the generated .tex files to pdf (default False)
+#               "compileworkers" (integer): how many .tex files to compile at once (default None: one per CPU core)
+#               "compiletimeout" (number): seconds after which to give up compiling any one file
+#               "archive" (string): "zip" or "tar" to write all generated files into one archive of that kind
+#                   instead of a folder (default None: a folder)
+#               "export" (string): format in which to also export every question assignment (see examexport)
+#                   (default None: don't)
+#               "repeatcombos" (boolean): whether an exam that can't otherwise be filled may have more questions of a
+#                   topic/difficulty combination than it has distinct questions, so that some may repeat (default False)
+#               "runreport" (boolean): whether to time each phase of the run and count how often question selection
+#                   had to fall back, and write it all to a JSON report (see exammetrics) (default False)
 def getconfig():
     configpath = ""
     if len(sys.argv) > 1:
@@ -216,8 +439,45 @@ def getconfig():
         else:
             print("\n" + "File not found in config directory. Please try again.")
 
+    config = readconfigfile(configpath)
+
+    # TODO - should this choice be moved to the config file?
+    filestructure = ""
+    while filestructure == "":
+        userinput = input(
+            "Do you want all of one day's exams in a single pdf (enter 'b' for batch) \n" +
+            "or would you prefer each student's exam in its own file (enter 's' for separate)? \n"
+        )
+        if userinput == "b" or userinput == "s":
+            filestructure = userinput
+        else:
+            print("\n" + "Not a valid response. Please try again.")
+    onefileperstudent = False
+    if filestructure == "s":
+        onefileperstudent = True
+
+    if len(config["topics"]) != len(config["diffs"]):
+        print("Failed reading config file: unequal numbers of topics vs difficulties.")
+        print("Exiting...")
+        sys.exit(1)
+
+    return config["questionsfile"], config["signupsfile"], config["hassignupslots"], config["course"], \
+        config["examtype"], config["examdate"], config["studentgroups"], onefileperstudent, \
+        config["generateexamsuptodate"], config["ordering"], config["topics"], config["diffs"], \
+        config["topicdiffpairs"], config["wildtopics"], config["rubric"], config["options"]
+
+
+# Returns the settings in the given config file (without asking anything; see getconfig) as a dictionary with the
+#   keys "questionsfile", "signupsfile", "hassignupslots", "course", "examtype", "examdate", "studentgroups",
+#   "generateexamsuptodate", "ordering", "topics", "diffs", "topicdiffpairs", "wildtopics", "rubric" and "options",
+#   each as described for getconfig
+# Parameters:   configpath (string): path to the config file
+def readconfigfile(configpath):
+    # these are only needed for reading a config, so examutils doesn't pay for them at startup
+    import examcompile
+    import examarchive
+    import examexport
     # default values, in case any info is missing from the config file (some are functional / some not)
-    randomseed = "wugz"
     questionsfile = ""
     signupsfile = ""
     hassignupslots = True
@@ -237,6 +497,18 @@ def getconfig():
     topicdiffpairs = []
     wildtopics = []
     rubric = ""
+    options = {
+        "workers": 1,
+        "randomseed": None,
+        "planner": PLANNER_GREEDY,
+        "compile": False,
+        "compileworkers": None,
+        "compiletimeout": examcompile.COMPILETIMEOUT,
+        "archive": None,
+        "export": None,
+        "repeatcombos": False,
+        "runreport": False,
+    }
 
     # info tags that identify each line in the config file
     questionstag = "questions:"
@@ -251,6 +523,14 @@ def getconfig():
     difftag = "difficulties:"
     wildtag = "wildcard topics:"
     rubrictag = "rubric:"
+    workerstag = "parallel workers:"
+    plannertag = "question planner:"
+    compiletag = "compile pdfs:"
+    compiletimeouttag = "compile timeout:"
+    archivetag = "archive output:"
+    exporttag = "export assignments:"
+    repeatcombostag = "repeat combinations:"
+    runreporttag = "run report:"
 
     with io.open(configpath, "r", encoding="utf-8") as cfile:
         cline = cfile.readline()
@@ -287,7 +567,7 @@ def getconfig():
             elif cline.startswith(randomseedtag):
                 txt = cline[len(randomseedtag):].strip()
                 if len(txt) > 0:
-                    randomseed = txt
+                    options["randomseed"] = txt
             elif cline.startswith(genuptodatetag):
                 txt = cline[len(genuptodatetag):].strip()
                 if len(txt) > 0:
@@ -324,35 +604,82 @@ def getconfig():
                 txt = cline[len(rubrictag):].strip()
                 if len(txt) > 0:
                     rubric = txt
+            elif cline.startswith(workerstag):
+                txt = cline[len(workerstag):].strip()
+                if txt == "auto":
+                    options["workers"] = os.cpu_count() or 1
+                elif len(txt) > 0:
+                    options["workers"] = max(1, int(txt))
+            elif cline.startswith(plannertag):
+                txt = cline[len(plannertag):].strip()
+                if txt in [PLANNER_GREEDY, PLANNER_JOINT]:
+                    options["planner"] = txt
+                elif len(txt) > 0:
+                    print("Failed reading config file: question planner must be " + PLANNER_GREEDY +
+                          " or " + PLANNER_JOINT + ".")
+                    print("Exiting...")
+                    sys.exit(1)
+            elif cline.startswith(compiletag):
+                # eg "yes", or "yes 4" to compile at most four files at once
+                items = cline[len(compiletag):].split()
+                if len(items) > 0:
+                    options["compile"] = items[0].lower() in ["yes", "y", "true"]
+                if len(items) > 1:
+                    options["compileworkers"] = max(1, int(items[1]))
+            elif cline.startswith(compiletimeouttag):
+                txt = cline[len(compiletimeouttag):].strip()
+                if len(txt) > 0:
+                    options["compiletimeout"] = float(txt)
+            elif cline.startswith(archivetag):
+                txt = cline[len(archivetag):].strip().lower()
+                if txt in [examarchive.ARCHIVE_ZIP, examarchive.ARCHIVE_TAR]:
+                    options["archive"] = txt
+                elif len(txt) > 0 and txt != "no":
+                    print("Failed reading config file: archive output must be " + examarchive.ARCHIVE_ZIP +
+                          " or " + examarchive.ARCHIVE_TAR + ".")
+                    print("Exiting...")
+                    sys.exit(1)
+            elif cline.startswith(exporttag):
+                txt = cline[len(exporttag):].strip().lower()
+                if txt in examexport.EXPORTFORMATS:
+                    options["export"] = txt
+                elif len(txt) > 0 and txt != "no":
+                    print("Failed reading config file: export assignments must be one of " +
+                          ", ".join(examexport.EXPORTFORMATS) + ".")
+                    print("Exiting...")
+                    sys.exit(1)
+                if options["export"] == examexport.EXPORT_PARQUET and examexport.getparquetengine() is None:
+                    print("Exporting assignments to " + examexport.EXPORT_PARQUET + " needs one of these packages " +
+                          "installed: " + ", ".join(examexport.PARQUETENGINES) + " (eg pip install pyarrow).")
+                    print("Exiting...")
+                    sys.exit(1)
+            elif cline.startswith(repeatcombostag):
+                txt = cline[len(repeatcombostag):].strip().lower()
+                options["repeatcombos"] = txt in ["yes", "y", "true"]
+            elif cline.startswith(runreporttag):
+                txt = cline[len(runreporttag):].strip().lower()
+                options["runreport"] = txt in ["yes", "y", "true"]
 
             cline = cfile.readline()
 
-    # for repeatable results - currently not using because randomization is helping avoid repeated errors
-    # random.seed(randomseed)
+    return {"questionsfile": questionsfile, "signupsfile": signupsfile, "hassignupslots": hassignupslots,
+            "course": course, "examtype": examtype, "examdate": examdate, "studentgroups": studentgroups,
+            "generateexamsuptodate": generateexamsuptodate, "ordering": ordering, "topics": topics, "diffs": diffs,
+            "topicdiffpairs": topicdiffpairs, "wildtopics": wildtopics, "rubric": rubric, "options": options}
 
-    # TODO - should this choice be moved to the config file?
-    filestructure = ""
-    while filestructure == "":
-        userinput = input(
-            "Do you want all of one day's exams in a single pdf (enter 'b' for batch) \n" +
-            "or would you prefer each student's exam in its own file (enter 's' for separate)? \n"
-        )
-        if userinput == "b" or userinput == "s":
-            filestructure = userinput
-        else:
-            print("\n" + "Not a valid response. Please try again.")
-    onefileperstudent = False
-    if filestructure == "s":
-        onefileperstudent = True
 
-    if len(topics) != len(diffs):
-        print("Failed reading config file: unequal numbers of topics vs difficulties.")
-        print("Exiting...")
-        sys.exit(1)
 
-    return questionsfile, signupsfile, hassignupslots, course, examtype, examdate, \
-        studentgroups, onefileperstudent, generateexamsuptodate, ordering, \
-        topics, diffs, topicdiffpairs, wildtopics, rubric
+# Returns a dictionary of studentID --> set of studentIDs who are in at least one group with that student
+#   (across every group they belong to)
+# Parameters:   studentgroups (list of list of strings): each sublist indicates students who typically work together
+#                   (as returned by getconfig)
+def indexstudentgroups(studentgroups):
+    groupmembers = {}
+    for grp in studentgroups:
+        members = {x for x in grp if x != ""}
+        for sid in members:
+            groupmembers.setdefault(sid, set()).update(members - {sid})
+    return groupmembers
 
 
 # Returns all day/time/student info in file as a dictionary of date --> list of (time,studentid)
@@ -367,6 +694,7 @@ def getconfig():
 #                   ie, it's not an oral exam, with signup slots)
 #               generateuptodate (datetime.date): the date up to which exams should be generated
 def readsignupsfromfile(signupsfilepath, hassignupslots, examtype, examdate, generateuptodate):
+    import pandas as pd  # see parsequestionsfile
     signups = {}  # dictionary of date --> list of (time,studentid)
 
     with io.open(signupsfilepath, "r", encoding="utf-8") as sfile:
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import json
+import time
+from datetime import datetime
+import examselect
+
+
+# what each tier of relaxed question selection is counted as (see counttiers)
+TIERCOUNTERS = {
+    examselect.TIER_GROUPOVERLAP: "groupoverlaps",
+    examselect.TIER_REPEATSOURCE: "repeatedsources",
+    examselect.TIER_REPEATQTYPE: "repeatedqtypes",
+    examselect.TIER_ANYTHING: "anything",
+}
+
+# whether timings and counts are being collected at all (see enable); while they aren't, timer and count
+#   return straight away, so the calls can stay in place in the generation code
+enabled = False
+
+_phases = {}  # phase --> [total seconds, seconds not spent in other (nested) phases, number of times]
+_counters = {}  # counter --> total
+_bystudent = {}  # studentid --> counter --> total
+_byday = {}  # date (as a string) --> counter --> total
+_running = []  # timers currently running, innermost last
+_context = [None, None]  # studentid, date that counts are currently attributed to (see setcontext)
+_started = [0.0]  # time.perf_counter() when collecting started
+
+
+# Starts collecting timings and counts (from nothing)
+def enable():
+    global enabled
+    reset()
+    enabled = True
+    _started[0] = time.perf_counter()
+
+
+# Stops collecting timings and counts (what has been collected so far is kept; see reset)
+def disable():
+    global enabled
+    enabled = False
+
+
+# Forgets all timings and counts collected so far (but keeps collecting them if enabled)
+def reset():
+    _phases.clear()
+    _counters.clear()
+    _bystudent.clear()
+    _byday.clear()
+    del _running[:]
+    _context[0] = None
+    _context[1] = None
+
+
+# this class times one phase of a run (see timer); time spent in a phase that starts while it's running
+#   counts towards both, but only towards the inner one's own time ("selfseconds" in the report)
+class PhaseTimer:
+
+    # Parameters:   phase (string): name of the phase being timed
+    def __init__(self, phase):
+        self.phase = phase
+        self.start = 0.0
+        self.nestedseconds = 0.0
+
+    def __enter__(self):
+        _running.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exctype, excvalue, traceback):
+        elapsed = time.perf_counter() - self.start
+        if len(_running) > 0 and _running[-1] is self:
+            _running.pop()
+            if len(_running) > 0:
+                _running[-1].nestedseconds += elapsed
+        if self.phase not in _phases.keys():
+            _phases[self.phase] = [0.0, 0.0, 0]
+        _phases[self.phase][0] += elapsed
+        _phases[self.phase][1] += elapsed - self.nestedseconds
+        _phases[self.phase][2] += 1
+        return False
+
+
+# this class stands in for a PhaseTimer when nothing is being collected
+class NullTimer:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exctype, excvalue, traceback):
+        return False
+
+
+NULLTIMER = NullTimer()
+
+
+# Returns a context manager that adds the time spent in its with block to the given phase
+#   (or does nothing at all, if timings aren't being collected)
+# Parameters:   phase (string): name of the phase being timed, eg "selection"
+def timer(phase):
+    if not enabled:
+        return NULLTIMER
+    return PhaseTimer(phase)
+
+
+# Sets the student and exam day that counts are attributed to from now on (as well as to the totals)
+# Parameters:   sid (string): student id whose exam is being chosen (None: no student)
+#               day (date object): date of that exam (None: no day)
+def setcontext(sid=None, day=None):
+    if not enabled:
+        return
+    _context[0] = sid
+    _context[1] = day
+
+
+# Adds to the given counter: to its total, and to the current student's and day's (see setcontext)
+# Parameters:   counter (string): name of the counter, eg "combobacktracks"
+#               amount (integer): how much to add to it
+def count(counter, amount=1):
+    if not enabled or amount == 0:
+        return
+    _counters[counter] = _counters.get(counter, 0) + amount
+    sid, day = _context
+    if sid is not None:
+        studentcounts = _bystudent.setdefault(sid, {})
+        studentcounts[counter] = studentcounts.get(counter, 0) + amount
+    if day is not None:
+        daycounts = _byday.setdefault(str(day), {})
+        daycounts[counter] = daycounts.get(counter, 0) + amount
+
+
+# Counts one exam chosen with the given tiers: "exams", "questions", "fallbacks" (questions for which uniqueness
+#   constraints had to be relaxed at all), one of TIERCOUNTERS for each of those, and "noquestions" for any
+#   slot that couldn't be filled
+# Parameters:   tiers (list of integers): the tier at which each question was chosen (see examselect.TIER_*)
+#               numslots (integer): how many questions the exam was supposed to have
+def counttiers(tiers, numslots):
+    if not enabled:
+        return
+    count("exams")
+    count("questions", len(tiers))
+    count("noquestions", numslots - len(tiers))
+    for tier in tiers:
+        if tier is not None and tier > examselect.TIER_STRICT:
+            count("fallbacks")
+            count(TIERCOUNTERS[tier])
+
+
+# Returns everything collected so far, as plain data that can be sent between processes (see mergestate)
+def getstate():
+    return {
+        "phases": {phase: list(entry) for phase, entry in _phases.items()},
+        "counters": dict(_counters),
+        "bystudent": {sid: dict(counts) for sid, counts in _bystudent.items()},
+        "byday": {day: dict(counts) for day, counts in _byday.items()},
+    }
+
+
+# Adds timings and counts collected elsewhere (eg by a worker process) to the ones collected here
+# Parameters:   state (dictionary): as returned by getstate
+def mergestate(state):
+    for phase, entry in state["phases"].items():
+        if phase not in _phases.keys():
+            _phases[phase] = [0.0, 0.0, 0]
+        for i in range(len(entry)):
+            _phases[phase][i] += entry[i]
+    for counter, amount in state["counters"].items():
+        _counters[counter] = _counters.get(counter, 0) + amount
+    for bykey, counts in [(_bystudent, state["bystudent"]), (_byday, state["byday"])]:
+        for key, keycounts in counts.items():
+            mine = bykey.setdefault(key, {})
+            for counter, amount in keycounts.items():
+                mine[counter] = mine.get(counter, 0) + amount
+
+
+# Returns a dictionary describing everything collected so far, ready to be written as JSON
+# Parameters:   run (dictionary): anything else to include about this run, eg its settings (default None: nothing)
+def getreport(run=None):
+    if run is None:
+        run = {}
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(time.perf_counter() - _started[0], 6),
+        "run": run,
+        "phases": {phase: {"seconds": round(entry[0], 6), "selfseconds": round(entry[1], 6), "calls": entry[2]}
+                   for phase, entry in sorted(_phases.items())},
+        "counters": dict(sorted(_counters.items())),
+        "bystudent": {sid: dict(sorted(counts.items())) for sid, counts in sorted(_bystudent.items())},
+        "byday": {day: dict(sorted(counts.items())) for day, counts in sorted(_byday.items())},
+    }
+
+
+# Writes the report (see getreport) to a JSON file and prints a summary of it
+# Parameters:   reportpath (string): the file to write
+#               run (dictionary): see getreport (default None: nothing)
+def writereport(reportpath, run=None):
+    report = getreport(run)
+    with open(reportpath, "w", encoding="utf-8") as reportf:
+        json.dump(report, reportf, indent=2)
+    print("run report written to " + reportpath + " (" + str(round(report["seconds"], 3)) + "s in all)")
+    for phase, entry in report["phases"].items():
+        print("\t" + phase + ": " + str(round(entry["selfseconds"], 3)) + "s (" + str(entry["calls"]) + " call(s))")
+    for counter, amount in report["counters"].items():
+        print("\t" + counter + ": " + str(amount))
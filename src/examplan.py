@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import random
+import time
+import examselect
+
+
+# how long the repair passes may run in total, in seconds (the initial assignment always completes)
+MAXREPAIRSECONDS = 5.0
+# how many times to go over all the relaxed questions looking for improvements
+MAXREPAIRPASSES = 10
+
+
+# this class chooses the questions for every pending exam of one exam session together, rather than one student
+# at a time in schedule order: first every exam is filled in (most constrained students first, always taking one of
+# the least-used eligible questions), and then questions that needed relaxed uniqueness constraints are repaired
+# by trying other questions for them and by trading questions with group members, until nothing improves
+class JointPlanner:
+
+    # Parameters:   examtype (string): the exam type being planned
+    #               groupmembers (dictionary of studentid --> set of studentids): each student's fellow group members
+    #               existingexams (dictionary of studentID --> examtype --> [list of Questions]):
+    #                   exams that have already been generated (these are never changed)
+    #               seenids (dictionary of studentid --> set of strings): uniqueids each student has already seen
+    #               seensources (dictionary of studentid --> set of strings): sources each student has already seen
+    #               rng (random.Random, or the random module itself): source of randomness
+    def __init__(self, examtype, groupmembers, existingexams, seenids, seensources, rng=random):
+        self.examtype = examtype
+        self.groupmembers = groupmembers
+        self.existingexams = existingexams
+        self.seenids = seenids
+        self.seensources = seensources
+        self.rng = rng
+
+        self.exams = {}  # studentid --> dictionary of this student's planned exam (see addexam)
+        self.usage = examselect.UsageCounts()  # how many exams (existing or planned) each question is on
+        self.groupcounts = {}  # studentid --> uniqueid --> number of group members' exams of this type it's on
+        self.report = {}
+        for sid in existingexams.keys():
+            for questions in existingexams[sid].values():
+                for q in questions:
+                    self.usage.add(q.uniqueid)
+
+    # Returns True iff an exam for the given student is already part of this plan
+    # Parameters:   sid (string): the student id to check for
+    def hasexam(self, sid):
+        return sid in self.exams.keys()
+
+    # Adds an exam with the given (already arranged) topics and difficulties to the plan
+    # Parameters:   sid (string): the student id whose exam this is
+    #               selector (examselect.QuestionSelector): the questions eligible for this student's exam
+    #               topicsorder (list of strings): the topic of each question on the exam, in order
+    #               diffsorder (list of strings): the difficulty of each question on the exam, in order
+    def addexam(self, sid, selector, topicsorder, diffsorder):
+        self.exams[sid] = {
+            "selector": selector,
+            "topics": list(topicsorder),
+            "diffs": list(diffsorder),
+            "questions": [None] * len(topicsorder),
+            "tiers": [None] * len(topicsorder),
+        }
+        groupcount = {}
+        for other in self.groupmembers.get(sid, ()):
+            for q in self.existingexams.get(other, {}).get(self.examtype, []):
+                groupcount[q.uniqueid] = groupcount.get(q.uniqueid, 0) + 1
+        self.groupcounts[sid] = groupcount
+
+    # Puts the given question in the given slot of sid's exam, updating usage and group members' counts
+    # Parameters:   sid (string): the student id whose exam to change
+    #               idx (integer): the position on the exam
+    #               question (Question): the question to put there
+    #               tier (integer): how far constraints were relaxed for it (see examselect.TIER_* constants)
+    def assign(self, sid, idx, question, tier):
+        exam = self.exams[sid]
+        exam["questions"][idx] = question
+        exam["tiers"][idx] = tier
+        self.usage.add(question.uniqueid)
+        for other in self.groupmembers.get(sid, ()):
+            if other in self.groupcounts.keys():
+                othercount = self.groupcounts[other]
+                othercount[question.uniqueid] = othercount.get(question.uniqueid, 0) + 1
+
+    # Empties the given slot of sid's exam; returns the 2-tuple (question, tier) that was there
+    # Parameters:   sid (string): the student id whose exam to change
+    #               idx (integer): the position on the exam
+    def unassign(self, sid, idx):
+        exam = self.exams[sid]
+        question, tier = exam["questions"][idx], exam["tiers"][idx]
+        exam["questions"][idx] = None
+        exam["tiers"][idx] = None
+        self.usage.add(question.uniqueid, -1)
+        for other in self.groupmembers.get(sid, ()):
+            if other in self.groupcounts.keys():
+                othercount = self.groupcounts[other]
+                othercount[question.uniqueid] -= 1
+                if othercount[question.uniqueid] == 0:
+                    del othercount[question.uniqueid]
+        return question, tier
+
+    # Returns a 2-tuple (Question, tier) for the (empty) given slot of sid's exam, given everything else in the plan;
+    #   see examselect.QuestionSelector.selectquestion
+    # Parameters:   sid (string): the student id whose exam this is
+    #               idx (integer): the position on the exam
+    #               excludedids (set of strings): uniqueids that must not be picked
+    def selectforslot(self, sid, idx, excludedids=frozenset()):
+        exam = self.exams[sid]
+        return exam["selector"].selectquestion(
+            exam["topics"][idx], exam["diffs"][idx],
+            [q for q in exam["questions"] if q is not None],
+            groupids=self.groupcounts[sid].keys(),
+            seenids=self.seenids.get(sid, set()),
+            seensources=self.seensources.get(sid, set()),
+            rng=self.rng,
+            usage=self.usage,
+            excludedids=excludedids
+        )
+
+    # Returns the tier that the given question would have in the (empty) given slot of sid's exam,
+    #   or None if it isn't eligible for that slot at all
+    # Parameters:   sid (string): the student id whose exam this is
+    #               idx (integer): the position on the exam
+    #               question (Question): the question to check
+    def gettierforslot(self, sid, idx, question):
+        exam = self.exams[sid]
+        return exam["selector"].gettier(
+            question, exam["topics"][idx], exam["diffs"][idx],
+            [q for q in exam["questions"] if q is not None],
+            groupids=self.groupcounts[sid].keys(),
+            seenids=self.seenids.get(sid, set()),
+            seensources=self.seensources.get(sid, set())
+        )
+
+    # Tries to lower the tier of the given slot of sid's exam, first by choosing again now that the rest of the
+    #   plan is known, then by trading with a group member who holds a question that would be better here
+    #   (as long as the two tiers together go down); returns True iff the slot was improved
+    # Parameters:   sid (string): the student id whose exam this is
+    #               idx (integer): the position on the exam
+    def repairslot(self, sid, idx):
+        oldq, oldtier = self.unassign(sid, idx)
+        newq, newtier = self.selectforslot(sid, idx)
+        if newq is not None and newtier < oldtier:
+            self.assign(sid, idx, newq, newtier)
+            return True
+
+        for other in sorted(self.groupmembers.get(sid, ())):
+            if other not in self.exams.keys():
+                continue
+            otherexam = self.exams[other]
+            exam = self.exams[sid]
+            for otheridx, otherq in enumerate(otherexam["questions"]):
+                if otherq is None or not exam["selector"].iscandidate(otherq, exam["topics"][idx], exam["diffs"][idx]):
+                    continue
+                otherq, othertier = self.unassign(other, otheridx)
+                tierhere = self.gettierforslot(sid, idx, otherq)
+                if tierhere is not None and tierhere < oldtier:
+                    replacement, replacementtier = self.selectforslot(other, otheridx, {otherq.uniqueid})
+                    if replacement is not None and tierhere + replacementtier < oldtier + othertier:
+                        self.assign(other, otheridx, replacement, replacementtier)
+                        # the replacement might have made otherq worse here; check again before committing
+                        tierhere = self.gettierforslot(sid, idx, otherq)
+                        if tierhere + replacementtier < oldtier + othertier:
+                            self.assign(sid, idx, otherq, tierhere)
+                            return True
+                        self.unassign(other, otheridx)
+                self.assign(other, otheridx, otherq, othertier)
+
+        self.assign(sid, idx, oldq, oldtier)
+        return False
+
+    # Returns a dictionary of tier --> number of planned questions chosen at that tier
+    def counttiers(self):
+        counts = {}
+        for exam in self.exams.values():
+            for tier in exam["tiers"]:
+                if tier is not None:
+                    counts[tier] = counts.get(tier, 0) + 1
+        return counts
+
+    # Chooses questions for every exam in the plan;
+    #   returns a dictionary of studentid --> (list of Questions, list of tiers) for each exam
+    def solve(self):
+        starttime = time.perf_counter()
+
+        # students with the most group members are the hardest to fit, so they go first
+        sids = sorted(self.exams.keys(), key=lambda s: len(self.groupmembers.get(s, ())), reverse=True)
+        for sid in sids:
+            for idx in range(len(self.exams[sid]["topics"])):
+                question, tier = self.selectforslot(sid, idx)
+                if question is not None:
+                    self.assign(sid, idx, question, tier)
+                else:
+                    exam = self.exams[sid]
+                    print("there are no questions at all for " + exam["topics"][idx] + " / " + exam["diffs"][idx])
+        tiersbefore = self.counttiers()
+
+        numrepairs = 0
+        numpasses = 0
+        outoftime = False
+        while numpasses < MAXREPAIRPASSES and not outoftime:
+            numpasses += 1
+            relaxed = [(sid, idx) for sid in sids for idx, tier in enumerate(self.exams[sid]["tiers"])
+                       if tier is not None and tier > examselect.TIER_STRICT]
+            # the most relaxed questions are the most worth fixing
+            relaxed.sort(key=lambda slot: self.exams[slot[0]]["tiers"][slot[1]], reverse=True)
+            repairedthispass = 0
+            for sid, idx in relaxed:
+                if time.perf_counter() - starttime > MAXREPAIRSECONDS:
+                    outoftime = True
+                    break
+                if self.repairslot(sid, idx):
+                    repairedthispass += 1
+            numrepairs += repairedthispass
+            if repairedthispass == 0:
+                break
+
+        self.report = {
+            "exams": len(self.exams),
+            "questions": sum(len(exam["topics"]) for exam in self.exams.values()),
+            "tiersbefore": tiersbefore,
+            "tiersafter": self.counttiers(),
+            "repairs": numrepairs,
+            "passes": numpasses,
+            "outoftime": outoftime,
+            "seconds": round(time.perf_counter() - starttime, 3),
+        }
+
+        plan = {}
+        for sid, exam in self.exams.items():
+            plan[sid] = ([q for q in exam["questions"] if q is not None],
+                         [t for q, t in zip(exam["questions"], exam["tiers"]) if q is not None])
+        return plan
+
+    # Prints a summary of how many uniqueness constraints had to be relaxed, before and after repairs
+    def printreport(self):
+        print("planned " + str(self.report["questions"]) + " questions on " + str(self.report["exams"]) +
+              " exams together in " + str(self.report["seconds"]) + " seconds (" + str(self.report["repairs"]) +
+              " repairs over " + str(self.report["passes"]) + " passes" +
+              (", stopped early for time" if self.report["outoftime"] else "") + ")")
+        for tier in sorted(examselect.TIERNAMES.keys()):
+            before = self.report["tiersbefore"].get(tier, 0)
+            after = self.report["tiersafter"].get(tier, 0)
+            if before > 0 or after > 0:
+                print("\t" + examselect.TIERNAMES[tier] + ": " + str(before) + " before repairs, " + str(after) +
+                      " after")
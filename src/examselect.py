@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import bisect
+import random
+
+
+# relaxation tiers, from most to least stringent (see QuestionSelector.selectquestion)
+TIER_STRICT = 1  # unique source for this student, no overlap with group members, no repeated question type
+TIER_GROUPOVERLAP = 2  # allow overlap with group members
+TIER_REPEATSOURCE = 3  # allow a source this student has seen before (but not the exact question)
+TIER_REPEATQTYPE = 4  # allow a question type that's already on this exam
+TIER_ANYTHING = 5  # take whatever question we've got on hand (could even be one this student has seen before)
+# how each tier is described in reports
+TIERNAMES = {
+    TIER_STRICT: "all constraints met",
+    TIER_GROUPOVERLAP: "overlap with group member",
+    TIER_REPEATSOURCE: "repeated source",
+    TIER_REPEATQTYPE: "repeated question subtype",
+    TIER_ANYTHING: "whatever we've got on hand",
+}
+
+# when there are at least this many candidates, try this many random ones before checking them all
+#   (if none of them is eligible, every candidate is still checked, so a tier is only ever passed over when it's
+#   really empty; scanning every candidate for every pick makes choosing exams about ten times slower on a big bank,
+#   see exambench)
+QUICKPICKMINCANDIDATES = 64
+QUICKPICKTRIES = 8
+
+
+# this class indexes one pool of questions (eg, all questions dated before a certain cutoff) so that a question
+# satisfying the uniqueness constraints for an exam can be picked directly, rather than by repeated random draws
+class QuestionSelector:
+
+    # Parameters:   qspool (dictionary of topic --> difficulty --> [list of Questions]): the questions to index
+    def __init__(self, qspool):
+        self.candidates = {}  # (topic, difficulty) --> [list of Questions]
+        self.idsbysource = {}  # (topic, difficulty) --> source --> set of uniqueids
+        self.idsbyqtype = {}  # (topic, difficulty) --> question type --> set of uniqueids
+        self.ids = {}  # (topic, difficulty) --> set of uniqueids of the candidates
+        self.questionsbyid = {}  # uniqueid --> Question, for every candidate
+        self.availability = {}  # (topic, difficulty) --> number of questions
+
+        for topic in qspool.keys():
+            for difficulty in qspool[topic].keys():
+                self.addcandidates((topic, difficulty), qspool[topic][difficulty])
+            # also allow for questions of a given topic but any difficulty
+            self.addcandidates((topic, ""), [q for diff in qspool[topic].keys() for q in qspool[topic][diff]])
+
+    # Adds the given questions to the candidate list and exclusion indexes for one (topic, difficulty) key
+    # Parameters:   key (2-tuple of strings): the (topic, difficulty) whose candidates these are
+    #               questions (list of Questions): the questions to index under that key
+    def addcandidates(self, key, questions):
+        self.candidates[key] = list(questions)
+        self.availability[key] = len(self.candidates[key])
+        self.ids[key] = {q.uniqueid for q in self.candidates[key]}
+        self.questionsbyid.update((q.uniqueid, q) for q in self.candidates[key])
+        bysource = {}
+        byqtype = {}
+        for q in questions:
+            bysource.setdefault(q.source, set()).add(q.uniqueid)
+            for qtype in q.questiontypes:
+                byqtype.setdefault(qtype, set()).add(q.uniqueid)
+        self.idsbysource[key] = bysource
+        self.idsbyqtype[key] = byqtype
+
+    # Returns the list of Questions with the given topic and difficulty (empty if there are none)
+    # Parameters:   topic (string): the topic of the questions to return
+    #               difficulty (string): the difficulty of the questions to return; if empty, any difficulty
+    def getcandidates(self, topic, difficulty=""):
+        return self.candidates.get((topic, difficulty), [])
+
+    # Returns the set of uniqueids (among this topic/difficulty's candidates) that have one of the given keys
+    # Parameters:   index (dictionary of key --> set of uniqueids): one of this selector's exclusion indexes
+    #               keys (set of strings): sources or question types to exclude
+    def getexcludedids(self, index, keys):
+        excluded = set()
+        # only walk whichever of the two is smaller
+        if len(keys) < len(index):
+            for k in keys:
+                excluded.update(index.get(k, ()))
+        else:
+            for k, ids in index.items():
+                if k in keys:
+                    excluded.update(ids)
+        return excluded
+
+    # Returns a list of (tier, [list of sets of excluded uniqueids]) for the given topic and difficulty,
+    #   from the most stringent tier of constraints to the least
+    # Parameters:   key (2-tuple of strings): the (topic, difficulty) whose candidates are being considered
+    #               others: see selectquestion
+    def getexclusiontiers(self, key, qssofar, groupids, seenids, seensources, excludedids):
+        onthisexam = {q.uniqueid for q in qssofar} | set(excludedids)
+        qtypessofar = {qtype for q in qssofar for qtype in q.questiontypes}
+        qtypeclashes = self.getexcludedids(self.idsbyqtype[key], qtypessofar)
+        sourceclashes = self.getexcludedids(self.idsbysource[key], seensources)
+
+        return [
+            (TIER_STRICT, [onthisexam, qtypeclashes, groupids, sourceclashes]),
+            (TIER_GROUPOVERLAP, [onthisexam, qtypeclashes, sourceclashes]),
+            (TIER_REPEATSOURCE, [onthisexam, qtypeclashes, seenids]),
+            (TIER_REPEATQTYPE, [onthisexam, seenids]),
+            (TIER_ANYTHING, [onthisexam]),
+        ]
+
+    # Returns a 2-tuple (Question, tier) where Question is picked uniformly at random from among the candidates
+    #   of the given topic and difficulty that satisfy the most stringent tier of constraints possible,
+    #   and tier is that tier (see TIER_* constants); or (None, None) if there are no candidates at all
+    # Parameters:   topic (string): the topic of the question to select
+    #               difficulty (string): the difficulty of the question to select; if empty, any difficulty
+    #               qssofar (list of Questions): questions already on this exam
+    #               groupids (set of strings): uniqueids of questions on this student's group members' exams
+    #               seenids (set of strings): uniqueids of questions this student has seen on previous exams
+    #               seensources (set of strings): sources of questions this student has seen on previous exams
+    #               rng (random.Random, or the random module itself): source of randomness for the selection
+    #               usage (UsageCounts): how many exams each question is already on; if given, the pick is among
+    #                   the least-used questions eligible at that tier only (default None: ignore usage)
+    #               excludedids (set of strings): uniqueids that must not be picked at any tier
+    def selectquestion(self, topic, difficulty="", qssofar=(), groupids=frozenset(), seenids=frozenset(),
+                       seensources=frozenset(), rng=random, usage=None, excludedids=frozenset()):
+        key = (topic, difficulty)
+        candidates = self.getcandidates(topic, difficulty)
+        if len(candidates) == 0:
+            return None, None
+
+        exclusiontiers = self.getexclusiontiers(key, qssofar, groupids, seenids, seensources, excludedids)
+
+        if usage is not None:
+            for tier, exclusions in exclusiontiers:
+                leastused = usage.getleastused(self.ids[key], exclusions)
+                if len(leastused) > 0:
+                    return self.pickfrom(key, leastused, rng), tier
+
+        else:
+            # with lots of candidates, usually most of them meet every constraint, so try a few random ones before
+            #   checking them all (the first one that's eligible is still a uniformly random pick among those
+            #   eligible); not when balancing usage, as the least used of a few random ones isn't the least used
+            if len(candidates) >= QUICKPICKMINCANDIDATES:
+                tier, exclusions = exclusiontiers[0]
+                tried = [rng.choice(candidates) for i in range(QUICKPICKTRIES)]
+                eligible = [q for q in tried if not any(q.uniqueid in excluded for excluded in exclusions)]
+                if len(eligible) > 0:
+                    return eligible[0], tier
+
+            for tier, exclusions in exclusiontiers:
+                eligible = [q for q in candidates if not any(q.uniqueid in excluded for excluded in exclusions)]
+                if len(eligible) > 0:
+                    return rng.choice(eligible), tier
+
+        # every candidate is already on this exam; nothing else we can do
+        eligible = [q for q in candidates if q.uniqueid not in excludedids]
+        if len(eligible) == 0:
+            return None, None
+        return rng.choice(eligible), TIER_ANYTHING
+
+    # Returns a Question picked uniformly at random from among the candidates of the given key with the given ids
+    #   (the same one every time for the same state of rng, whatever order the set of ids is in)
+    # Parameters:   key (2-tuple of strings): the (topic, difficulty) whose candidates to pick from
+    #               ids (non-empty set of strings): uniqueids of the candidates that may be picked
+    #               rng (random.Random, or the random module itself): source of randomness for the selection
+    def pickfrom(self, key, ids, rng):
+        candidates = self.candidates[key]
+        # a few random candidates first (see QUICKPICKTRIES), as sorting lots of ids takes longer
+        for i in range(QUICKPICKTRIES):
+            question = rng.choice(candidates)
+            if question.uniqueid in ids:
+                return question
+        return self.questionsbyid[rng.choice(sorted(ids))]
+
+    # Returns True iff the given question is one of the candidates for the given topic and difficulty
+    # Parameters:   question (Question): the question to check
+    #               topic (string): the topic of the candidates
+    #               difficulty (string): the difficulty of the candidates; if empty, any difficulty
+    def iscandidate(self, question, topic, difficulty=""):
+        key = (topic, difficulty)
+        return key in self.idsbysource.keys() and question.uniqueid in self.idsbysource[key].get(question.source, ())
+
+    # Returns the most stringent tier (see TIER_* constants) whose constraints the given question satisfies
+    #   for the given topic and difficulty, or None if it isn't one of the candidates for them at all
+    # Parameters:   question (Question): the question to check
+    #               others: see selectquestion
+    def gettier(self, question, topic, difficulty="", qssofar=(), groupids=frozenset(), seenids=frozenset(),
+                seensources=frozenset()):
+        key = (topic, difficulty)
+        if not self.iscandidate(question, topic, difficulty):
+            return None
+        for tier, exclusions in self.getexclusiontiers(key, qssofar, groupids, seenids, seensources, ()):
+            if not any(question.uniqueid in excluded for excluded in exclusions):
+                return tier
+        return TIER_ANYTHING
+
+
+# this class counts how many exams each question is on, keeping the questions grouped by that count so that the
+# least used of a set of questions can be found without looking up every one of them (see getleastused)
+class UsageCounts:
+
+    # Parameters:   counts (dictionary of uniqueid --> integer): how many exams each question is on to begin with
+    def __init__(self, counts={}):
+        self.counts = {}  # uniqueid --> number of exams it's on, for questions on at least one
+        self.levels = {}  # number of exams --> set of uniqueids on exactly that many
+        for uniqueid, count in counts.items():
+            self.add(uniqueid, count)
+
+    # Returns how many exams the given question is on
+    # Parameters:   uniqueid (string): the question to look up
+    def get(self, uniqueid):
+        return self.counts.get(uniqueid, 0)
+
+    # Changes how many exams the given question is on
+    # Parameters:   uniqueid (string): the question whose count to change
+    #               amount (integer): how many exams to add (or, if negative, to take away)
+    def add(self, uniqueid, amount=1):
+        old = self.counts.get(uniqueid, 0)
+        new = old + amount
+        if old > 0:
+            self.levels[old].discard(uniqueid)
+            if len(self.levels[old]) == 0:
+                del self.levels[old]
+        if new > 0:
+            self.counts[uniqueid] = new
+            self.levels.setdefault(new, set()).add(uniqueid)
+        elif old > 0:
+            del self.counts[uniqueid]
+
+    # Returns the set of those of the given uniqueids not in any of the exclusions that are on the fewest exams
+    #   (empty only if every one of them is excluded); done with set operations rather than by looking up each
+    #   question in turn, to stay quick with lots of questions
+    # Parameters:   ids (set of strings): the uniqueids to choose from
+    #               exclusions (list of sets of strings): uniqueids that mustn't be chosen
+    def getleastused(self, ids, exclusions=()):
+        unused = ids.difference(self.counts, *exclusions)
+        if len(unused) > 0:
+            return unused
+        for level in sorted(self.levels.keys()):
+            atlevel = self.levels[level].intersection(ids).difference(*exclusions)
+            if len(atlevel) > 0:
+                return atlevel
+        return set()
+
+
+# this class indexes a question bank by date completed, so that the pool of questions dated on or before
+# a given cutoff can be built by bisection (and is only built once per cutoff)
+class DatedQuestionIndex:
+
+    # Parameters:   allquestions (dictionary of topic --> difficulty --> [list of Questions]): the questions to index
+    def __init__(self, allquestions):
+        self.buckets = {}  # (topic, difficulty) --> [list of Questions], sorted by date completed
+        self.bucketdates = {}  # (topic, difficulty) --> [list of dates], parallel to self.buckets
+        self.pools = {}  # cutoff date --> dictionary of topic --> difficulty --> [list of Questions]
+
+        for topic in allquestions.keys():
+            for difficulty in allquestions[topic].keys():
+                # undated questions are never eligible; sort is stable so bank order is kept within a date
+                datedqs = sorted([q for q in allquestions[topic][difficulty] if q.datecompleted is not None],
+                                 key=lambda q: q.datecompleted)
+                self.buckets[(topic, difficulty)] = datedqs
+                self.bucketdates[(topic, difficulty)] = [q.datecompleted for q in datedqs]
+
+    # Returns a dictionary of topic-->difficulty-->[list of Questions] that are dated no later than cutoff
+    #   (the same dictionary object is returned for repeated calls with the same cutoff, so don't modify it)
+    # Parameters:   cutoff (date object): the latest date completed to include
+    def getpool(self, cutoff):
+        if cutoff not in self.pools.keys():
+            pool = {}
+            for (topic, difficulty), datedqs in self.buckets.items():
+                numeligible = bisect.bisect_right(self.bucketdates[(topic, difficulty)], cutoff)
+                if numeligible > 0:
+                    pool.setdefault(topic, {})[difficulty] = datedqs[:numeligible]
+            self.pools[cutoff] = pool
+        return self.pools[cutoff]
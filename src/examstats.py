@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import sys
+import json
+from datetime import datetime
+import pandas as pd
+import examio
+import examdb
+import examselect
+from examio import EXISTINGEXAMSFILE
+
+
+# columns of the tables returned by ExamStore.readtablerows
+TABLECOLUMNS = {
+    "exams": ["examid", "sid", "examtype", "examdate"],
+    "examquestions": ["examid", "position", "uniqueid", "tier"],
+    "questions": ["uniqueid", "topic", "difficulty", "source", "questiontypes"],
+}
+# a question counts as over-exposed once it's been used this many times as often as the average question of its
+#   topic and difficulty (see getquestionusage)
+OVEREXPOSEDRATIO = 2.0
+# ... and has been used at least this many times (in a little-used topic and difficulty, one use can be a lot)
+OVEREXPOSEDMINUSES = 3
+# how many of the most over-exposed questions to list in the summary
+SUMMARYTOPQUESTIONS = 20
+# names of the files the statistics are saved to (see writestats)
+STATSFILES = {
+    "questions": "questionusage.tsv",
+    "cells": "cellexposure.tsv",
+    "sources": "sourceusage.tsv",
+    "qtypes": "questiontypeusage.tsv",
+    "tiers": "tiers.tsv",
+    "groupoverlaps": "groupoverlaps.tsv",
+}
+SUMMARYFILE = "summary.json"
+# command line flag to give the config file with the student groups (see main)
+CONFIGFLAG = "--config"
+
+
+# Returns a DataFrame with one row per question on each existing exam, with columns "sid", "examtype", "examdate"
+#   (datetime), "position", "uniqueid", "tier" (nullable integer), "topic", "difficulty", "source", "questiontypes"
+#   (separated by examdb.QTYPESEPARATOR)
+# Parameters:   store (examdb.ExamStore): the existing exams database
+def getassignmentstable(store):
+    rows = store.readtablerows()
+    tables = {name: pd.DataFrame.from_records(rows[name], columns=columns) for name, columns in TABLECOLUMNS.items()}
+    exams = tables["exams"]
+    exams["examdate"] = pd.to_datetime(exams["examdate"], format="%Y-%m-%d", errors="coerce")
+    assignments = tables["examquestions"].merge(exams, on="examid").merge(tables["questions"], on="uniqueid")
+    assignments = assignments.sort_values(["examid", "position"], ignore_index=True)
+    assignments["tier"] = assignments["tier"].astype("Int64")
+    return assignments[["sid", "examtype", "examdate", "position", "uniqueid", "tier", "topic", "difficulty",
+                        "source", "questiontypes"]]
+
+
+# Returns a DataFrame with one row per question in the question bank
+#   (columns "uniqueid", "topic", "difficulty", "source", "questiontypes" (separated by examdb.QTYPESEPARATOR))
+# Parameters:   allquestions (dictionary of topic --> difficulty --> [list of Questions]): the question bank
+def getbanktable(allquestions):
+    return pd.DataFrame.from_records(
+        [(q.uniqueid, q.topic, q.difficulty, q.source, examdb.QTYPESEPARATOR.join(sorted(q.questiontypes)))
+         for topic in allquestions.keys() for difficulty in allquestions[topic].keys()
+         for q in allquestions[topic][difficulty]],
+        columns=["uniqueid", "topic", "difficulty", "source", "questiontypes"])
+
+
+# Returns a DataFrame with one row per question that is in the bank or on any exam: how many times it's been used,
+#   by how many students, when it was first and last used, how many students have had it more than once, and its
+#   exposure, ie how many times it's been used compared with the average for questions of its topic and difficulty
+#   in the bank (1.0 = average; questions that aren't in the bank any more have no exposure); sorted by exposure
+# Parameters:   assignments (DataFrame): see getassignmentstable
+#               bank (DataFrame): see getbanktable
+def getquestionusage(assignments, bank):
+    byquestion = assignments.groupby("uniqueid")
+    usage = byquestion.agg(uses=("sid", "size"), students=("sid", "nunique"),
+                           firstexam=("examdate", "min"), lastexam=("examdate", "max"))
+    usage["repeats"] = usage["uses"] - usage["students"]
+    # details come from the bank where possible, and from the exams database for questions no longer in it
+    details = byquestion[["topic", "difficulty", "source", "questiontypes"]].first()
+    questions = bank.set_index("uniqueid")
+    questions["inbank"] = True
+    questions = pd.concat([questions, details[~details.index.isin(questions.index)]])
+    questions["inbank"] = questions["inbank"].fillna(False).astype(bool)
+    questions = questions.join(usage, how="left")
+    questions[["uses", "students", "repeats"]] = questions[["uses", "students", "repeats"]].fillna(0).astype(int)
+
+    inbank = questions[questions["inbank"]]
+    cellaverage = inbank.groupby(["topic", "difficulty"])["uses"].mean().rename("cellaverage")
+    questions = questions.join(cellaverage, on=["topic", "difficulty"])
+    questions["exposure"] = (questions["uses"] / questions["cellaverage"]).where(
+        questions["inbank"] & (questions["cellaverage"] > 0)).round(2)
+    questions = questions.drop(columns="cellaverage")
+    questions.index.name = "uniqueid"
+    return questions.sort_values(["exposure", "uses"], ascending=False, na_position="last").reset_index()
+
+
+# Returns a DataFrame with one row per topic and difficulty in the bank: how many questions there are,
+#   how many have been used, how many times altogether, on average, and at most
+# Parameters:   questionusage (DataFrame): see getquestionusage
+def getcellexposure(questionusage):
+    inbank = questionusage[questionusage["inbank"]]
+    cells = inbank.groupby(["topic", "difficulty"]).agg(
+        questions=("uniqueid", "size"), usedquestions=("uses", lambda uses: int((uses > 0).sum())),
+        uses=("uses", "sum"), usesperquestion=("uses", "mean"), maxuses=("uses", "max"))
+    cells["usesperquestion"] = cells["usesperquestion"].round(2)
+    cells["shareused"] = (cells["usedquestions"] / cells["questions"]).round(2)
+    return cells.reset_index()
+
+
+# Returns a DataFrame with one row per source in the bank or on any exam: how many of its questions are in the bank,
+#   how many times its questions have been used, and by how many students; sorted by uses
+# Parameters:   assignments (DataFrame): see getassignmentstable
+#               bank (DataFrame): see getbanktable
+def getsourceusage(assignments, bank):
+    sources = pd.concat([bank.groupby("source").size().rename("bankquestions"),
+                         assignments.groupby("source").agg(uses=("sid", "size"), students=("sid", "nunique"))],
+                        axis=1)
+    sources = sources.fillna(0).astype(int)
+    sources.index.name = "source"
+    return sources.sort_values("uses", ascending=False).reset_index()
+
+
+# Returns a DataFrame with one row per question type in the bank or on any exam: how many questions of that type are
+#   in the bank, and how many times they've been used; sorted by uses
+# Parameters:   questionusage (DataFrame): see getquestionusage
+def getqtypeusage(questionusage):
+    # one row per question rather than per use, so there's much less to split up
+    qtypes = questionusage[["questiontypes", "inbank", "uses"]].assign(
+        questiontype=questionusage["questiontypes"].str.split(examdb.QTYPESEPARATOR)).explode("questiontype")
+    qtypes = qtypes[qtypes["questiontype"].notna() & (qtypes["questiontype"] != "")]
+    qtypes = qtypes.groupby("questiontype").agg(bankquestions=("inbank", "sum"), uses=("uses", "sum")).astype(int)
+    return qtypes.sort_values("uses", ascending=False).reset_index()
+
+
+# Returns a DataFrame with one row per exam type and tier (see examselect.TIER_* constants): how many questions were
+#   chosen at that tier (questions chosen before tiers were recorded, or put there by hand, are "unknown")
+# Parameters:   assignments (DataFrame): see getassignmentstable
+def gettiercounts(assignments):
+    tiers = assignments.groupby(["examtype", "tier"], dropna=False).size().rename("questions").reset_index()
+    tiers.insert(2, "tiername", tiers["tier"].map(examselect.TIERNAMES).fillna("unknown"))
+    return tiers
+
+
+# Returns a DataFrame with one row per pair of students in a group together and exam type where their exams have
+#   questions in common: how many, and which (separated by spaces); sorted by how many
+# Parameters:   assignments (DataFrame): see getassignmentstable
+#               studentgroups (list of lists of strings): groups of students whose exams should not overlap
+def getgroupoverlaps(assignments, studentgroups):
+    pairs = pd.DataFrame.from_records(
+        sorted({(sid, othersid) for grp in studentgroups for sid in grp for othersid in grp
+                if "" < sid < othersid}),
+        columns=["sid", "othersid"])
+    questions = assignments[["sid", "examtype", "uniqueid"]].drop_duplicates()
+    shared = pairs.merge(questions, on="sid").merge(
+        questions.rename(columns={"sid": "othersid"}), on=["othersid", "examtype", "uniqueid"])
+    overlaps = shared.groupby(["sid", "othersid", "examtype"]).agg(
+        sharedquestions=("uniqueid", "size"), uniqueids=("uniqueid", lambda ids: " ".join(sorted(ids))))
+    return overlaps.sort_values("sharedquestions", ascending=False).reset_index()
+
+
+# Returns a dictionary summarizing the statistics, for saving as JSON
+# Parameters:   assignments, questionusage, tiers, groupoverlaps (DataFrames): see getassignmentstable,
+#                   getquestionusage, gettiercounts, getgroupoverlaps (groupoverlaps is None if the student groups
+#                   aren't known)
+def getsummary(assignments, questionusage, tiers, groupoverlaps=None):
+    inbank = questionusage[questionusage["inbank"]]
+    overexposed = inbank[(inbank["exposure"] >= OVEREXPOSEDRATIO) & (inbank["uses"] >= OVEREXPOSEDMINUSES)]
+    tiertotals = tiers.groupby("tiername")["questions"].sum()
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "exams": int(assignments[["sid", "examtype"]].drop_duplicates().shape[0]),
+        "students": int(assignments["sid"].nunique()),
+        "assignments": int(len(assignments)),
+        "bankquestions": int(len(inbank)),
+        "usedbankquestions": int((inbank["uses"] > 0).sum()),
+        "usedquestionsnotinbank": int((~questionusage["inbank"]).sum()),
+        "repeatsforsamestudent": int(questionusage["repeats"].sum()),
+        "groupoverlaps": None if groupoverlaps is None else int(groupoverlaps["sharedquestions"].sum()),
+        "tiers": {name: int(count) for name, count in tiertotals.items()},
+        "overexposedratio": OVEREXPOSEDRATIO,
+        "overexposedminuses": OVEREXPOSEDMINUSES,
+        "overexposedquestions": int(len(overexposed)),
+        "mostexposed": [
+            {"uniqueid": row.uniqueid, "topic": row.topic, "difficulty": row.difficulty, "uses": int(row.uses),
+             "exposure": float(row.exposure)}
+            for row in overexposed.head(SUMMARYTOPQUESTIONS).itertuples()],
+    }
+
+
+# Returns a dictionary of every statistic: a DataFrame for each key of STATSFILES, and "summary" (see getsummary)
+# Parameters:   store (examdb.ExamStore): the existing exams database
+#               allquestions (dictionary of topic --> difficulty --> [list of Questions]): the question bank
+#               studentgroups (list of lists of strings): groups of students whose exams should not overlap
+#                   (default None: not known, so there are no group overlap statistics)
+def getstats(store, allquestions, studentgroups=None):
+    assignments = getassignmentstable(store)
+    bank = getbanktable(allquestions)
+    questionusage = getquestionusage(assignments, bank)
+    tiers = gettiercounts(assignments)
+    groupoverlaps = None
+    if studentgroups is not None:
+        groupoverlaps = getgroupoverlaps(assignments, studentgroups)
+    return {
+        "questions": questionusage,
+        "cells": getcellexposure(questionusage),
+        "sources": getsourceusage(assignments, bank),
+        "qtypes": getqtypeusage(questionusage),
+        "tiers": tiers,
+        "groupoverlaps": groupoverlaps,
+        "summary": getsummary(assignments, questionusage, tiers, groupoverlaps),
+    }
+
+
+# Saves the given statistics (see getstats) into the given folder (created if necessary): each table there is as a
+#   .tsv (see STATSFILES) and the summary as SUMMARYFILE
+# Parameters:   stats (dictionary): the statistics to save
+#               folder (string): the folder to save them in
+def writestats(stats, folder):
+    os.makedirs(folder, exist_ok=True)
+    for key, filename in STATSFILES.items():
+        if stats[key] is None:
+            continue
+        stats[key].to_csv(os.path.join(folder, filename), sep="\t", index=False, date_format="%Y-%m-%d")
+    with open(os.path.join(folder, SUMMARYFILE), "w", encoding="utf-8") as sfile:
+        json.dump(stats["summary"], sfile, indent=2)
+
+
+def main():
+    args = sys.argv[1:]
+    configpath = None
+    if CONFIGFLAG in args:
+        if args.index(CONFIGFLAG) + 1 < len(args):
+            configpath = examio.findconfigfile(args[args.index(CONFIGFLAG) + 1])
+        del args[args.index(CONFIGFLAG):args.index(CONFIGFLAG) + 2]
+    if len(args) not in [1, 2] or examio.finddatafile(args[0]) is None or \
+            (CONFIGFLAG in sys.argv and configpath is None):
+        print("usage: python examstats.py <questions file> [<output folder>] [" + CONFIGFLAG + " <config file>]  " +
+              "(the questions file is looked for as given, then in the 'data' folder; the config file, for its " +
+              "student groups, as given, then in the 'config' folder)")
+        sys.exit(1)
+    studentgroups = None
+    if configpath is not None:
+        studentgroups = examio.readconfigfile(configpath)["studentgroups"]
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    folder = args[1] if len(args) == 2 else "../exams/stats_generated_" + timestamp
+
+    allquestions = examio.readquestionsfromfile(examio.finddatafile(args[0]))
+    store = examio.openexamstore(EXISTINGEXAMSFILE, "../exams")
+    stats = getstats(store, allquestions, studentgroups)
+    store.close()
+    writestats(stats, folder)
+
+    summary = stats["summary"]
+    print(str(summary["assignments"]) + " questions on " + str(summary["exams"]) + " exams for " +
+          str(summary["students"]) + " students; " + str(summary["usedbankquestions"]) + " of " +
+          str(summary["bankquestions"]) + " questions in the bank used so far")
+    print(str(summary["overexposedquestions"]) + " question(s) used at least " + str(OVEREXPOSEDRATIO) +
+          " times as often as the average for their topic and difficulty (and at least " + str(OVEREXPOSEDMINUSES) +
+          " times)" +
+          (", most of all:" if len(summary["mostexposed"]) > 0 else ""))
+    for q in summary["mostexposed"][:5]:
+        print("\t" + q["uniqueid"] + " (" + q["topic"] + " / " + q["difficulty"] + "): used " + str(q["uses"]) +
+              " times, " + str(q["exposure"]) + "x average")
+    if summary["groupoverlaps"] is not None:
+        print(str(summary["groupoverlaps"]) + " question(s) shared between the exams of students in a group together")
+    print("saved statistics to " + folder)
+
+
+if __name__ == "__main__":
+    main()
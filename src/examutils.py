@@ -4,10 +4,37 @@ written Sep-Oct 2020 by Kaili Vesik: kvesik@gmail.com
 updated May 2021 by Kaili Vesik
 """
 
+import time
+# when this script started (before the imports below), for checking how long it takes to get to the menu
+STARTTIME = time.perf_counter()
+
 import os
 import sys
+import csv
+import io
+import random
+from datetime import date, timedelta
 import examio
-import generateexams
+import examselect
+from examio import EXISTINGEXAMSFILE
+
+# how long it should take, in seconds, from starting this script to showing the menu (see checkstartuptime)
+STARTUPBUDGET = 0.2
+# command line flag to just measure that time (see main)
+STARTUPCHECKFLAG = "--startuptime"
+# command line flags to apply a file of changes instead of using the menu (see runbatch)
+BATCHFLAG = "--batch"
+DRYRUNFLAG = "--dryrun"
+# the changes that can be made in a batch, and the columns of a batch file
+OP_REPLACE = "replace"
+OP_REMOVE = "remove"
+BATCHCOLUMNS = ["action", "examtype", "studentid", "oldquestion", "newquestion"]
+DONE = "Done!"
+# command line flags to retire a question from every exam that hasn't been written yet (see retirequestion)
+RETIREFLAG = "--retire"
+FROMFLAG = "--from"
+CONFIGFLAG = "--config"
+ASSUMEUNWRITTENFLAG = "--assume-unwritten"
 
 
 # asks user for the path to a certain type ("filetype" string) and checks its validity
@@ -31,13 +58,16 @@ def getexamsforonestudent(exams, stid):
 
 
 # returns a (potentially) modified version of the input list, in which
-# any instance of the qtoremove is replaced with the qtoinsert
+# the first instance of the qtoremove is replaced with the qtoinsert (as in the database; see
+# examdb.ExamStore.replacequestion), so that if an exam has the same question twice only one copy changes
 def replacequestion(qslist, qtoremove, qtoinsert):
     idtoremove = qtoremove.uniqueid
     newlist = []
+    replaced = False
     for q in qslist:
-        if q.uniqueid == idtoremove:
+        if q.uniqueid == idtoremove and not replaced:
             newlist.append(qtoinsert)
+            replaced = True
         else:
             newlist.append(q)
     return newlist
@@ -51,23 +81,176 @@ def getquestion(qslist, qid):
     return None
 
 
-# reads most recent dict file
-# removes the exam of type examtype for student sid from the set of existing exams
-# writes the updated dict file
-def removeexamfromexisting(sid, examtype, allexams):
+# removes the exam of type examtype for student sid from allexams only; returns True iff there was such an exam
+def removeexaminmemory(sid, examtype, allexams):
     studentexams = getexamsforonestudent(allexams, sid)
     if studentexams is None:
         return False
     reducedexams = {extype: questions for extype, questions in studentexams.items() if extype != examtype}
     if len(studentexams.keys()) > len(reducedexams.keys()):
         allexams[sid] = reducedexams
-        examio.recordexistingexamstofile(allexams, generateexams.EXISTINGEXAMSPICKLEFILE, "../exams")
         return True
     else:
         return False
 
 
-# get & validate an exam type string from user
+# removes the exam of type examtype for student sid from the set of existing exams
+#   (both in allexams and in the existing exams database)
+def removeexamfromexisting(sid, examtype, allexams):
+    if removeexaminmemory(sid, examtype, allexams):
+        store = examio.openexamstore(EXISTINGEXAMSFILE, "../exams")
+        store.removeexam(sid, examtype)
+        store.close()
+        return True
+    else:
+        return False
+
+
+# returns a dictionary of uniqueid --> [list of (studentID, examtype, position)] of every place each question
+# appears in allexams (position counts from 0)
+def getquestionindex(allexams):
+    index = {}
+    for sid in allexams.keys():
+        for examtype, questions in allexams[sid].items():
+            for position, q in enumerate(questions):
+                index.setdefault(q.uniqueid, []).append((sid, examtype, position))
+    return index
+
+
+# Returns a dictionary of studentID --> date of their exam of the config's exam type, as scheduled in the config's
+#   signups file (or the config's exam date, for exams without signups); empty if there's no signups file
+# Parameters:   config (dictionary): settings read from a config file (see examio.readconfigfile)
+def getscheduleddates(config):
+    if config["signupsfile"] == "" or examio.finddatafile(config["signupsfile"]) is None:
+        return {}
+    signups = examio.readsignupsfromfile(examio.finddatafile(config["signupsfile"]), config["hassignupslots"],
+                                         config["examtype"], config["examdate"], date.max)
+    scheduled = {}
+    for examdate, slots in signups.items():
+        if examdate is not None:
+            for time, sid in slots:
+                scheduled[sid] = examdate
+    return scheduled
+
+
+# replaces the question ID'd by retiredid on every exam dated on or after fromdate (ie not written yet) with another
+# question of the same topic and difficulty, chosen the same way as when exams are generated: from the questions
+# available by the exam date, as few relaxations of the uniqueness constraints as possible, and spread out over the
+# least-used questions; prints what changed, and writes it all to the database in one transaction (unless dryrun);
+# returns the number of exams changed (or that would be), or None if nothing was changed because some of the exams'
+# dates aren't known (then they are listed, with ways to fill them in)
+# An exam's date is the one recorded with it, or else the one it's scheduled for by the config (if it's of the
+# config's exam type), or else (if assumeunwritten) fromdate
+# Parameters:   retiredid (string): uniqueid of the question to retire
+#               questionsfilepath (string): path to the question bank .tsv
+#               fromdate (date object): the earliest exam date to change (default None: tomorrow)
+#               dryrun (boolean): if True, just report what would change without writing anything
+#               allexams (dictionary of studentID --> examtype --> [list of Questions]): a copy of the existing exams
+#                   to keep up to date with the changes made, eg the menu's (default None: there isn't one)
+#               rng (random.Random, or the random module itself): source of randomness for choosing substitutes
+#               config (dictionary): settings read from the exam's config file (see examio.readconfigfile), for its
+#                   student groups (whose exams shouldn't overlap) and when its exams are scheduled
+#                   (default None: no groups, and only recorded dates)
+#               assumeunwritten (boolean): if True, exams whose date isn't known otherwise are taken not to have been
+#                   written yet
+def retirequestion(retiredid, questionsfilepath, fromdate=None, dryrun=False, allexams=None, rng=random,
+                   config=None, assumeunwritten=False):
+    if fromdate is None:
+        fromdate = date.today() + timedelta(days=1)
+    groupmembers = {}
+    scheduleddates = {}
+    if config is not None:
+        groupmembers = examio.indexstudentgroups(config["studentgroups"])
+        scheduleddates = getscheduleddates(config)
+    allqs = examio.readquestionsfromfile(questionsfilepath)
+    # read again along with the bank, so that substitutes are chosen among the bank's own Questions
+    bankexams = examio.readexistingexamsfromfile(EXISTINGEXAMSFILE, "../exams", allqs)
+    store = examio.openexamstore(EXISTINGEXAMSFILE, "../exams")
+    examdates = store.readexamdates()
+
+    index = getquestionindex(bankexams)
+    toretire = []  # (studentID, examtype, position, exam date) of each exam to change
+    written = []  # (studentID, examtype) of exams left alone because they've been written already
+    undated = []  # (studentID, examtype) of exams whose date isn't known
+    for sid, examtype, position in index.get(retiredid, []):
+        examdate = examdates.get(sid, {}).get(examtype)
+        if examdate is None and config is not None and examtype == config["examtype"]:
+            examdate = scheduleddates.get(sid)
+        if examdate is None and assumeunwritten:
+            examdate = fromdate
+        if examdate is None:
+            undated.append((sid, examtype))
+        elif examdate < fromdate:
+            written.append((sid, examtype))
+        else:
+            toretire.append((sid, examtype, position, examdate))
+
+    print("question " + retiredid + " is on " + str(len(index.get(retiredid, []))) + " exam(s)")
+    if len(undated) > 0:
+        print("\tthere's no recorded date for " + str(len(undated)) + " of them, so there's no telling whether " +
+              "they've been written yet: " + ", ".join("#" + sid + " " + examtype for sid, examtype in undated))
+        print("\n---------- Nothing was changed. Give the config file for those exams (" + CONFIGFLAG + "), so that " +
+              "their dates can be found in its signups, or " + ASSUMEUNWRITTENFLAG + " to change them anyway. " +
+              "----------\n")
+        store.close()
+        return None
+
+    usage = examselect.UsageCounts({uniqueid: len(places) for uniqueid, places in index.items()})
+    datedindex = examselect.DatedQuestionIndex(allqs)
+    selectors = {}  # pool cutoff date --> QuestionSelector for that pool
+    changes = []  # (studentID, examtype, position, exam date, old Question, new Question, tier) for each change
+    nosubstitute = []  # (studentID, examtype, Question) of exams left alone because no other question would do
+    for sid, examtype, position, examdate in toretire:
+        questions = bankexams[sid][examtype]
+        retiredq = questions[position]
+        otherqs = questions[:position] + questions[position+1:]
+        seenqs = [q for extype, qs in bankexams[sid].items() if extype != examtype for q in qs]
+        groupqs = [q for other in groupmembers.get(sid, ()) for q in bankexams.get(other, {}).get(examtype, [])]
+        cutoff = examio.getfrioflastweek(examdate)
+        if cutoff not in selectors.keys():
+            selectors[cutoff] = examselect.QuestionSelector(datedindex.getpool(cutoff))
+        newq, tier = selectors[cutoff].selectquestion(
+            retiredq.topic, retiredq.difficulty, otherqs,
+            groupids={q.uniqueid for q in groupqs},
+            seenids={q.uniqueid for q in seenqs},
+            seensources={q.source for q in seenqs},
+            rng=rng,
+            usage=usage,
+            excludedids={retiredid}
+        )
+        if newq is None:
+            nosubstitute.append((sid, examtype, retiredq))
+            continue
+        bankexams[sid][examtype] = questions[:position] + [newq] + questions[position+1:]
+        usage.add(newq.uniqueid)
+        changes.append((sid, examtype, position, examdate, retiredq, newq, tier))
+
+    for sid, examtype, position, examdate, retiredq, newq, tier in changes:
+        print("\tstudent #" + sid + "'s " + examtype + " exam (" + examdate.isoformat() + "): " +
+              retiredq.uniqueid + " --> " + newq.uniqueid + " (" + examselect.TIERNAMES[tier] + ")")
+    for sid, examtype, retiredq in nosubstitute:
+        print("\tstudent #" + sid + "'s " + examtype + " exam: no other " + retiredq.topic + " / " +
+              retiredq.difficulty + " question is available, so it was left as is")
+    if len(written) > 0:
+        print("\tleft as is: " + str(len(written)) + " exam(s) dated before " + fromdate.isoformat() +
+              " (already written)")
+
+    if dryrun:
+        print("\n---------- " + str(len(changes)) + " exam(s) would change (dry run; nothing was changed). " +
+              "----------\n")
+    else:
+        with store.transaction():
+            for sid, examtype, position, examdate, retiredq, newq, tier in changes:
+                store.replacequestion(sid, examtype, retiredid, newq, tier, position)
+        if allexams is not None:
+            for sid, examtype, position, examdate, retiredq, newq, tier in changes:
+                allexams[sid][examtype] = bankexams[sid][examtype]
+        print("\n---------- Done! Changed " + str(len(changes)) + " exam(s) in " + store.dbpath + " ----------\n")
+    store.close()
+    return len(changes)
+
+
+# get & validate an exam type string from user (None if they'd rather return to the main menu)
 def getexamtypefromuser(allexams):
     examtypes = []
     for sid in allexams.keys():
@@ -82,12 +265,11 @@ def getexamtypefromuser(allexams):
         if selectedtype not in examtypes + ["r"]:
             print(" ---------- There are no existing exams of that type. ----------")
     if selectedtype == "r":
-        main_menu()
-    else:
-        return selectedtype
+        return None
+    return selectedtype
 
 
-# get & validate a student id (5-digit) from user
+# get & validate a student id (5-digit) from user (None if they'd rather return to the main menu)
 def getsidfromuser(allexams):
     sids = list(allexams.keys())
 
@@ -97,32 +279,36 @@ def getsidfromuser(allexams):
         if selectedsid not in sids + ["r"]:
             print(" ---------- There are no existing exams with that student ID. ----------")
     if selectedsid == "r":
-        main_menu()
-    else:
-        return selectedsid
+        return None
+    return selectedsid
 
 
-# get a question ID from user
+# get a question ID from user (None if they'd rather return to the main menu)
 def getqidfromuser(prompt):
     selectedqid = ""
     while selectedqid == "":
         selectedqid = input(prompt+" (or 'r' to return to main menu): ")
-    if selectedqid != "":
-        return selectedqid
-    else:
-        main_menu()
+    if selectedqid == "r":
+        return None
+    return selectedqid
 
 
-# for sid's exam of type examtype, replace the Question ID'd by qidold with the Question ID'd by qidnew
-# gathering Question info from questionsfilepath
-def replacequestioninexam(examtype, sid, qidold, qidnew, questionsfilepath, allexams):
-    allqs = examio.readquestionsfromfile(questionsfilepath)
-    qslist = []
+# returns a dictionary of uniqueid --> Question for every question in the given question bank
+def getquestionsbyid(allqs):
+    questionsbyid = {}
     for topic in allqs.keys():
         for diff in allqs[topic].keys():
-            qslist.extend(allqs[topic][diff])
-    allqs = qslist
+            for q in allqs[topic][diff]:
+                questionsbyid[q.uniqueid] = q
+    return questionsbyid
+
 
+# for sid's exam of type examtype, replace the Question ID'd by qidold with the Question ID'd by qidnew in allexams
+# only, looking both up in questionsbyid (see getquestionsbyid); returns DONE, or a message saying why it wasn't done
+# If strict, the new question also has to have the same topic and difficulty as the old one, and not be on any of
+# sid's other exams already; otherwise a warning is printed for either of those, but the question is still replaced
+# (eg when someone at the menu deliberately swaps in a question of a different kind).
+def replacequestioninmemory(examtype, sid, qidold, qidnew, questionsbyid, allexams, strict=False):
     studentexams = getexamsforonestudent(allexams, sid)
     if studentexams is None:
         return "Student not found."
@@ -131,38 +317,74 @@ def replacequestioninexam(examtype, sid, qidold, qidnew, questionsfilepath, alle
 
     studentqs = studentexams[examtype]
 
-    qtoremove = getquestion(allqs, qidold)
-    qtoinsert = getquestion(allqs, qidnew)
-    if qtoremove is not None and qtoinsert is not None:
-        studentqs_new = replacequestion(studentqs, qtoremove, qtoinsert)
-        allexams[sid][examtype] = studentqs_new
-        examio.recordexistingexamstofile(allexams, generateexams.EXISTINGEXAMSPICKLEFILE, "../exams")
-        return "Done!"
-    else:
+    qtoremove = questionsbyid.get(qidold)
+    qtoinsert = questionsbyid.get(qidnew)
+    if qtoremove is None or qtoinsert is None:
         return "Question(s) not found."
+    elif getquestion(studentqs, qidold) is None:
+        return "Question " + qidold + " isn't on that exam."
+    elif getquestion(studentqs, qidnew) is not None:
+        return "Question " + qidnew + " is already on that exam."
+
+    problems = []
+    if (qtoinsert.topic, qtoinsert.difficulty) != (qtoremove.topic, qtoremove.difficulty):
+        problems.append("Question " + qidnew + " is " + qtoinsert.topic + " / " + qtoinsert.difficulty + ", but " +
+                        qidold + " is " + qtoremove.topic + " / " + qtoremove.difficulty + ".")
+    for extype, questions in studentexams.items():
+        if extype != examtype and getquestion(questions, qidnew) is not None:
+            problems.append("Question " + qidnew + " is already on student #" + sid + "'s " + extype + " exam.")
+    if strict and len(problems) > 0:
+        return problems[0]
+    for problem in problems:
+        print("warning: " + problem)
+    allexams[sid][examtype] = replacequestion(studentqs, qtoremove, qtoinsert)
+    return DONE
+
+
+# for sid's exam of type examtype, replace the Question ID'd by qidold with the Question ID'd by qidnew
+# gathering Question info from questionsfilepath
+def replacequestioninexam(examtype, sid, qidold, qidnew, questionsfilepath, allexams):
+    questionsbyid = getquestionsbyid(examio.readquestionsfromfile(questionsfilepath))
+    result = replacequestioninmemory(examtype, sid, qidold, qidnew, questionsbyid, allexams)
+    if result == DONE:
+        store = examio.openexamstore(EXISTINGEXAMSFILE, "../exams")
+        store.replacequestion(sid, examtype, qidold, questionsbyid[qidnew])
+        store.close()
+    return result
 
 
 # get required info from user in order to replace a question in a particular student's particular exam
 def replacequestion_gatherinfo(allexams):
     print("OK, let's replace a question.")
     selectedtype = getexamtypefromuser(allexams)
+    if selectedtype is None:
+        return
     selectedsid = getsidfromuser(allexams)
+    if selectedsid is None:
+        return
     oldqid = getqidfromuser("Enter the unique ID (QU###...) of the question you want to replace")
+    if oldqid is None:
+        return
     newqid = getqidfromuser("Enter the unique ID (QU###...) of the question you would like to use instead")
+    if newqid is None:
+        return
     questionsfilepath = getfilepath("questions (tsv)")
     confirmation = input("Confirm (y or n): replace " + oldqid+" with "+newqid +
                          " in student #" + selectedsid + "'s " + selectedtype+" exam? ")
     if confirmation == "y" or confirmation == "Y":
         result = replacequestioninexam(selectedtype, selectedsid, oldqid, newqid, questionsfilepath, allexams)
         print("\n---------- " + result + " ----------\n")
-    main_menu()
 
 
 # get required info from user to remove a particular student's particular exam
 def removeexam_gatherinfo(allexams):
     print("OK, we'll remove an exam.")
     selectedtype = getexamtypefromuser(allexams)
+    if selectedtype is None:
+        return
     selectedsid = getsidfromuser(allexams)
+    if selectedsid is None:
+        return
     confirmation = input("Confirm (y or n): removing "+selectedtype+" exam for student #"+selectedsid+"? ")
     if confirmation == "y" or confirmation == "Y":
         success = removeexamfromexisting(selectedsid, selectedtype, allexams)
@@ -170,7 +392,34 @@ def removeexam_gatherinfo(allexams):
             print("\n---------- Done! ----------\n")
         else:
             print("\n---------- Didn't find such an exam. ----------\n")
-    main_menu()
+
+
+# get required info from user to retire a question from every exam that hasn't been written yet
+def retirequestion_gatherinfo(allexams):
+    print("OK, let's retire a question from every exam that hasn't been written yet.")
+    retiredid = getqidfromuser("Enter the unique ID (QU###...) of the question you want to retire")
+    if retiredid is None:
+        return
+    questionsfilepath = getfilepath("questions (tsv)")
+    config = None
+    configpath = ""
+    while configpath == "":
+        userinput = input("Enter the name of the config file for these exams, for its student groups and signups " +
+                          "(I will look in the 'config' folder), or 'none' to go without: ")
+        if userinput == "none":
+            break
+        elif os.path.isfile("../config/" + userinput):
+            configpath = "../config/" + userinput
+            config = examio.readconfigfile(configpath)
+        else:
+            print("\n"+" ----------Not a valid file path. Please try again. ----------")
+    confirmation = input("Confirm (y or n): replace " + retiredid + " on every exam dated after today? ")
+    if confirmation == "y" or confirmation == "Y":
+        result = retirequestion(retiredid, questionsfilepath, allexams=allexams, config=config)
+        if result is None:
+            confirmation = input("Treat those exams as not written yet, and change them too (y or n)? ")
+            if confirmation == "y" or confirmation == "Y":
+                retirequestion(retiredid, questionsfilepath, allexams=allexams, config=config, assumeunwritten=True)
 
 
 # haven't implemented this yet because I think it's reasonably efficient just to manually delete the dict
@@ -179,16 +428,20 @@ def removeexam_gatherinfo(allexams):
 # def removebatch_gatherinfo():
 
 
-# provides a console-based menu to get user input re what they want to do to change the existing exam collection
-def main_menu():
+# provides a console-based menu to get user input re what they want to do to change the existing exam collection;
+#   returns when the user chooses to exit
+# Parameters:   allexams (dictionary of studentID --> examtype --> [list of Questions]): the existing exams,
+#                   which are kept up to date along with the database as changes are made
+def main_menu(allexams):
 
     while True:
-        allexams = examio.readexistingexamsfromfile(generateexams.EXISTINGEXAMSPICKLEFILE, "../exams")
         print("What would you like to do?")
         print("1. Replace a particular question for a particular student on a particular exam\n" +
               "\t(eg if you realized that a question was not appropriate for the date it was originally labeled as).")
         print("2. Remove an entire particular exam for a particular student\n\t" +
               "(eg if they cancelled after their individually-scheduled exam was generated).")
+        print("3. Retire a question from every exam that hasn't been written yet\n\t" +
+              "(eg if it turned out to be broken partway through the term).")
         # print("u. Undo the last batch of exam generation.")
         print("x. Nothing; never mind; I'm just going to go (aka 'exit'). :)")
 
@@ -198,16 +451,169 @@ def main_menu():
             replacequestion_gatherinfo(allexams)
         elif userinput == "2":
             removeexam_gatherinfo(allexams)
+        elif userinput == "3":
+            retirequestion_gatherinfo(allexams)
         # elif userinput == "u":
         #     removebatch_gatherinfo(allexams)
         elif userinput == "x":
             print("OK; bye!")
-            sys.exit(0)
+            return
         else:
             print("\n---------- That wasn't a valid selection; let's try again. ----------")
 
 
+# Returns the operations listed in a batch file, as a list of dictionaries (one per row, with keys BATCHCOLUMNS
+#   and "line", the row's line number in the file); exits if the file doesn't have the right columns
+# Parameters:   batchfilepath (string): path to a .tsv file with a header row naming (at least) BATCHCOLUMNS;
+#                   each row is either a replace (needing all columns) or a remove (leaving the questions empty)
+def readbatchfile(batchfilepath):
+    with io.open(batchfilepath, "r", encoding="utf-8", newline="") as bfile:
+        reader = csv.DictReader(bfile, delimiter="\t")
+        fieldnames = [name.strip().lower() for name in (reader.fieldnames or [])]
+        missing = [col for col in BATCHCOLUMNS if col not in fieldnames]
+        if len(missing) > 0:
+            print("Batch file " + batchfilepath + " needs these columns: " + ", ".join(missing))
+            sys.exit(1)
+        reader.fieldnames = fieldnames
+        ops = []
+        for row in reader:
+            op = {col: (row.get(col) or "").strip() for col in BATCHCOLUMNS}
+            if not any(op.values()):
+                continue  # skip blank lines
+            op["action"] = op["action"].lower()
+            op["line"] = reader.line_num
+            ops.append(op)
+    return ops
+
+
+# Applies a whole file of changes (see readbatchfile) to the existing exams: the question bank and existing exams
+#   are each read once, every change is made in memory in file order (so later rows see the effects of earlier
+#   ones), and the result of each is printed; only if every change succeeded are they all written to the
+#   database, together in one transaction; returns True iff they were written (or would have been, if dryrun)
+# Unlike at the menu, nobody looks at each replacement as it's made, so they're checked strictly (see
+#   replacequestioninmemory).
+# Parameters:   batchfilepath (string): path to the batch file
+#               questionsfilepath (string): path to the question bank .tsv (only needed for replacements)
+#               dryrun (boolean): if True, just check and report on the changes without writing anything
+def runbatch(batchfilepath, questionsfilepath=None, dryrun=False):
+    ops = readbatchfile(batchfilepath)
+    if any(op["action"] == OP_REPLACE for op in ops):
+        if questionsfilepath is None:
+            print("Replacing questions needs the question bank too: python examutils.py " + BATCHFLAG +
+                  " <batch file> <questions file>")
+            sys.exit(1)
+        questionsbyid = getquestionsbyid(examio.readquestionsfromfile(questionsfilepath))
+    else:
+        questionsbyid = {}
+    allexams = examio.readexistingexamsfromfile(EXISTINGEXAMSFILE, "../exams")
+
+    applied = []
+    numfailed = 0
+    for op in ops:
+        if op["action"] == OP_REPLACE:
+            description = "replace " + op["oldquestion"] + " with " + op["newquestion"] + " in student #" + \
+                          op["studentid"] + "'s " + op["examtype"] + " exam"
+            result = replacequestioninmemory(op["examtype"], op["studentid"], op["oldquestion"],
+                                             op["newquestion"], questionsbyid, allexams, strict=True)
+        elif op["action"] == OP_REMOVE:
+            description = "remove student #" + op["studentid"] + "'s " + op["examtype"] + " exam"
+            if removeexaminmemory(op["studentid"], op["examtype"], allexams):
+                result = DONE
+            else:
+                result = "Didn't find such an exam."
+        else:
+            description = "'" + op["action"] + "'"
+            result = "Not a valid action (use " + OP_REPLACE + " or " + OP_REMOVE + ")."
+        print("line " + str(op["line"]) + ": " + description + ": " + result)
+        if result == DONE:
+            applied.append(op)
+        else:
+            numfailed += 1
+
+    if numfailed > 0:
+        print("\n---------- " + str(numfailed) + " of " + str(len(ops)) + " change(s) couldn't be made, " +
+              "so nothing was changed. ----------\n")
+        return False
+    if dryrun:
+        print("\n---------- All " + str(len(ops)) + " change(s) can be made (dry run; nothing was changed). " +
+              "----------\n")
+        return True
+
+    store = examio.openexamstore(EXISTINGEXAMSFILE, "../exams")
+    with store.transaction():
+        for op in applied:
+            if op["action"] == OP_REPLACE:
+                store.replacequestion(op["studentid"], op["examtype"], op["oldquestion"],
+                                      questionsbyid[op["newquestion"]])
+            else:
+                store.removeexam(op["studentid"], op["examtype"])
+    store.close()
+    print("\n---------- Done! Made all " + str(len(ops)) + " change(s) to " + store.dbpath + " ----------\n")
+    return True
+
+
+# Prints how long it took to get from starting this script to being ready to show the menu, compared with
+#   STARTUPBUDGET; returns True iff it was within budget
+def checkstartuptime():
+    elapsed = time.perf_counter() - STARTTIME
+    withinbudget = elapsed <= STARTUPBUDGET
+    print("ready for the menu in " + str(round(elapsed, 3)) + " seconds (budget " + str(STARTUPBUDGET) + "): " +
+          ("OK" if withinbudget else "too slow"))
+    return withinbudget
+
+
+def main():
+    args = sys.argv[1:]
+    if BATCHFLAG in args:
+        dryrun = DRYRUNFLAG in args
+        filenames = [arg for arg in args if arg not in [BATCHFLAG, DRYRUNFLAG]]
+        filepaths = [examio.finddatafile(name) for name in filenames]
+        if len(filenames) not in [1, 2] or None in filepaths:
+            print("usage: python examutils.py " + BATCHFLAG + " <batch file> [<questions file>] [" + DRYRUNFLAG +
+                  "]  (files are looked for as given, then in the 'data' folder)")
+            sys.exit(1)
+        succeeded = runbatch(filepaths[0], filepaths[1] if len(filepaths) > 1 else None, dryrun)
+        sys.exit(0 if succeeded else 1)
+    elif RETIREFLAG in args:
+        usage = "usage: python examutils.py " + RETIREFLAG + " <question ID> <questions file> [" + CONFIGFLAG + \
+                " <config file>] [" + FROMFLAG + " yyyy-mm-dd] [" + ASSUMEUNWRITTENFLAG + "] [" + DRYRUNFLAG + \
+                "]  (default: change exams from tomorrow on)"
+        dryrun = DRYRUNFLAG in args
+        assumeunwritten = ASSUMEUNWRITTENFLAG in args
+        args = [arg for arg in args if arg not in [DRYRUNFLAG, ASSUMEUNWRITTENFLAG]]
+        fromdate = None
+        config = None
+        try:
+            if FROMFLAG in args:
+                fromdate = date.fromisoformat(args[args.index(FROMFLAG) + 1])
+                del args[args.index(FROMFLAG):args.index(FROMFLAG) + 2]
+            if CONFIGFLAG in args:
+                configpath = examio.findconfigfile(args[args.index(CONFIGFLAG) + 1])
+                if configpath is None:
+                    raise ValueError
+                config = examio.readconfigfile(configpath)
+                del args[args.index(CONFIGFLAG):args.index(CONFIGFLAG) + 2]
+            retiredid = args[args.index(RETIREFLAG) + 1]
+            del args[args.index(RETIREFLAG):args.index(RETIREFLAG) + 2]
+        except (IndexError, ValueError):
+            print(usage)
+            sys.exit(1)
+        if len(args) != 1 or examio.finddatafile(args[0]) is None:
+            print(usage)
+            sys.exit(1)
+        numchanged = retirequestion(retiredid, examio.finddatafile(args[0]), fromdate, dryrun, config=config,
+                                    assumeunwritten=assumeunwritten)
+        sys.exit(0 if numchanged is not None else 1)
+
+    allexams = examio.readexistingexamsfromfile(EXISTINGEXAMSFILE, "../exams")
+    if STARTUPCHECKFLAG in args:
+        # just measure startup (eg after changing imports), without waiting for input
+        sys.exit(0 if checkstartuptime() else 1)
+    main_menu(allexams)
+
+
 #####################
 #   do the thing!   #
 #####################
-main_menu()
+if __name__ == "__main__":
+    main()
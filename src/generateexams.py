@@ -7,15 +7,31 @@ updated May-June 2021 by Kaili Vesik
 
 
 import os
+import io
+import csv
 import sys
 import random
+import shutil
+import tempfile
+import concurrent.futures
 from datetime import date, datetime
-from dateutil import parser
 from Exam import Question
 import examio
-from examio import WILD
-
-EXISTINGEXAMSPICKLEFILE = "existingexams_donotedit.dict"
+import examselect
+import examplan
+import examcompile
+import examarchive
+import examexport
+import exammetrics
+from examio import WILD, PLANNER_GREEDY, PLANNER_JOINT, EXISTINGEXAMSFILE
+
+COMPILEREPORTFILE = "compilereport.json"
+# per-phase timings and selection counts for the whole run, if requested (see exammetrics)
+RUNREPORTFILE = "runreport.json"
+# every question on every student's exam, for loading into other tools (see examexport)
+EXPORTFILE = "assignments"
+# previously compiled pdfs, reused whenever the same .tex (and images) come up again
+PDFCACHEDIR = "pdfcache"
 ORDER_SPECIFIED = 1
 ORDER_RANDOM = 2
 ORDER_EASYMEDFIRST = 3
@@ -45,10 +61,15 @@ class ExamSession:
     #               wildtopics (list of strings): topics eligible for wildcard questions
     #               ordering (integer): type of ordering in which to arrange questions (see ORDER_* constants)
     #                   if not provided, defaults to order in which topics are listed
+    #               randomseed (string): if given, each student's exam is chosen with its own random number generator
+    #                   seeded from this, the exam type, and the student id (see getrng); if not, exams are random
+    #               planner (string): PLANNER_GREEDY to choose each student's exam in schedule order as it's written,
+    #                   or PLANNER_JOINT to choose all of this session's pending exams together first (see planexams)
     # Each of these parameters is likely supplied by getconfig(), readquestionsfromfile(), and/or readsignupsfromfile()
     def __init__(self, course="", examtype="", hassignupslots=False, allquestions={}, signups={}, studentgroups=[], existingexams={},
                  startdate=date.today(), onefileperstudent=False, ordering=ORDER_SPECIFIED,
-                 topics=[], diffs=[], topicdiffpairs=[], wildtopics=[]):
+                 topics=[], diffs=[], topicdiffpairs=[], wildtopics=[], randomseed=None,
+                 planner=PLANNER_GREEDY):
 
         self.course = course
         self.examtype = examtype
@@ -64,6 +85,21 @@ class ExamSession:
         self.difficulties = diffs
         self.topicdiffpairs = topicdiffpairs
         self.wildcardtopics = wildtopics
+        self.randomseed = randomseed
+        self.planner = planner
+        self.plannedexams = {}  # studentid --> (list of Questions, list of tiers), chosen by planexams
+        self.examdetails = {}  # (studentid, examtype) --> {"examdate": date, "tiers": [list of integers]}
+        self.datedindex = None  # DatedQuestionIndex of allquestions, built on first use
+        self.selectorcache = {}  # id of question pool --> (question pool, QuestionSelector for that pool)
+        self.fragments = QuestionFragments()  # each question's markup, rendered the first time it's written
+        self.outputstats = {}  # path of each file written --> {"bytes": integer, "writes": integer}
+        self.archive = None  # examarchive.ExamArchive to write generated files into, instead of a folder
+        self.exporter = None  # one of the examexport exporters, to also write each question assignment to
+        # whether an exam may use a topic/difficulty combination more times than it has distinct questions, when
+        #   there's no other way to fill it (see choosequestionsforoneexam)
+        self.allowrepeatedcombos = False
+        self.indexstudentgroups()
+        self.indexexistingexams()
 
     # Returns True iff we've already generated an exam of the given type for the given sid
     # Parameters:   sid (string): the student ID to check for
@@ -74,12 +110,37 @@ class ExamSession:
                 return True
         return False
 
+    # Builds the index of each student's fellow group members, across every group they belong to
+    def indexstudentgroups(self):
+        self.groupmembers = examio.indexstudentgroups(self.studentgroups)  # studentid --> set of studentids
+
+    # (Re)builds the per-student sets of question ids and sources seen so far, the sets of question ids on
+    #   group members' exams of this session's type, and the registry of exam types generated so far, from scratch;
+    #   after this they are kept up to date by addquestionstoexisting
+    def indexexistingexams(self):
+        self.seenids = {}  # studentid --> set of uniqueids of questions on any of this student's exams
+        self.seensources = {}  # studentid --> set of sources of questions on any of this student's exams
+        self.groupquestionids = {}  # studentid --> set of uniqueids on group members' exams of this exam type
+        self.examtypesregistry = set()  # exam types generated so far (in saved file OR exams currently being built)
+        for sid in self.existingexams.keys():
+            for extype, questions in self.existingexams[sid].items():
+                self.registerexam(sid, extype, questions)
+
+    # Records the given exam in the per-student seen sets, group members' sets, and the exam types registry
+    # Parameters:   sid (string): the student number whose exam this is
+    #               extype (string): the exam type
+    #               questions ([list of Questions]): the questions on this student's exam
+    def registerexam(self, sid, extype, questions):
+        self.seenids.setdefault(sid, set()).update(q.uniqueid for q in questions)
+        self.seensources.setdefault(sid, set()).update(q.source for q in questions)
+        if extype == self.examtype:
+            for other in self.groupmembers.get(sid, ()):
+                self.groupquestionids.setdefault(other, set()).update(q.uniqueid for q in questions)
+        self.examtypesregistry.add(extype)
+
     # Returns a list of the exam types that've already been generated (in saved file OR exams currently being built)
     def getexistingexamtypes(self):
-        extypes = []
-        for sid in self.existingexams.keys():
-            extypes.extend([xt for xt in self.existingexams[sid].keys()])
-        return list(set(extypes))
+        return sorted(self.examtypesregistry)
 
     # Returns a list of Questions that this student has seen before on previous exams
     # Parameters:   sid (string): student id whose exam questions to collect
@@ -111,6 +172,7 @@ class ExamSession:
 
     # Generate LaTeX source for one entire exam day's document; write to file
     # Also generate a tsv for one entire exam day (for piping into Canvas); write to file
+    # Returns a list of paths to the .tex files written (instructor copy first)
     # Parameters:   texfilepath (string): path to the .tex file to generate
     #               tsvfilepath (string): path to the .tsv file that will be used to pipe questions into Canvas quizzes
     #               examdate (date): the date whose exam source to generate
@@ -118,28 +180,19 @@ class ExamSession:
     def generatelatexexams_oneday(self, texfilepath, tsvfilepath, examdate, rubric=""):
         print("generating one day's exams / date", examdate)
 
-        sched = self.signups[examdate]
-        sched.sort(key=lambda x: str_to_time(x[0]))
+        sched = self.getschedule(examdate)
+        texfilepaths = []
 
         instrfilepath = texfilepath.replace(".tex", "_instructorcopy.tex")
-        with open(instrfilepath, "w", encoding="utf-8") as inf:
-            with open(tsvfilepath, "w", encoding="utf-8") as tsvf:
+        texfilepaths.append(instrfilepath)
+        with exammetrics.timer("rendering"), DocumentBuilder(instrfilepath, self.outputstats, self.archive) as inf:
+            with DocumentBuilder(tsvfilepath, self.outputstats, self.archive) as tsvf:
                 writedochead(inf, examdate.strftime("%Y%m%d %A"), "ALL EXAMS (with notes)")
-                tsvf.write(
-                    "Person" + "\t" +
-                    "QuestionID" + "\t" +
-                    "Topic" + "\t" +
-                    "Difficulty" + "\t" +
-                    "Source" + "\t" +
-                    "Question_latex" + "\t" +
-                    "Image1" + "\t" +
-                    "Image1Caption" + "\t" +
-                    "Image2" + "\t" +
-                    "Image2Caption" + "\n"
-                )
+                tsvf.write(TSVHEADER)
 
                 if not self.onefileperstudent:  # entire day's exams batched into one file
-                    with open(texfilepath, "w", encoding="utf-8") as texf:
+                    texfilepaths.append(texfilepath)
+                    with DocumentBuilder(texfilepath, self.outputstats, self.archive) as texf:
                         writedochead(texf, examdate.strftime("%Y%m%d %A"), "ALL EXAMS")
 
                         for (time, sid) in sched:
@@ -152,11 +205,20 @@ class ExamSession:
                             writeexamstart(texf, sid, time)
                             writeexamstart(inf, sid, time)
                             for qidx in range(0, len(self.topics)):
-                                writeexamquestiontex(qidx + 1, qs[qidx], texf, rubric=rubric)
-                                writeexamquestiontex(qidx + 1, qs[qidx], inf, instrcopy=True, rubric=rubric)
-                                writeexamquestiontsv(sid, qs[qidx], tsvf)
+                                writeexamquestiontex(qidx + 1, qs[qidx], texf, rubric=rubric,
+                                                     fragments=self.fragments)
+                                writeexamquestiontex(qidx + 1, qs[qidx], inf, instrcopy=True, rubric=rubric,
+                                                     fragments=self.fragments)
+                                writeexamquestiontsv(sid, qs[qidx], tsvf, fragments=self.fragments)
+                                if self.exporter is not None:
+                                    self.exporter.write(examexport.makerecord(
+                                        sid, self.examtype, examdate, time, qidx + 1, qs[qidx],
+                                        self.fragments.gettsvlatex(qs[qidx])))
                             writeexamend(texf)
                             writeexamend(inf)
+                            texf.flushifbig()
+                            inf.flushifbig()
+                            tsvf.flushifbig()
                         writedocfoot(texf)
 
                 else:  # each student gets their own file
@@ -164,7 +226,8 @@ class ExamSession:
                     for (time, sid) in sched:
                         sidforfilename = sid if sid != "" else "empty"
                         thissidtexfilepath = texfilepath.replace(".tex", "-sid" + sidforfilename + ".tex")
-                        with open(thissidtexfilepath, "w", encoding="utf-8") as texf:
+                        texfilepaths.append(thissidtexfilepath)
+                        with DocumentBuilder(thissidtexfilepath, self.outputstats, self.archive) as texf:
                             writedochead(texf, "", "", onefileperstudent=self.onefileperstudent)
                             if sid == "":
                                 writeexamstart(texf, "empty", time)
@@ -175,42 +238,171 @@ class ExamSession:
                             writeexamstart(texf, sid, time)
                             writeexamstart(inf, sid, time)
                             for qidx in range(0, len(self.topics)):
-                                writeexamquestiontex(qidx + 1, qs[qidx], texf, rubric=rubric)
-                                writeexamquestiontex(qidx + 1, qs[qidx], inf, instrcopy=True, rubric=rubric)
-                                writeexamquestiontsv(sid, qs[qidx], tsvf)
+                                writeexamquestiontex(qidx + 1, qs[qidx], texf, rubric=rubric,
+                                                     fragments=self.fragments)
+                                writeexamquestiontex(qidx + 1, qs[qidx], inf, instrcopy=True, rubric=rubric,
+                                                     fragments=self.fragments)
+                                writeexamquestiontsv(sid, qs[qidx], tsvf, fragments=self.fragments)
+                                if self.exporter is not None:
+                                    self.exporter.write(examexport.makerecord(
+                                        sid, self.examtype, examdate, time, qidx + 1, qs[qidx],
+                                        self.fragments.gettsvlatex(qs[qidx])))
                             writeexamend(texf)
                             writedocfoot(texf)
                             writeexamend(inf)
+                            inf.flushifbig()
+                            tsvf.flushifbig()
 
                 writedocfoot(inf)
 
+        daystats = [self.outputstats[path] for path in texfilepaths + [tsvfilepath]]
+        print("wrote " + str(len(daystats)) + " file(s): " + str(sum(st["bytes"] for st in daystats)) + " bytes in " +
+              str(sum(st["writes"] for st in daystats)) + " writes")
+        return texfilepaths
+
     # Generate LaTeX source for this entire exam session (could be multiple days); write to file
     # Also generate a tsv for this entire exam session (for piping into Canvas); write to file
+    # Returns a list of paths to all the .tex files written (see examcompile to turn them into pdfs)
     # Parameters:   foldername (string): the directory to which exam materials should be generated
     #               generateuptodate (datetime.date): the date up to which exams should be generated
     #                   if empty, defaults to today
     #               rubric (string): the line of text that should be printed at the bottom of each page
-    def generatelatexexams(self, foldername, generateuptodate=date.today(), rubric=""):
-
-        # filename info for exam TeX & tsv sources to be generated
-        texfileprefix = self.course.replace(" ", "_") + self.examtype.replace(" ", "_") + "-"
-        texfilesuffix = ".tex"
-        tsvfilesuffix = ".tsv"
+    #               workers (integer): number of processes across which to spread the exam days
+    #                   (default 1: generate one day after another in this process)
+    def generatelatexexams(self, foldername, generateuptodate=date.today(), rubric="", workers=1):
 
         # generate an exam for each day, named after days in schedule
+        dates = []
         for thedate in self.signups.keys():  # should be a date object
 
             # only generate exams if the exam is not scheduled
             if (self.hassignupslots and (thedate <= examio.getfriofthisweek(thedate) or thedate <= generateuptodate)) \
                     or not self.hassignupslots:
-                examtex = texfileprefix + thedate.strftime("%Y%m%d%A") + texfilesuffix
-                fullpathtotex = foldername + "/" + examtex
-                fullpathtotsv = fullpathtotex.replace(texfilesuffix, tsvfilesuffix)
-                self.generatelatexexams_oneday(fullpathtotex, fullpathtotsv, thedate, rubric)
+                dates.append(thedate)
+
+        if self.planner == PLANNER_JOINT:
+            self.planexams(dates)
+
+        if workers > 1 and len(dates) > 1:
+            return self.generatelatexexams_parallel(foldername, dates, rubric, workers)
+
+        texfilepaths = []
+        for thedate in dates:
+            fullpathtotex, fullpathtotsv = self.getexamdaypaths(foldername, thedate)
+            texfilepaths.extend(self.generatelatexexams_oneday(fullpathtotex, fullpathtotsv, thedate, rubric))
+        return texfilepaths
+
+    # Generate LaTeX source (and tsv) for the given exam days, spreading the days across a pool of processes
+    # Each process starts from the same existing exams, so any student whose questions depend on another day's
+    #   exams (because they're scheduled on more than one of these days, or have a group member scheduled on a
+    #   different one) has their exam chosen here first, in schedule order. The exams chosen by each process are
+    #   then added to the existing exams one day at a time, in date order, so the result doesn't depend on
+    #   which process finishes first.
+    # Returns a list of paths to all the .tex files written
+    # Parameters:   foldername (string): the directory to which exam materials should be generated
+    #               dates (list of dates): the exam days to generate
+    #               rubric (string): the line of text that should be printed at the bottom of each page
+    #               workers (integer): number of processes to use
+    def generatelatexexams_parallel(self, foldername, dates, rubric, workers):
+        dates = sorted(dates)
+        daysbysid = {}  # studentid --> set of dates (among these ones) on which they're scheduled
+        for thedate in dates:
+            for (time, sid) in self.getschedule(thedate):
+                if sid != "":
+                    daysbysid.setdefault(sid, set()).add(thedate)
+
+        crossdaysids = set()
+        for sid, days in daysbysid.items():
+            if len(days) > 1 or any(daysbysid.get(other, days) != days for other in self.groupmembers.get(sid, ())):
+                crossdaysids.add(sid)
+        for thedate in dates:
+            for (time, sid) in self.getschedule(thedate):
+                if sid in crossdaysids and not self.thisstudentexamexists(sid, self.examtype):
+                    self.collectquestionsforoneexam(sid, thedate)
+
+        qsbyid = {q.uniqueid: q for q in flattenqsdict(self.allquestions)}
+        # worker processes can't write to this process's archive, so they write their files to a folder of their
+        #   own and hand back where they are, to be added here (and likewise hand back question assignment
+        #   records, if they're being exported)
+        archive = self.archive
+        if archive is not None:
+            spooldir = tempfile.mkdtemp(prefix=".spool-", dir=os.path.dirname(os.path.abspath(archive.path)))
+            self.archive = examarchive.MemberCollector(archive.rootdir, spooldir)
+        exporter = self.exporter
+        if exporter is not None:
+            self.exporter = examexport.RecordCollector()
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=initexamdayworker,
+                                                        initargs=(self, exammetrics.enabled)) as pool:
+                futures = []
+                for thedate in dates:
+                    fullpathtotex, fullpathtotsv = self.getexamdaypaths(foldername, thedate)
+                    futures.append(pool.submit(generateexamdayinworker, fullpathtotex, fullpathtotsv, thedate, rubric))
+                texfilepaths = []
+                for future in futures:  # in date order
+                    daytexfilepaths, newexams, members, records, metrics = future.result()
+                    texfilepaths.extend(daytexfilepaths)
+                    if metrics is not None:
+                        exammetrics.mergestate(metrics)
+                    for sid, extype, qids, details in newexams:
+                        self.addquestionstoexisting(sid, extype, [qsbyid[qid] for qid in qids],
+                                                    details["examdate"], details["tiers"])
+                    for name, filepath, numbytes, sha256 in members:
+                        archive.addmemberfromfile(name, filepath, numbytes, sha256)
+                    for record in records:
+                        exporter.write(record)
+        finally:
+            if archive is not None:
+                shutil.rmtree(spooldir, ignore_errors=True)
+            self.archive = archive
+            self.exporter = exporter
+        return texfilepaths
+
+    # Choose the questions for every student scheduled on the given days who doesn't have an exam of this type yet,
+    #   all together (see examplan.JointPlanner) rather than one at a time as their exams are written;
+    #   the chosen exams are then used by collectquestionsforoneexam
+    # Note that exams chosen this way depend on everyone else's, so verifyexam can't reproduce them
+    # Parameters:   dates (list of dates): the exam days to plan
+    def planexams(self, dates):
+        rng = random
+        if self.randomseed is not None:
+            rng = random.Random("|".join([self.randomseed, self.examtype, "planner"]))
+        planner = examplan.JointPlanner(self.examtype, self.groupmembers, self.existingexams,
+                                        self.seenids, self.seensources, rng)
+        for thedate in sorted(dates):
+            questionspool = self.getquestionsbeforestartdate(thedate)
+            for (time, sid) in self.getschedule(thedate):
+                if sid == "" or self.thisstudentexamexists(sid, self.examtype) or planner.hasexam(sid):
+                    continue
+                exammetrics.setcontext(sid, thedate)
+                topicsorder, diffsorder = self.choosetopicsdiffsforoneexam(thedate, questionspool, self.getrng(sid),
+                                                                           sid)
+                planner.addexam(sid, self.getselector(questionspool), topicsorder, diffsorder)
+        exammetrics.setcontext()
+        with exammetrics.timer("selection"):
+            self.plannedexams = planner.solve()
+        planner.printreport()
+
+    # Returns 2-tuple of paths to the .tex and .tsv files for the given exam day
+    # Parameters:   foldername (string): the directory to which exam materials should be generated
+    #               thedate (date): the exam day
+    def getexamdaypaths(self, foldername, thedate):
+        # filename info for exam TeX & tsv sources to be generated
+        texfileprefix = self.course.replace(" ", "_") + self.examtype.replace(" ", "_") + "-"
+        texfilesuffix = ".tex"
+        tsvfilesuffix = ".tsv"
 
-                # only use this if you are 100% confident the latex is compilable;
-                # otherwise python and xelatex both hang
-                # generatepdf(fullpathtotex)
+        examtex = texfileprefix + thedate.strftime("%Y%m%d%A") + texfilesuffix
+        fullpathtotex = foldername + "/" + examtex
+        fullpathtotsv = fullpathtotex.replace(texfilesuffix, tsvfilesuffix)
+        return fullpathtotex, fullpathtotsv
+
+    # Returns the list of (time, studentid) scheduled for the given date, sorted by time
+    # Parameters:   examdate (date): the date whose schedule to return
+    def getschedule(self, examdate):
+        sched = self.signups[examdate]
+        sched.sort(key=lambda x: str_to_time(x[0]))
+        return sched
 
     # Returns a list of Questions with the given topic and difficulty level
     # Parameters:   topic (string): the topic from which to collect questions; if empty, all topics will be included
@@ -242,6 +434,12 @@ class ExamSession:
         return selectedqs
 
     # Returns unique Question with the given topic and difficulty level
+    # Parameters:   see selectuniquequestion
+    def getuniquequestion(self, qssofar, topic, difficulty="", otherstudents=[], alreadyused=[], qspool={}):
+        return self.selectuniquequestion(qssofar, topic, difficulty, otherstudents, alreadyused, qspool)[0]
+
+    # Returns a 2-tuple of (unique Question with the given topic and difficulty level, tier) where tier indicates
+    #   how far the uniqueness constraints had to be relaxed in order to find it (see examselect.TIER_* constants)
     # Parameters:   qssofar (list of Questions): the selected question must not already be in this list
     #               topic (string): the topic from which to collect questions -- must be specified
     #                   (ie, not WILD nor empty)
@@ -253,92 +451,70 @@ class ExamSession:
     #                   (of questions this student has already seen on a previous exam)
     #               qspool (dictionary of topic --> difficulty --> [list of Questions]): questions to draw from -
     #                   should already be date-restricted if applicable
-    def getuniquequestion(self, qssofar, topic, difficulty="", otherstudents=[], alreadyused=[], qspool={}):
+    #               seenids (set of strings): uniqueids this student has already seen on a previous exam;
+    #                   if given, used instead of alreadyused (eg as kept up to date in self.seenids)
+    #               seensources (set of strings): sources this student has already seen on a previous exam;
+    #                   if given, used instead of alreadyused (eg as kept up to date in self.seensources)
+    #               groupids (set of strings): uniqueids on this student's group members' exams; if given,
+    #                   used instead of otherstudents (eg as kept up to date in self.groupquestionids)
+    #               rng (random.Random, or the random module itself): source of randomness (see getrng)
+    def selectuniquequestion(self, qssofar, topic, difficulty="", otherstudents=[], alreadyused=[], qspool={},
+                             seenids=None, seensources=None, groupids=None, rng=random):
 
         if len(qspool.keys()) == 0:
             qspool = self.allquestions
 
-        # gather a list of all (appropriately dated) questions of this topic + difficulty, and pick a random one
-        # questions in qspool should already be restricted by date
-        eligibleqs = self.getquestions(topic, difficulty, qspool)
-        question = random.sample(eligibleqs, 1)[0]
-
-        # gather a list of questions that are on exams of students who this student works with
-        otherstudentquestions = []
-        for sid in otherstudents:
-            if sid in self.existingexams.keys():
-                sidexams = self.existingexams[sid]
-                if self.examtype in sidexams.keys():
-                    otherstudentquestions.extend(sidexams[self.examtype])
-
-        # gather a list of question (sub) types (eg signlanguage, morphology, UR, etc) already on this exam
-        qtypessofar = []
-        for q in qssofar:
-            for qtype in q.questiontypes:
-                qtypessofar.append(qtype)
-
-        # make sure that this question isn't already in this exam,
-        # and that we're not putting more than one question of this subtype in this exam
-        # and that this student doesn't get the exam same question that someone they worked with also has
-        # and that this student hasn't seen another question from this source on a previous exam
-        numtries = 0
-        while (question in qssofar) \
-                or isqtypeduplicate(question.questiontypes, qtypessofar) \
-                or (isuniqueidinquestions(question.uniqueid, otherstudentquestions)) \
-                or (isqsourceinquestions(question.source, alreadyused)):
-            if numtries > 50:
-                # this has to do with too many specific subtypes & too few questions of some topic/difficulty combos
-                if isqsourceinquestions(question.source, alreadyused):
-                    print("couldn't find a unique source for " + question.topic + " / " + question.difficulty+" - going to give up and allow overlap with group members")
-                    # print("group members: ", otherstudents)
-                elif isuniqueidinquestions(question.uniqueid, otherstudentquestions):
-                    print("couldn't find a question not in a group member's exam for " + question.topic + " / " + question.difficulty+" - going to give up and allow overlap with group members")
-                    # print("group members: ", otherstudents)
-                break
-            question = random.sample(eligibleqs, 1)[0]
-            numtries += 1
-
-        numtries2 = 0
-        while (question in qssofar) \
-                or isqtypeduplicate(question.questiontypes, qtypessofar) \
-                or (isqsourceinquestions(question.source, alreadyused)):
-                # no longer care about questions overlapping with group members
-            if numtries2 > 50:
-                # this has to do with too many specific subtypes & too few questions of some topic/difficulty combos
-                if isqsourceinquestions(question.source, alreadyused):
-                    print("couldn't find a unique source for " + question.topic + " / " + question.difficulty+" - going to give up and just request unique question instead")
-                break
-            question = random.sample(eligibleqs, 1)[0]
-            numtries2 += 1
-
-        numtries3 = 0
-        while (question in qssofar) \
-                or isqtypeduplicate(question.questiontypes, qtypessofar) \
-                or (isuniqueidinquestions(question.uniqueid, alreadyused)):
-                # no longer care about unique source among this student's questions,
-                # as long as exact question isn't repeated
-            if numtries3 > 50:
-                # this has to do with too many specific subtypes & too few questions of some topic/difficulty combos
-                if isuniqueidinquestions(question.uniqueid, alreadyused):
-                    print("couldn't find a unique source for " + question.topic + " / " + question.difficulty+" - going to give up and allow repetition of question subtype")
-                break
-            question = random.sample(eligibleqs, 1)[0]
-            numtries3 += 1
-
-        numtries4 = 0
-        while (question in qssofar) \
-                or isuniqueidinquestions(question.uniqueid, alreadyused):
-                # no longer care about doubling up of question subtypes
-            if numtries4 > 50:
-                # this has to do with too many specific subtypes & too few questions of some topic/difficulty combos
-                if isuniqueidinquestions(question.uniqueid, alreadyused):
-                    print("couldn't find a unique source for " + question.topic + " / " + question.difficulty+" - going to give up and just take whatever question we've got on hand")
-                    print("\n\t*** no, seriously-- this is worth paying attention to *** \n")
-                break
-            question = random.sample(eligibleqs, 1)[0]
-            numtries4 += 1
-
-        return question
+        # gather a set of question ids that are on exams of students who this student works with
+        otherstudentquestionids = groupids
+        if otherstudentquestionids is None:
+            otherstudentquestionids = set()
+            for sid in otherstudents:
+                if sid in self.existingexams.keys():
+                    sidexams = self.existingexams[sid]
+                    if self.examtype in sidexams.keys():
+                        otherstudentquestionids.update(q.uniqueid for q in sidexams[self.examtype])
+
+        # pick a random question from among those (appropriately dated) questions of this topic + difficulty that
+        #   aren't already in this exam,
+        #   and that don't put more than one question of the same subtype in this exam
+        #   and that aren't on the exam of someone this student worked with
+        #   and that aren't from a source this student has seen on a previous exam
+        # relaxing those constraints one at a time (in that order) only if no question satisfies them
+        question, tier = self.getselector(qspool).selectquestion(
+            topic, difficulty, qssofar,
+            groupids=otherstudentquestionids,
+            seenids=seenids if seenids is not None else {q.uniqueid for q in alreadyused},
+            seensources=seensources if seensources is not None else {q.source for q in alreadyused},
+            rng=rng
+        )
+
+        # this has to do with too many specific subtypes & too few questions of some topic/difficulty combos
+        if tier is None:
+            print("there are no questions at all for " + topic + " / " + difficulty)
+        elif tier >= examselect.TIER_GROUPOVERLAP:
+            print("couldn't find a unique source not in a group member's exam for " + topic + " / " + difficulty +
+                  " - going to give up and allow overlap with group members")
+            if tier >= examselect.TIER_REPEATSOURCE:
+                print("couldn't find a unique source for " + topic + " / " + difficulty +
+                      " - going to give up and just request unique question instead")
+            if tier >= examselect.TIER_REPEATQTYPE:
+                print("couldn't find a unique question for " + topic + " / " + difficulty +
+                      " - going to give up and allow repetition of question subtype")
+            if tier >= examselect.TIER_ANYTHING:
+                print("couldn't find a unique question for " + topic + " / " + difficulty +
+                      " - going to give up and just take whatever question we've got on hand")
+                print("\n\t*** no, seriously-- this is worth paying attention to *** \n")
+
+        return question, tier
+
+    # Returns a QuestionSelector indexing the given question pool (built once per pool)
+    # Parameters:   qspool (dictionary of topic --> difficulty --> [list of Questions]): questions to index
+    def getselector(self, qspool):
+        # keep a reference to the pool itself so its id can't be reused by another pool
+        if id(qspool) not in self.selectorcache.keys():
+            with exammetrics.timer("pools"):
+                self.selectorcache[id(qspool)] = (qspool, examselect.QuestionSelector(qspool))
+        return self.selectorcache[id(qspool)][1]
 
     # Returns a dictionary of difficulty (string) --> number of questions (int) for this exam session
     def getdiffdistr(self):
@@ -356,43 +532,29 @@ class ExamSession:
     #   (could involve multiple distinct groups)
     # Parameters:   sid (string): student id whose group members to collect
     def getgroupmembers(self, sid=""):
-        others = []
-        if sid != "":
-            for grp in self.studentgroups:
-                if sid in grp:
-                    others = [x for x in grp if x != sid]
-        return others
+        return sorted(self.groupmembers.get(sid, ()))
 
     # Returns a dictionary of topic-->difficulty-->[list of Questions] that are dated no later than
-    #   the last Friday strictly before examdate
+    #   the last Friday strictly before examdate (shared between calls with the same cutoff; don't modify it)
     # Parameters:   examdate (date object): date for which we're prepping questions
     #                   if None, defaults to the date of this ExamSession
     def getquestionsbeforestartdate(self, examdate=None):
         if examdate is None:
             examdate = self.startdate
 
-        qsbeforecutoff = {}
-
-        for t in self.allquestions.keys():
-            thistopicqs = self.allquestions[t]
-            for d in thistopicqs.keys():
-                thisdiffqs = thistopicqs[d]
-                thistopicdiffqs = [q for q in thisdiffqs if
-                                   (q.datecompleted is not None and q.datecompleted <= examio.getfrioflastweek(examdate))]
-                if len(thistopicdiffqs) > 0:
-                    if t not in qsbeforecutoff.keys():
-                        qsbeforecutoff[t] = {}
-                    if d not in qsbeforecutoff[t].keys():
-                        qsbeforecutoff[t][d] = []
-                    qsbeforecutoff[t][d].extend(thistopicdiffqs)
-        return qsbeforecutoff
+        # every exam in the same week has the same cutoff, so this pool is shared rather than rebuilt per student
+        with exammetrics.timer("pools"):
+            if self.datedindex is None:
+                self.datedindex = examselect.DatedQuestionIndex(self.allquestions)
+            return self.datedindex.getpool(examio.getfrioflastweek(examdate))
 
     # Returns two lists of strings (ordered topics and difficulties)
     # Parameters:   ordering (integer): type of ordering in which to arrange questions (see ORDER_* constants)
     #               topicslist (list of strings): question topics for this exam;
     #                   WILD not permitted (must have already been assigned a specific wildcard topic)
     #               diffslist (list of strings): corresponding difficulty levels for topics
-    def ordertopicsdiffs(self, ordering, topicslist, diffslist):
+    #               rng (random.Random, or the random module itself): source of randomness (see getrng)
+    def ordertopicsdiffs(self, ordering, topicslist, diffslist, rng=random):
         topicsorder = []
         diffsorder = []
 
@@ -412,7 +574,7 @@ class ExamSession:
                     diffsorder.append(diffscountdown.pop(idx))
 
             # the following only does something if there are some wildcard questions to deal with
-            randomwildorder = random.sample(range(len(topicscountdown)), len(topicscountdown))
+            randomwildorder = rng.sample(range(len(topicscountdown)), len(topicscountdown))
             for rw in randomwildorder:
                 if WILD in topicsorder:
                     idx = topicsorder.index(WILD)
@@ -420,7 +582,7 @@ class ExamSession:
                     diffsorder[idx] = diffscountdown[rw]
 
         elif ordering == ORDER_RANDOM:
-            randomwildorder = random.sample(range(len(topicslist)), len(topicslist))
+            randomwildorder = rng.sample(range(len(topicslist)), len(topicslist))
             for rw in randomwildorder:
                 topicsorder.append(topicslist[rw])
                 diffsorder.append(diffslist[rw])
@@ -441,7 +603,7 @@ class ExamSession:
                 idx += 1
 
             # recursively randomize the rest of the questions
-            topicscountdown, diffscountdown = self.ordertopicsdiffs(ORDER_RANDOM, topicscountdown, diffscountdown)
+            topicscountdown, diffscountdown = self.ordertopicsdiffs(ORDER_RANDOM, topicscountdown, diffscountdown, rng)
             topicsorder.extend(topicscountdown)
             diffsorder.extend(diffscountdown)
 
@@ -461,7 +623,7 @@ class ExamSession:
                 idx += 1
 
             # recursively randomize the rest of the questions
-            topicscountdown, diffscountdown = self.ordertopicsdiffs(ORDER_RANDOM, topicscountdown, diffscountdown)
+            topicscountdown, diffscountdown = self.ordertopicsdiffs(ORDER_RANDOM, topicscountdown, diffscountdown, rng)
             topicsorder.extend(topicscountdown)
             topicsorder.reverse()
             diffsorder.extend(diffscountdown)
@@ -477,16 +639,120 @@ class ExamSession:
         # if this student has already had an exam of this type generated, just return those questions
         if self.thisstudentexamexists(sid, self.examtype):
             return self.getthisstudentquestionsseen(sid, self.examtype)
-        # get questions that this student has seen on any (potential) previous exama
-        alreadyseen = self.getthisstudentquestionsseen(sid, "")
-        # get list of other students who have worked with this student (could be empty)
-        otherstudentsingroup = self.getgroupmembers(sid)
+
+        exammetrics.setcontext(sid, examdate)
+        if sid in self.plannedexams.keys():
+            # this student's exam was chosen along with everyone else's (see planexams)
+            questionsforthisexam, tiers = self.plannedexams.pop(sid)
+            exammetrics.counttiers([t for t in tiers if t is not None], len(self.topics))
+            self.addquestionstoexisting(sid, self.examtype, questionsforthisexam, examdate, tiers)
+            return questionsforthisexam
+
+        questionsforthisexam, tiers = self.choosequestionsforoneexam(
+            examdate,
+            # questions (and their sources) that this student has seen on any (potential) previous exams
+            self.seenids.get(sid, set()),
+            self.seensources.get(sid, set()),
+            # questions on the exams of other students who have worked with this student (could be empty)
+            self.groupquestionids.get(sid, set()),
+            self.getrng(sid),
+            sid
+        )
+        exammetrics.counttiers(tiers, len(self.topics))
+
+        # record that this student now has had an exam of this type generated, using these questions
+        self.addquestionstoexisting(sid, self.examtype, questionsforthisexam, examdate, tiers)
+
+        return questionsforthisexam
+
+    # Returns a list of Questions that the given student would get if their exam of this session's type were
+    #   chosen now (without recording it), as if they didn't already have one
+    # In seeded mode (see getrng), this is the same exam they got originally as long as their other exams and their
+    #   group members' exams are the same as they were at the time (eg, not if a group member's exam was chosen later)
+    # Parameters:   sid (string): student id whose exam this is
+    #               examdate (date object): date of this exam
+    def regenerateexam(self, sid, examdate=None):
+        otherexams = {extype: qs for extype, qs in self.existingexams.get(sid, {}).items() if extype != self.examtype}
+        groupids = set()
+        for other in self.groupmembers.get(sid, ()):
+            groupids.update(q.uniqueid for q in self.existingexams.get(other, {}).get(self.examtype, []))
+        questions, tiers = self.choosequestionsforoneexam(
+            examdate,
+            {q.uniqueid for qs in otherexams.values() for q in qs},
+            {q.source for qs in otherexams.values() for q in qs},
+            groupids,
+            self.getrng(sid),
+            sid
+        )
+        return questions
+
+    # Returns True iff regenerateexam produces exactly the exam that's recorded for this student
+    # Parameters:   sid (string): student id whose exam to check
+    #               examdate (date object): date of this exam
+    def verifyexam(self, sid, examdate=None):
+        if not self.thisstudentexamexists(sid, self.examtype):
+            return False
+        recorded = [q.uniqueid for q in self.existingexams[sid][self.examtype]]
+        return [q.uniqueid for q in self.regenerateexam(sid, examdate)] == recorded
+
+    # Returns the source of randomness to use for choosing the given student's exam: in seeded mode (ie, if a random
+    #   seed was given), its own random.Random derived from the seed, exam type, and student id, so that each
+    #   student's exam comes out the same regardless of what order (or which process) exams are chosen in;
+    #   otherwise the random module itself
+    # Parameters:   sid (string): student id whose exam is being chosen
+    def getrng(self, sid):
+        if self.randomseed is None:
+            return random
+        return random.Random("|".join([self.randomseed, self.examtype, sid]))
+
+    # Returns a 2-tuple of (list of Questions that will comprise one student's exam, list of tiers to which uniqueness
+    #   constraints had to be relaxed to choose each of them)
+    # Parameters:   examdate (date object): date of this exam
+    #               seenids (set of strings): uniqueids this student has already seen on previous exams
+    #               seensources (set of strings): sources this student has already seen on previous exams
+    #               groupids (set of strings): uniqueids on this student's group members' exams of this type
+    #               rng (random.Random, or the random module itself): source of randomness (see getrng)
+    #               sid (string): student id whose exam this is (only used in messages)
+    def choosequestionsforoneexam(self, examdate, seenids, seensources, groupids, rng=random, sid=""):
 
         questionsforthisexam = []
 
         questionspool = self.getquestionsbeforestartdate(examdate)
+        topicsorder, diffsorder = self.choosetopicsdiffsforoneexam(examdate, questionspool, rng, sid)
+
+        tiers = []
+        with exammetrics.timer("selection"):
+            # for i in range(numqs):
+            for i, topic in enumerate(topicsorder):
+                thequestion, tier = self.selectuniquequestion(
+                    questionsforthisexam,
+                    topic,  # =topicsorder[i],
+                    difficulty=diffsorder[i],
+                    qspool=questionspool,
+                    seenids=seenids,
+                    seensources=seensources,
+                    groupids=groupids,
+                    rng=rng
+                )
+                if thequestion is not None:
+                    questionsforthisexam.append(thequestion)
+                    tiers.append(tier)
+                else:
+                    print("question with index "+str(i)+" is None")
+                    # TODO - then what?
+
+        return questionsforthisexam, tiers
+
+    # Returns two lists of strings (the topic and difficulty of each question on one student's exam, in order)
+    # Parameters:   examdate (date object): date of this exam
+    #               questionspool (dictionary of topic --> difficulty --> [list of Questions]): questions eligible
+    #                   for this exam (see getquestionsbeforestartdate)
+    #               rng (random.Random, or the random module itself): source of randomness (see getrng)
+    #               sid (string): student id whose exam this is (only used in messages)
+    def choosetopicsdiffsforoneexam(self, examdate, questionspool, rng=random, sid=""):
         wildcardtopics = [t for t in questionspool.keys() if t in self.wildcardtopics]
-        wildcardtopics = list(set(wildcardtopics))
+        # sorted so that seeded random choices among them always come out the same
+        wildcardtopics = sorted(set(wildcardtopics))
 
         topicsavailable = [t for t in questionspool.keys()]
         diffsavailable = []
@@ -538,168 +804,238 @@ class ExamSession:
             diffsneeded.remove(d)
 
         # randomly combine topics (including assigning a wildcard topic if necessary) with difficulties
-        #   and make sure that these combinations exist in the eligible questions
-        topicslist, diffslist = maketopicdiffcombo(topicsneeded, diffsneeded, wildcardtopics)
-        numiterations = 0
-        while not docombosexist(questionspool, topicslist, diffslist) and numiterations < 100:
-            topicslist, diffslist = maketopicdiffcombo(topicsneeded, diffsneeded, wildcardtopics)
-            numiterations += 1
-        if numiterations >= 100:
-            print("Looks like we might be heading into an infinite loop looking for topic/difficulty combinations;")
+        #   such that there are enough eligible questions for every combination
+        # (any specific topic/diff combos are kept together, and added after the others)
+        availability = self.getselector(questionspool).availability
+        with exammetrics.timer("combos"):
+            combo = solvetopicdiffcombo(topicsneeded, diffsneeded, wildcardtopics, availability,
+                                        self.topicdiffpairs, rng)
+        if combo is None and self.allowrepeatedcombos:
+            # not enough distinct questions for some combination; settle for combinations that merely exist,
+            #   even though that means a question might have to appear twice on this exam
+            exammetrics.count("combofallbacks")
+            numslots = len(self.topics)
+            anyavailable = {key: numslots for key, count in availability.items() if count > 0}
+            with exammetrics.timer("combos"):
+                combo = solvetopicdiffcombo(topicsneeded, diffsneeded, wildcardtopics, anyavailable,
+                                            self.topicdiffpairs, rng)
+            if combo is not None:
+                for (t, d), count in sorted(getcombocounts(*combo).items()):
+                    if count > availability.get((t, d), 0):
+                        print("Warning: the exam for " + (sid if sid != "" else "a student") + " dated " +
+                              examdate.strftime("%Y-%m-%d") + " has " + str(count) + " questions of " + t + " / " +
+                              d + ", which only has " + str(availability.get((t, d), 0)) + " question(s) available;"
+                              " some of them may be repeated on this exam.")
+        if combo is None:
+            print("There is no way to combine the requested topics and difficulties using the questions available "
+                  "for an exam dated " + examdate.strftime("%Y-%m-%d") +
+                  (" (" + sid + ")" if sid != "" else "") + ".")
+            print("Number of questions available for each topic/difficulty combination:")
+            for (t, d), count in sorted(availability.items()):
+                if d != "" and (t in self.topics or t in wildcardtopics):
+                    print("\t" + t + " / " + d + ": " + str(count))
             print("please double-check that your distributions are feasible.")
+            if not self.allowrepeatedcombos:
+                print("(or, to let a combination with too few questions appear more often than it has distinct "
+                      "questions, add \"repeat combinations: yes\" to the config file)")
             print("----- Exiting -----")
             sys.exit(1)
+        topicslist, diffslist = combo
 
-        # if we took out any specific topic/diff combos, add them back in
-        for t, d in self.topicdiffpairs:
-            thetopic = t
-            if t == "WILD":
-                # we need to choose actual topics for any of the specific topic/diff combos that were wildcard questions
-                thetopic = random.sample(wildcardtopics, 1)[0]
-            topicslist.append(thetopic)
-            diffslist.append(d)
-
-        topicsorder, diffsorder = self.ordertopicsdiffs(self.ordering, topicslist, diffslist)
-
-        # for i in range(numqs):
-        for i, topic in enumerate(topicsorder):
-            thequestion = self.getuniquequestion(
-                questionsforthisexam,
-                topic,  # =topicsorder[i],
-                difficulty=diffsorder[i],
-                otherstudents=otherstudentsingroup,
-                alreadyused=alreadyseen,
-                qspool=questionspool
-            )
-            if thequestion is not None:
-                questionsforthisexam.append(thequestion)
-            else:
-                print("question with index "+str(i)+" is None")
-                # TODO - then what?
-
-        # record that this student now has had an exam of this type generated, using these questions
-        self.addquestionstoexisting(sid, self.examtype, questionsforthisexam)
-
-        return questionsforthisexam
+        return self.ordertopicsdiffs(self.ordering, topicslist, diffslist, rng)
 
     # Adds this sid, exam type, and questions list combination to the collection of existing exams/questions
     # Parameters:   sid (string): the student number whose exam questions we're recording
     #               extype (string): the exam type that the questions are associated with
     #               questions ([list of Questions]): the questions on this student's exam
-    def addquestionstoexisting(self, sid, extype, questions):
+    #               examdate (date object): the date of this student's exam (default None: unknown)
+    #               tiers (list of integers): how far uniqueness constraints had to be relaxed to choose each question
+    #                   (see examselect.TIER_* constants; default None: unknown)
+    def addquestionstoexisting(self, sid, extype, questions, examdate=None, tiers=None):
         if sid not in self.existingexams.keys():
             self.existingexams[sid] = {}
         if extype not in self.existingexams[sid].keys():
             self.existingexams[sid][extype] = []
         self.existingexams[sid][extype].extend(questions)
+        self.registerexam(sid, extype, questions)
+        self.examdetails[(sid, extype)] = {"examdate": examdate, "tiers": tiers}
 
     # Generate LaTeX source for all questions for this exam session, sorted by topic (and then difficulty);
-    #   write to file
+    #   write to file; returns the path to the .tex file written
     def generatelatexquestionbankbytopic(self, foldername):
 
         questionbanktex = self.course.replace(" ", "_")+"-questionbank.tex"
         fullpathtofile = foldername + "/" + questionbanktex
 
-        with open(fullpathtofile, "w", encoding="utf-8") as tf:
+        with exammetrics.timer("rendering"), DocumentBuilder(fullpathtofile, self.outputstats, self.archive) as tf:
             writedochead(tf, "ALL QUESTIONS", "BY TOPIC")
 
             for topic in self.allquestions.keys():
                 for difficulty in self.allquestions[topic].keys():
-                    writequestionbank(tf, topic, difficulty, self.allquestions[topic][difficulty])
+                    writequestionbank(tf, topic, difficulty, self.allquestions[topic][difficulty], self.fragments)
             writedocfoot(tf)
 
-        # only use this if you are 100% confident the latex is compilable; otherwise python and xetex both hang
-        # generatepdf(fullpathtofile)
+        return fullpathtofile
 
 #
 # ^^^ end of ExamSession class ^^^
 #
 
 
+# the ExamSession used by this worker process (see generatelatexexams_parallel)
+workersession = None
+
+
+# Sets up a worker process for generatelatexexams_parallel
+# Parameters:   session (ExamSession): copy of the exam session whose days this process will generate
+#               metricson (boolean): whether to collect timings and counts (see exammetrics) for each day
+def initexamdayworker(session, metricson=False):
+    global workersession
+    workersession = session
+    if metricson:
+        exammetrics.enable()
+    else:
+        exammetrics.disable()
+    # cached selectors are keyed by id, which doesn't survive being copied to another process
+    workersession.selectorcache = {}
+    # otherwise every (forked) worker would make the same random choices
+    random.seed()
+
+
+# Generate LaTeX source (and tsv) for one exam day in a worker process;
+#   returns a 5-tuple of (list of paths to the .tex files written,
+#   list of (studentid, examtype, [list of uniqueids], details) for the exams chosen along the way,
+#   list of (name, path to file, number of bytes, sha256) for the files to be added to the archive, if there is one
+#   (see ExamSession.archive and examarchive.MemberCollector),
+#   list of question assignment records to be exported, if they are being (see ExamSession.exporter),
+#   the timings and counts collected for this day (see exammetrics.getstate), or None if they aren't being)
+# Parameters:   see ExamSession.generatelatexexams_oneday
+def generateexamdayinworker(texfilepath, tsvfilepath, examdate, rubric):
+    alreadychosen = set(workersession.examdetails.keys())
+    exammetrics.reset()
+    members = []
+    if workersession.archive is not None:
+        workersession.archive.members = members
+    records = []
+    if workersession.exporter is not None:
+        workersession.exporter.records = records
+    texfilepaths = workersession.generatelatexexams_oneday(texfilepath, tsvfilepath, examdate, rubric)
+    newexams = []
+    for (sid, extype), details in workersession.examdetails.items():
+        if (sid, extype) not in alreadychosen:
+            qids = [q.uniqueid for q in workersession.existingexams[sid][extype]]
+            newexams.append((sid, extype, qids, details))
+    metrics = exammetrics.getstate() if exammetrics.enabled else None
+    return texfilepaths, newexams, members, records, metrics
+
+
 #
 # vvv helper functions vvv
 #
 
 # Returns a datetime.time object corresponding to the time represented by s
-# Parameters:   s (string): a time of day in any format (e.g. "18:32", "4:30PM", "10:05 AM", "PM 5:34", etc)
+# Parameters:   s (string): a time of day in any format (e.g. "18:32", "4:30PM", "10:05 AM", "PM 5:34", etc);
+#                   empty (as for exams without signup slots) is treated as midnight
 def str_to_time(s):
+    if s.strip() == "":
+        return datetime.min.time()
     s = s.upper()
     if s.startswith("AM") or s.startswith("PM"):
         # parser doesn't know how to deal with prepended am/pm
         s = s[2:].strip() + s[:2]
+    from dateutil import parser  # only needed here
     t = parser.parse(s).time()
     return t
 
 
-# Returns True iff there is a Question in questions with the given uniqueid
-# Parameters:   uniqueid (string): the unique question ID to check for
-#               questions (list of Questions): the questions to look through
-def isuniqueidinquestions(uniqueid, questions):
-    ids = [q.uniqueid for q in questions]
-    return uniqueid in ids
-
-
-# Returns True iff there is a Question in questions with the given source
-# Parameters:   source (string): the question source to check for
-#               questions (list of Questions): the questions to look through
-def isqsourceinquestions(source, questions):
-    sources = [q.source for q in questions]
-    return source in sources
+# Returns (topicslist, diffslist) where each is randomly ordered and where any WILD topics in the topics list have
+#   been replaced by an actual topic, such that (for every i) there are enough questions of topic topicslist[i]
+#   and difficulty diffslist[i] for all of the pairs together; or None if there is no such combination at all
+# Wildcard topics that don't have a specific difficulty must all be different from each other.
+# This is a randomized backtracking search, so it always finds a combination if there is one.
+# Parameters:   topicsneeded (list of strings): topics to arrange (not including specific topic/diff pairs)
+#               diffsneeded (list of strings): difficulties to arrange (not including specific topic/diff pairs)
+#               wildtopicslist (list of strings): possible wildcard topics to use
+#               availability (dictionary of (topic, difficulty) --> integer): number of questions available
+#                   for each topic/difficulty combination
+#               topicdiffpairs (list of 2-tuples of strings): specific topic/difficulty pairs (topic could be WILD),
+#                   which are added to the end of the lists
+#               rng (random.Random, or the random module itself): source of randomness
+def solvetopicdiffcombo(topicsneeded, diffsneeded, wildtopicslist, availability, topicdiffpairs=[], rng=random):
+    # specific pairs first since they're the most constrained, then topics that aren't wildcards
+    pairedslots = [(t, d) for t, d in topicdiffpairs]
+    freeslots = rng.sample(topicsneeded, len(topicsneeded))
+    freeslots.sort(key=lambda t: t == WILD)
+    slots = [(t, d) for t, d in pairedslots] + [(t, None) for t in freeslots]
+
+    diffsleft = {}
+    for d in diffsneeded:
+        diffsleft[d] = diffsleft.get(d, 0) + 1
+    used = {}  # (topic, difficulty) --> number of slots using that combination so far
+    wildused = set()  # wildcard topics used so far by slots without a specific difficulty
+    chosen = []
+    deadends = set()  # states already known not to lead to a solution
+    backtracks = 0  # choices undone because nothing could follow them
+
+    def search(idx):
+        nonlocal backtracks
+        if idx == len(slots):
+            return True
+        state = (idx, tuple(sorted(diffsleft.items())), frozenset(wildused), tuple(sorted(used.items())))
+        if state in deadends:
+            return False
+        slottopic, slotdiff = slots[idx]
+        topicoptions = [slottopic]
+        if slottopic == WILD:
+            topicoptions = rng.sample(wildtopicslist, len(wildtopicslist))
+            if slotdiff is None:
+                topicoptions = [t for t in topicoptions if t not in wildused]
+        diffoptions = [slotdiff]
+        if slotdiff is None:
+            diffoptions = [d for d in sorted(diffsleft.keys()) if diffsleft[d] > 0]
+            diffoptions = rng.sample(diffoptions, len(diffoptions))
+
+        for t in topicoptions:
+            for d in diffoptions:
+                if used.get((t, d), 0) >= availability.get((t, d), 0):
+                    continue
+                used[(t, d)] = used.get((t, d), 0) + 1
+                if slotdiff is None:
+                    diffsleft[d] -= 1
+                    if slottopic == WILD:
+                        wildused.add(t)
+                chosen.append((t, d))
+                if search(idx + 1):
+                    return True
+                chosen.pop()
+                backtracks += 1
+                if slotdiff is None:
+                    diffsleft[d] += 1
+                    if slottopic == WILD:
+                        wildused.discard(t)
+                used[(t, d)] -= 1
+        deadends.add(state)
+        return False
 
+    found = search(0)
+    exammetrics.count("combobacktracks", backtracks)
+    if not found:
+        return None
+    # put the specific pairs at the end, as they've always been
+    freepairs = chosen[len(pairedslots):]
+    freepairs = rng.sample(freepairs, len(freepairs))
+    allpairs = freepairs + chosen[:len(pairedslots)]
+    return [t for t, d in allpairs], [d for t, d in allpairs]
 
-# Returns True iff one of the questionype tags in potentialqtypes is also in existingqtypes
-# Parameters:   potentialqtypes (list of strings): the subtypes of a potential exam question
-#               existingqtypes (list of strings): the subtypes already existing in the exam
-def isqtypeduplicate(potentialqtypes, existingqtypes):
-    questiontypeisduplicate = False
-    for questiontype in potentialqtypes:
-        if questiontype in existingqtypes:
-            questiontypeisduplicate = True
-    return questiontypeisduplicate
 
-
-# Returns (topicslist, diffslist) where each is randomly ordered and
-#   where any WILD topics in the topics list have been replaced by an actual topic
-# Parameters:   topicsneeded (list of strings): topics to arrange
-#               diffsneeded (list of strings): difficulties to arrange
-#               wildtopicslist (list of strings): possible wildcard topics to use
-def maketopicdiffcombo(topicsneeded, diffsneeded, wildtopicslist):
-    wildcardtopicsused = []
-    # randomly combine topics (including assigning a wildcard topic if necessary) with difficulties
-    # and make sure that these combinations exist in the eligible questions
-    for t in topicsneeded:
-        if t == WILD:
-            curwildtopic = random.sample(wildtopicslist, 1)[0]
-            while curwildtopic in wildcardtopicsused:
-                curwildtopic = random.sample(wildtopicslist, 1)[0]
-            wildcardtopicsused.append(curwildtopic)
-    topicslist = [t for t in topicsneeded if t != WILD]
-    topicslist.extend(wildcardtopicsused)
-    topicslist = random.sample(topicslist, len(topicslist))
-    diffslist = random.sample(diffsneeded, len(diffsneeded))
-
-    return topicslist, diffslist
-
-
-# Returns True iff questionspool contains questions of each t_i & d_i,
-#   where t_i is in topics and d_i is in difficulties (ie, zipped pairs of the topics & difficulties lists)
-# Parameters:   questionspool (dictionary of topic --> difficulty --> [list of Questions]): questions to check
-#               topics (list of strings): topics to pair with difficulties in next argument
-#               difficulties (list of strings): difficulties to pair with topics in previous argument
-def docombosexist(questionspool, topics, difficulties):
-    if isinstance(questionspool, dict):
-        questionstocheck = flattenqsdict(questionspool)
-    else:  # should be a list if not a dictionary (...?)
-        questionstocheck = [q for q in questionspool]
-    for i in range(len(topics)):
-        success = False
-        for q in questionstocheck:
-            if q.topic == topics[i] and q.difficulty == difficulties[i]:
-                success = True
-                questionstocheck.remove(q)
-        if success is False:
-            return False
-    return True
+# Returns a dictionary of (topic, difficulty) --> number of times that combination appears in the given lists
+# Parameters:   topicslist (list of strings): topic of each question, as returned by solvetopicdiffcombo
+#               diffslist (list of strings): corresponding difficulty of each question
+def getcombocounts(topicslist, diffslist):
+    counts = {}
+    for t, d in zip(topicslist, diffslist):
+        counts[(t, d)] = counts.get((t, d), 0) + 1
+    return counts
 
 
 # Returns a (flattened) list of all the Questions in the input, no longer in a hierarchy of topic/difficulty
@@ -718,7 +1054,8 @@ def flattenqsdict(qsdict):
 #               topic (string): the topic for this section
 #               difficulty (string): the difficulty for this section
 #               questionslist (list of Questions): the questions to write for this topic/difficulty section
-def writequestionbank(texfile, topic, difficulty, questionslist):
+#               fragments (QuestionFragments): if given, where to get each question's (already rendered) markup
+def writequestionbank(texfile, topic, difficulty, questionslist, fragments=None):
     texfile.write("\\textbf{\\underline{\\huge " + topic + " / " + difficulty + "\\\\}}" + "\n\n")
     for idx, question in enumerate(questionslist):
         completedstring = ""
@@ -728,10 +1065,147 @@ def writequestionbank(texfile, topic, difficulty, questionslist):
             completedstring = question.datecompleted.strftime("%Y%m%d")
         texfile.write(
             "~\\\\" + "\n" + "\n" + "{\\large Question " + str(idx + 1) + "} (completed " + completedstring + ") - ")
-        texfile.write(makequestiontex(question, True))
+        if fragments is not None:
+            texfile.write(fragments.getquestiontex(question, True))
+        else:
+            texfile.write(makequestiontex(question, True))
     texfile.write("\\newpage")
 
 
+# this class stands in for a file object opened for writing (for the write* functions below), but collects
+# everything written to it and only writes to the actual file, in one go, once there's a good amount of it
+# (see flushifbig) and when it's closed, so that a day's worth of exams isn't written a few characters at a time
+class DocumentBuilder:
+
+    # Parameters:   path (string): the file to write
+    #               stats (dictionary): if given, path --> {"bytes": integer, "writes": integer} is recorded in it
+    #                   when this file is closed (the number of bytes written, and how many writes it took)
+    #               archive (examarchive.ExamArchive or MemberCollector): if given, the file is written into this
+    #                   archive (see openmember) instead of on its own
+    def __init__(self, path, stats=None, archive=None):
+        self.path = path
+        self.stats = stats
+        self.parts = []
+        # adding text to what will be written is the most frequent thing done here, so it's as direct as can be
+        self.write = self.parts.append
+        self.numbytes = 0
+        self.numwrites = 0
+        if archive is not None:
+            self.file = archive.openmember(path)
+        else:
+            # unbuffered, so every write below is exactly one write to the file
+            self.file = open(path, "wb", buffering=0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exctype, excvalue, traceback):
+        self.close()
+
+    # Writes everything collected so far to the file if it's in at least FLUSHPARTS pieces
+    #   (eg call this after each exam, to keep the amount held in memory down)
+    def flushifbig(self):
+        if len(self.parts) >= FLUSHPARTS:
+            self.flush()
+
+    # Writes everything collected so far to the file
+    def flush(self):
+        if len(self.parts) == 0:
+            return
+        text = "".join(self.parts)
+        if os.linesep != "\n":
+            # as a file opened in text mode would
+            text = text.replace("\n", os.linesep)
+        data = memoryview(text.encode("utf-8"))
+        while len(data) > 0:
+            numwritten = self.file.write(data)
+            self.numwrites += 1
+            self.numbytes += numwritten
+            data = data[numwritten:]
+        self.parts.clear()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+        if self.stats is not None:
+            self.stats[self.path] = {"bytes": self.numbytes, "writes": self.numwrites}
+
+
+# this class renders each question's markup (student copy, instructor copy, and tsv columns) the first time it's
+# needed and keeps it, so that a question on many students' exams is only rendered once per session
+class QuestionFragments:
+
+    def __init__(self):
+        self.fragments = {}  # (uniqueid, variant) --> string
+
+    # Returns the LaTeX markup for the given question (see makequestiontex)
+    # Parameters:   question (Question): the question to be written
+    #               instructorversion (Boolean): whether or not we're writing the instructor copy of an exam
+    def getquestiontex(self, question, instructorversion=False):
+        key = (question.uniqueid, "instructor" if instructorversion else "student")
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            fragment = makequestiontex(question, instructorversion, texortsv="tex")
+            self.fragments[key] = fragment
+        return fragment
+
+    # Returns the LaTeX markup for the given question, all on one line as it goes in a tsv (see makequestiontex)
+    # Parameters:   question (Question): the question to be written
+    def gettsvlatex(self, question):
+        key = (question.uniqueid, "tsvlatex")
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            fragment = makequestiontex(question, instructorversion=False, texortsv="tsv")
+            self.fragments[key] = fragment
+        return fragment
+
+    # Returns everything after the student id in the given question's line of an exam tsv (see writeexamquestiontsv)
+    # Parameters:   question (Question): the question to be written
+    def gettsvcolumns(self, question):
+        key = (question.uniqueid, "tsv")
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            fragment = maketsvline(gettsvcolumnvalues(question, self.gettsvlatex(question)))
+            self.fragments[key] = fragment
+        return fragment
+
+
+# LaTeX preamble that begins every generated document
+DOCPREAMBLE = "".join([
+    "% Ensure that you compile using XeLaTeX !!! PDFTex has problems with some of the packages used \n",
+    "\\documentclass[12pt]{article}" + "\n",
+    "\\setlength\\parindent{0pt}" + "\n\n",
+    "\\usepackage{parskip}" + "\n",
+    "\\usepackage[margin=0.5in]{geometry}" + "\n",
+    "\\usepackage{fullpage}" + "\n",
+    "\\usepackage{moresize}" + "\n",
+
+    "\\usepackage{graphicx}" + "\n",
+    "\\usepackage{caption}" + "\n",
+    "\\usepackage{subcaption}" + "\n",
+    "\\usepackage{float}" + "\n",
+    "\\usepackage{xcolor}" + "\n",
+    "\\usepackage{soul}" + "\n",
+    "\\usepackage{fontspec}" + "\n",
+    "\\setmainfont{Doulos SIL}" + "\n\n",
+
+    "\\begin{document}" + "\n\n",
+])
+EXAMEND = "".join([
+    "\\begin{center}" + "\n",
+    "\\textbf{{\\color{red}{\\HUGE END OF EXAM}}}\\\\" + "\n\n",
+    "\\end{center}" + "\n",
+    "\\newpage" + "\n\n",
+])
+DOCFOOT = "\\end{document}" + "\n\n"
+TSVHEADER = "\t".join(["Person", "QuestionID", "Topic", "Difficulty", "Source", "Question_latex",
+                       "Image1", "Image1Caption", "Image2", "Image2Caption"]) + "\n"
+# how many pieces of text a DocumentBuilder collects before writing them out (a few MB, for exams)
+FLUSHPARTS = 20000
+
+
 # Generate LaTeX preamble and title page markup for one exam day's document; write to file
 # Parameters:   texfile (file object, as from io.open()): .tex file being generated
 #               title1 (string): first line of title page text
@@ -739,31 +1213,16 @@ def writequestionbank(texfile, topic, difficulty, questionslist):
 #               onefileperstudent (boolean): whether to write a separate tex/pdf for each student
 #                   (as opposed to the default, which is to batch all of one day's exams into one file)
 def writedochead(texfile, title1, title2, onefileperstudent=False):
-    texfile.write("% Ensure that you compile using XeLaTeX !!! PDFTex has problems with some of the packages used \n")
-    texfile.write("\\documentclass[12pt]{article}" + "\n")
-    texfile.write("\\setlength\\parindent{0pt}" + "\n\n")
-    texfile.write("\\usepackage{parskip}" + "\n")
-    texfile.write("\\usepackage[margin=0.5in]{geometry}" + "\n")
-    texfile.write("\\usepackage{fullpage}" + "\n")
-    texfile.write("\\usepackage{moresize}" + "\n")
-
-    texfile.write("\\usepackage{graphicx}" + "\n")
-    texfile.write("\\usepackage{caption}" + "\n")
-    texfile.write("\\usepackage{subcaption}" + "\n")
-    texfile.write("\\usepackage{float}" + "\n")
-    texfile.write("\\usepackage{xcolor}" + "\n")
-    texfile.write("\\usepackage{soul}" + "\n")
-    texfile.write("\\usepackage{fontspec}" + "\n")
-    texfile.write("\\setmainfont{Doulos SIL}" + "\n\n")
-
-    texfile.write("\\begin{document}" + "\n\n")
+    texfile.write(DOCPREAMBLE)
 
     if not onefileperstudent:
-        texfile.write("\\begin{center}" + "\n")
-        texfile.write("\\textbf{{\\color{violet}{\\HUGE " + title1 + "\\\\}}}" + "\n\n")
-        texfile.write("\\textbf{{\\color{violet}{\\HUGE " + title2 + "\\\\}}}" + "\n\n")
-        texfile.write("\\end{center}" + "\n")
-        texfile.write("\\newpage" + "\n\n")
+        texfile.write(
+            "\\begin{center}" + "\n" +
+            "\\textbf{{\\color{violet}{\\HUGE " + title1 + "\\\\}}}" + "\n\n" +
+            "\\textbf{{\\color{violet}{\\HUGE " + title2 + "\\\\}}}" + "\n\n" +
+            "\\end{center}" + "\n" +
+            "\\newpage" + "\n\n"
+        )
 
 
 # Generate LaTeX markup for a single exam's title page; write to file
@@ -771,12 +1230,14 @@ def writedochead(texfile, title1, title2, onefileperstudent=False):
 #               sid (string): student ID for this exam
 #               time (string): timeslot for this exam
 def writeexamstart(texfile, sid, time):
-    texfile.write("\\begin{center}" + "\n")
-    texfile.write("\\textbf{{\\color{blue}{\\HUGE START OF EXAM\\\\}}}" + "\n\n")
-    texfile.write("\\textbf{{\\color{blue}{\\HUGE Student ID: " + sid + "\\\\}}}" + "\n\n")
-    texfile.write("\\textbf{{\\color{blue}{\\HUGE " + time + "\\\\}}}" + "\n\n")
-    texfile.write("\\end{center}" + "\n")
-    texfile.write("\\newpage" + "\n\n")
+    texfile.write(
+        "\\begin{center}" + "\n" +
+        "\\textbf{{\\color{blue}{\\HUGE START OF EXAM\\\\}}}" + "\n\n" +
+        "\\textbf{{\\color{blue}{\\HUGE Student ID: " + sid + "\\\\}}}" + "\n\n" +
+        "\\textbf{{\\color{blue}{\\HUGE " + time + "\\\\}}}" + "\n\n" +
+        "\\end{center}" + "\n" +
+        "\\newpage" + "\n\n"
+    )
 
 
 # Generate LaTeX markup for a single exam question, including question number,
@@ -786,47 +1247,61 @@ def writeexamstart(texfile, sid, time):
 #               texfile (file object, as from io.open()): .tex file being generated
 #               instrcopy (Boolean): whether or not we're writing the isntructor copy of an exam
 #               rubric (string): the line of text that should be printed at the bottom of each page
-def writeexamquestiontex(questionnum, question, texfile, instrcopy=False, rubric=""):
+#               fragments (QuestionFragments): if given, where to get the question's (already rendered) markup
+def writeexamquestiontex(questionnum, question, texfile, instrcopy=False, rubric="", fragments=None):
+    if fragments is not None:
+        questiontex = fragments.getquestiontex(question, instrcopy)
+    else:
+        questiontex = makequestiontex(question, instrcopy, texortsv="tex")
+    # (separate writes, since a DocumentBuilder joins them all at once anyway)
     texfile.write("{\\large Question " + str(questionnum) + "}\\\\" + "\n\n")
-    texfile.write(makequestiontex(question, instrcopy, texortsv="tex"))
-    texfile.write("\\vfill" + "\n" + rubric + "\n")
-    texfile.write("\\newpage" + "\n\n")
+    texfile.write(questiontex)
+    texfile.write("\\vfill" + "\n" + rubric + "\n" + "\\newpage" + "\n\n")
 
 
 # Write a line to tsv of exam questions - to be used with Canvas, eg
 #   Each line includes columns for student number, topic, difficulty, source, question TeX markup (including images),
 #   and if applicable: image1 filename, image1 caption, image2 filename, image2 caption
+#   (quoted where necessary; see maketsvline)
 # Parameters:   stid (string): student whose question this is
 #               question (Question object): question to be written as part of this student's exam
 #               tsvfile (file object, as from io.open()): .tsv file being generated
-def writeexamquestiontsv(stid, question, tsvfile):
-    tsvfile.write(
-        stid + "\t" +
-        question.uniqueid + "\t" +
-        question.topic + "\t" +
-        question.difficulty + "\t" +
-        question.source + "\t" +
-        makequestiontex(question, instructorversion=False, texortsv="tsv") + "\t" +
-        question.image1 + "\t" +
-        question.image1caption + "\t" +
-        question.image2 + "\t" +
-        question.image2caption + "\n"
-    )
+#               fragments (QuestionFragments): if given, where to get the question's (already rendered) columns
+def writeexamquestiontsv(stid, question, tsvfile, fragments=None):
+    if fragments is not None:
+        tsvfile.write(maketsvline([stid])[:-1] + "\t" + fragments.gettsvcolumns(question))
+        return
+    tsvlatex = makequestiontex(question, instructorversion=False, texortsv="tsv")
+    tsvfile.write(maketsvline([stid] + gettsvcolumnvalues(question, tsvlatex)))
+
+
+# Returns the list of values (other than the student id) in the given question's line of an exam tsv
+# Parameters:   question (Question object): question to be written as part of a student's exam
+#               tsvlatex (string): the question's LaTeX markup, all on one line (see makequestiontex)
+def gettsvcolumnvalues(question, tsvlatex):
+    return [question.uniqueid, question.topic, question.difficulty, question.source, tsvlatex,
+            question.image1, question.image1caption, question.image2, question.image2caption]
+
+
+# Returns the given values as one line of a tsv (ending with a newline), with any value that contains a tab, newline,
+#   or double quote put in double quotes (with double quotes inside it doubled), so that it stays in its own column
+# Parameters:   values (list of strings): the values to write
+def maketsvline(values):
+    line = io.StringIO()
+    csv.writer(line, delimiter="\t", lineterminator="\n").writerow(values)
+    return line.getvalue()
 
 
 # Generate LaTeX markup for a single exam's ending page; write to file
 # Parameters:   texfile (file object, as from io.open()): .tex file being generated
 def writeexamend(texfile):
-    texfile.write("\\begin{center}" + "\n")
-    texfile.write("\\textbf{{\\color{red}{\\HUGE END OF EXAM}}}\\\\" + "\n\n")
-    texfile.write("\\end{center}" + "\n")
-    texfile.write("\\newpage" + "\n\n")
+    texfile.write(EXAMEND)
 
 
 # Generate LaTeX markup for one exam day's document ending page; write to file
 # Parameters:   texfile (file object, as from io.open()): .tex file being generated
 def writedocfoot(texfile):
-    texfile.write("\\end{document}" + "\n\n")
+    texfile.write(DOCFOOT)
 
 
 # Returns LaTeX markup for a single exam question
@@ -902,21 +1377,37 @@ def dealwithescapes(datatext):
 ###########################################
 # Here it is! The main event!
 ###########################################
+# Returns the path for one more file describing this run (eg an export or a report): alongside the archive if there
+#   is one (so as not to reopen it), or in the folder with everything else if not
+# Parameters:   foldername (string): the folder this run's files are generated in (or would be, without an archive)
+#               archivepath (string): the archive they're generated in instead, or None if there isn't one
+#               filename (string): name of the file
+def getrunoutputpath(foldername, archivepath, filename):
+    if archivepath is not None:
+        return foldername + "-" + filename
+    return foldername + "/" + filename
+
+
 def main():
     # read metadata from config file
     questionsfile, signupsfile, hassignupslots, course, examtype, examdate, \
         studentgroups, onefileperstudent, generateexamsuptodate, ordering, \
-        topics, diffs, topicdiffpairs, wildtopics, rubric \
+        topics, diffs, topicdiffpairs, wildtopics, rubric, options \
         = examio.getconfig()
+    if options["runreport"]:
+        exammetrics.enable()
 
     # collect questions from file
-    allqs = examio.readquestionsfromfile("../data/" + questionsfile)
+    with exammetrics.timer("ingest"):
+        allqs = examio.readquestionsfromfile("../data/" + questionsfile)
     # collect info from file re which exams have been made for which students already
-    existingexams = examio.readexistingexamsfromfile(EXISTINGEXAMSPICKLEFILE, "../exams")
+    with exammetrics.timer("historyread"):
+        existingexams = examio.readexistingexamsfromfile(EXISTINGEXAMSFILE, "../exams", allqs)
 
     # collect scheduling info from file
-    signups = examio.readsignupsfromfile("../data/" + signupsfile,
-                                         hassignupslots, examtype, examdate, generateexamsuptodate)
+    with exammetrics.timer("ingest"):
+        signups = examio.readsignupsfromfile("../data/" + signupsfile,
+                                             hassignupslots, examtype, examdate, generateexamsuptodate)
     signupdates = [examio.makedate(d) for d in signups.keys()]
     signupdates = [d for d in signupdates if d is not None]
     startdate = date.today()
@@ -924,22 +1415,60 @@ def main():
         startdate = min(signupdates)
     # create an ExamSession instance based on info read from config etc
     thisexamsession = ExamSession(course, examtype, hassignupslots, allqs, signups, studentgroups, existingexams, startdate,
-                                  onefileperstudent, ordering, topics, diffs, topicdiffpairs, wildtopics)
+                                  onefileperstudent, ordering, topics, diffs, topicdiffpairs, wildtopics,
+                                  options["randomseed"], options["planner"])
+    thisexamsession.allowrepeatedcombos = options["repeatcombos"]
 
-    # create folder in which to store the generated exams + question bank for this session
+    # create folder (or archive) in which to store the generated exams + question bank for this session
     timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
     foldername = "../exams/" + course.replace(" ", "_") + examtype.replace(" ", "_") + "-exams_generated_" + timestamp
-    if not os.path.exists(foldername):
+    archivepath = None
+    if options["archive"] is not None:
+        archivepath = foldername + "." + options["archive"]
+        thisexamsession.archive = examarchive.ExamArchive(archivepath, "../exams")
+    elif not os.path.exists(foldername):
         os.makedirs(foldername)
-
-    # generate all exams for this session (one file for each day, containing all students' exams for that day)
-    thisexamsession.generatelatexexams(foldername, generateexamsuptodate, rubric)
-
-    # generate a question bank of all (non-omitted) questions in the .tsv
-    thisexamsession.generatelatexquestionbankbytopic(foldername)
-
-    # save a record of which students have seen which questions (on which exams)
-    examio.recordexistingexamstofile(thisexamsession.existingexams, EXISTINGEXAMSPICKLEFILE, "../exams")
+    if options["export"] is not None:
+        thisexamsession.exporter = examexport.makeexporter(options["export"],
+                                                           getrunoutputpath(foldername, archivepath, EXPORTFILE))
+
+    try:
+        # generate all exams for this session (one file for each day, containing all students' exams for that day)
+        texfilepaths = thisexamsession.generatelatexexams(foldername, generateexamsuptodate, rubric,
+                                                          options["workers"])
+
+        # generate a question bank of all (non-omitted) questions in the .tsv
+        texfilepaths.append(thisexamsession.generatelatexquestionbankbytopic(foldername))
+    finally:
+        if thisexamsession.archive is not None:
+            thisexamsession.archive.close()
+        if thisexamsession.exporter is not None:
+            thisexamsession.exporter.close()
+            print("exported " + str(thisexamsession.exporter.numrecords) + " question assignment(s) to " +
+                  thisexamsession.exporter.path)
+
+    # save a record of which students have seen which questions (on which exams); only the exams chosen in this
+    #   run can differ from what's already recorded
+    with exammetrics.timer("historywrite"):
+        examio.recordexistingexamstofile(thisexamsession.existingexams, EXISTINGEXAMSFILE, "../exams",
+                                        thisexamsession.examdetails, thisexamsession.examdetails.keys())
+
+    # turn everything into pdfs, if requested (after saving the record, since this could take a while)
+    if options["compile"] and archivepath is not None:
+        with exammetrics.timer("compile"):
+            results = examcompile.compilearchive(archivepath, options["compileworkers"], options["compiletimeout"],
+                                                 "../exams/" + PDFCACHEDIR)
+        examcompile.reportcompileresults(results, foldername + "-" + COMPILEREPORTFILE)
+    elif options["compile"]:
+        with exammetrics.timer("compile"):
+            results = examcompile.compilealltex(texfilepaths, options["compileworkers"], options["compiletimeout"],
+                                                "../exams/" + PDFCACHEDIR)
+        examcompile.reportcompileresults(results, foldername + "/" + COMPILEREPORTFILE)
+
+    if options["runreport"]:
+        exammetrics.writereport(getrunoutputpath(foldername, archivepath, RUNREPORTFILE),
+                                {"course": course, "examtype": examtype, "workers": options["workers"],
+                                 "planner": options["planner"], "compile": options["compile"]})
 
 
 if __name__ == "__main__":
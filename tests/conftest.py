@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import sys
+
+# the scripts in src/ import each other as top-level modules (they're run from that directory)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
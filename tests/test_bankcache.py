@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import shutil
+import examio
+
+SAMPLEBANK = os.path.join(os.path.dirname(__file__), "..", "data", "samplequestionbank.tsv")
+
+
+# Returns a copy of the sample question bank in the given folder, and a list that records every time a .tsv
+#   is actually parsed (rather than read from the cache)
+def setupbank(tmp_path, monkeypatch):
+    bankpath = str(tmp_path / "bank.tsv")
+    shutil.copy(SAMPLEBANK, bankpath)
+    parsed = []
+    parsequestionsfile = examio.parsequestionsfile
+
+    def countingparse(questionsfilepath):
+        parsed.append(questionsfilepath)
+        return parsequestionsfile(questionsfilepath)
+    monkeypatch.setattr(examio, "parsequestionsfile", countingparse)
+    return bankpath, parsed
+
+
+def getids(allquestions):
+    return sorted(q.uniqueid for topic in allquestions.values() for qs in topic.values() for q in qs)
+
+
+def test_unchanged_bank_is_read_from_cache(tmp_path, monkeypatch):
+    bankpath, parsed = setupbank(tmp_path, monkeypatch)
+    first = examio.readquestionsfromfile(bankpath)
+    assert len(parsed) == 1
+    assert os.path.isfile(bankpath + examio.BANKCACHESUFFIX)
+    second = examio.readquestionsfromfile(bankpath)
+    assert len(parsed) == 1
+    assert getids(second) == getids(first)
+
+    # saved again without changes: still the cache, with its fingerprint updated so the hash isn't needed again
+    stat = os.stat(bankpath)
+    os.utime(bankpath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    examio.readquestionsfromfile(bankpath)
+    assert len(parsed) == 1
+    assert examio.readbankcache(bankpath + examio.BANKCACHESUFFIX, examio.getbankfingerprint(bankpath),
+                                "/nonexistent") is not None
+
+    assert getids(examio.readquestionsfromfile(bankpath, usecache=False)) == getids(first)
+    assert len(parsed) == 2
+
+
+def test_changed_bank_is_parsed_again(tmp_path, monkeypatch):
+    bankpath, parsed = setupbank(tmp_path, monkeypatch)
+    first = examio.readquestionsfromfile(bankpath)
+    oldid = getids(first)[0]
+
+    # a different question ID of the same length: same size, new contents
+    with open(bankpath, encoding="utf-8") as f:
+        contents = f.read()
+    newid = oldid[:-1] + ("0" if oldid[-1] != "0" else "1")
+    with open(bankpath, "w", encoding="utf-8") as f:
+        f.write(contents.replace(oldid, newid, 1))
+    stat = os.stat(bankpath)
+    os.utime(bankpath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    second = examio.readquestionsfromfile(bankpath)
+    assert len(parsed) == 2
+    assert newid in getids(second) and oldid not in getids(second)
+
+    # a question taken out: a different size
+    with open(bankpath, encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(bankpath, "w", encoding="utf-8") as f:
+        f.writelines(lines[:-1])
+    third = examio.readquestionsfromfile(bankpath)
+    assert len(parsed) == 3
+    assert len(getids(third)) == len(getids(second)) - 1
+    examio.readquestionsfromfile(bankpath)
+    assert len(parsed) == 3
+
+
+def test_unreadable_cache_is_ignored(tmp_path, monkeypatch, capsys):
+    bankpath, parsed = setupbank(tmp_path, monkeypatch)
+    with open(bankpath + examio.BANKCACHESUFFIX, "wb") as f:
+        f.write(b"not a cache")
+    allquestions = examio.readquestionsfromfile(bankpath)
+    assert len(parsed) == 1
+    assert "ignoring unreadable question bank cache" in capsys.readouterr().out
+    assert getids(examio.readquestionsfromfile(bankpath)) == getids(allquestions)
+    assert len(parsed) == 1
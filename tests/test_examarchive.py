@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import hashlib
+from datetime import date
+import pytest
+import examarchive
+from examarchive import ExamArchive, MemberCollector
+from generateexams import DocumentBuilder
+from test_generateexams import makesignupsession, makerichbank, readoutputs
+
+
+@pytest.mark.parametrize("kind", [examarchive.ARCHIVE_ZIP, examarchive.ARCHIVE_TAR])
+def test_members_written_at_once_come_out_whole(tmp_path, monkeypatch, kind):
+    # small enough that the big member goes to a temporary file rather than staying in memory
+    monkeypatch.setattr(examarchive, "SPOOLBYTES", 1000)
+    archivepath = str(tmp_path / ("exams." + kind))
+    stats = {}
+    with ExamArchive(archivepath, str(tmp_path)) as archive:
+        with DocumentBuilder(str(tmp_path / "day" / "big.tex"), stats, archive) as big:
+            with DocumentBuilder(str(tmp_path / "day" / "small.tsv"), stats, archive) as small:
+                for i in range(500):
+                    big.write("exam " + str(i) + " ə\n")
+                    big.flush()
+                    small.write(str(i) + "\t")
+        archive.writenamedmember("day/notes.txt", b"notes")
+
+    bigdata = "".join("exam " + str(i) + " ə" + os.linesep for i in range(500)).encode("utf-8")
+    smalldata = "".join(str(i) + "\t" for i in range(500)).encode("utf-8")
+    manifest = examarchive.readmanifest(archivepath)
+    # in the order they were finished
+    assert [m["name"] for m in manifest["files"]] == ["day/small.tsv", "day/big.tex", "day/notes.txt"]
+    members = dict(examarchive.readmembers(archivepath, ["day/big.tex", "day/small.tsv", "day/notes.txt"]))
+    assert members == {"day/big.tex": bigdata, "day/small.tsv": smalldata, "day/notes.txt": b"notes"}
+    for m in manifest["files"]:
+        assert m["bytes"] == len(members[m["name"]])
+        assert m["sha256"] == hashlib.sha256(members[m["name"]]).hexdigest()
+    assert stats[str(tmp_path / "day" / "big.tex")] == {"bytes": len(bigdata), "writes": 500}
+    assert not os.path.exists(str(tmp_path / "day"))
+
+
+def test_collected_members_are_handed_over_as_files(tmp_path):
+    spooldir = tmp_path / "spool"
+    spooldir.mkdir()
+    collector = MemberCollector(str(tmp_path), str(spooldir))
+    with DocumentBuilder(str(tmp_path / "day" / "a.tex"), None, collector) as doc:
+        doc.write("contents")
+    assert len(collector.members) == 1
+    name, filepath, numbytes, sha256 = collector.members[0]
+    assert (name, numbytes, sha256) == ("day/a.tex", 8, hashlib.sha256(b"contents").hexdigest())
+
+    archivepath = str(tmp_path / "exams.zip")
+    with ExamArchive(archivepath, str(tmp_path)) as archive:
+        archive.addmemberfromfile(name, filepath, numbytes, sha256)
+    assert examarchive.readmembers(archivepath, ["day/a.tex"]) == [("day/a.tex", b"contents")]
+    assert os.listdir(str(spooldir)) == []
+
+
+@pytest.mark.parametrize("kind", [examarchive.ARCHIVE_ZIP, examarchive.ARCHIVE_TAR])
+def test_archive_holds_what_the_folder_would(tmp_path, kind):
+    folder = tmp_path / "LIN-exams"
+    folder.mkdir()
+    session = makesignupsession(makerichbank(), ["phon", "morph"], ["easy", "hard"], randomseed="wugz")
+    session.generatelatexexams(str(folder), date(2026, 4, 30))
+    expected = {"LIN-exams/" + name: data for name, data in readoutputs(str(folder)).items()}
+
+    # and the same from worker processes, which hand their files back to be added
+    for workers in [1, 3]:
+        archivepath = str(tmp_path / ("parallel" + str(workers) + "." + kind))
+        session = makesignupsession(makerichbank(), ["phon", "morph"], ["easy", "hard"], randomseed="wugz")
+        with ExamArchive(archivepath, str(tmp_path)) as archive:
+            session.archive = archive
+            session.generatelatexexams(str(tmp_path / "LIN-exams"), date(2026, 4, 30), workers=workers)
+        names = [m["name"] for m in examarchive.readmanifest(archivepath)["files"]]
+        assert dict(examarchive.readmembers(archivepath, names)) == expected
+    assert sorted(os.listdir(str(tmp_path))) == ["LIN-exams", "parallel1." + kind, "parallel3." + kind]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import exambench
+
+
+def test_synthetic_data_is_reproducible():
+    datas = [exambench.BenchData(200, 60, "test"), exambench.BenchData(200, 60, "test")]
+    try:
+        with open(datas[0].bankpath, "rb") as f0, open(datas[1].bankpath, "rb") as f1:
+            assert f0.read() == f1.read()
+        assert datas[0].groups == datas[1].groups
+        assert datas[0].signups == datas[1].signups
+        assert {sid: [q.uniqueid for q in exams[exambench.PRIOREXAMTYPE]]
+                for sid, exams in datas[0].priorexams.items()} == \
+            {sid: [q.uniqueid for q in exams[exambench.PRIOREXAMTYPE]] for sid, exams in datas[1].priorexams.items()}
+        numquestions = sum(len(qs) for diffs in datas[0].allquestions.values() for qs in diffs.values())
+        # some questions are omitted from the bank
+        assert 0 < numquestions <= 200
+        assert sum(len(slots) for slots in datas[0].signups.values()) == 60
+    finally:
+        for data in datas:
+            data.cleanup()
+    assert not os.path.exists(datas[0].dir)
+
+
+def test_every_stage_runs_and_is_timed(capsys):
+    results = exambench.runbenchmarks(200, 60, warmup=0, repeats=2)
+    assert list(results["stages"].keys()) == exambench.STAGES
+    for timing in results["stages"].values():
+        assert len(timing["seconds"]) == 2
+        assert timing["min"] <= timing["median"]
+
+    previous = {"created": "before", "stages": {name: {"median": 1.0} for name in exambench.STAGES}}
+    capsys.readouterr()
+    exambench.printcomparison(results, previous)
+    out = capsys.readouterr().out
+    assert "compared with before" in out
+    assert all(name in out for name in exambench.STAGES)
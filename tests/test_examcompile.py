@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import json
+import pytest
+import examcompile
+
+# stands in for xelatex: writes a log and a pdf to the output directory, unless the .tex asks it to fail or hang
+FAKECOMPILER = """#!/bin/sh
+for a in "$@"; do case $a in -output-directory=*) out=${a#*=};; *.tex) tex=$a;; esac; done
+job=${tex%.tex}
+echo "fake xetex, compiling in $(pwd)" > "$out/$job.log"
+if grep -q HANG "$tex"; then sleep 30; fi
+if grep -q FAIL "$tex"; then echo "! Undefined control sequence." >> "$out/$job.log"; exit 1; fi
+echo pdf > "$out/$job.pdf"
+"""
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="the stand-in compiler is a shell script")
+
+
+@pytest.fixture
+def fakecompiler(tmp_path, monkeypatch):
+    compilerpath = tmp_path / "fakexelatex"
+    compilerpath.write_text(FAKECOMPILER)
+    compilerpath.chmod(0o755)
+    monkeypatch.setattr(examcompile, "COMPILER", str(compilerpath))
+    return compilerpath
+
+
+def maketex(folder, name, body):
+    texpath = folder / name
+    texpath.write_text("\\documentclass{article}\n" + body + "\n")
+    return str(texpath)
+
+
+def test_results_for_each_file(tmp_path, fakecompiler):
+    folder = tmp_path / "exams"
+    folder.mkdir()
+    texpaths = [maketex(folder, "a.tex", "fine"), maketex(folder, "b.tex", "FAIL"), maketex(folder, "c.tex", "fine")]
+    results = examcompile.compilealltex(texpaths, workers=2, timeout=10)
+
+    assert [r["tex"] for r in results] == texpaths
+    assert [r["status"] for r in results] == [examcompile.STATUS_OK, examcompile.STATUS_FAILED, examcompile.STATUS_OK]
+    # a good compile leaves just the pdf next to the .tex file; a failed one keeps its log
+    assert results[0]["pdf"] == str(folder / "a.pdf") and os.path.isfile(results[0]["pdf"])
+    assert not os.path.exists(str(folder / "a_build"))
+    assert results[1]["returncode"] == 1 and results[1]["pdf"] is None
+    assert os.path.isfile(results[1]["log"])
+    assert "Undefined control sequence" in results[1]["logtail"]
+    # compiled from the .tex file's own folder
+    assert str(folder) in results[1]["logtail"]
+
+    reportpath = str(tmp_path / "compilereport.json")
+    examcompile.reportcompileresults(results, reportpath)
+    with open(reportpath, encoding="utf-8") as f:
+        assert json.load(f) == results
+
+
+def test_slow_compile_is_killed(tmp_path, fakecompiler):
+    texpath = maketex(tmp_path, "slow.tex", "HANG")
+    result = examcompile.compiletex(texpath, timeout=0.5)
+    assert result["status"] == examcompile.STATUS_TIMEOUT
+    assert result["returncode"] is None
+    assert result["seconds"] < 10
+
+
+def test_no_compiler(tmp_path, monkeypatch):
+    monkeypatch.setattr(examcompile, "COMPILER", str(tmp_path / "notacompiler"))
+    results = examcompile.compilealltex([maketex(tmp_path, "a.tex", "fine")])
+    assert [r["status"] for r in results] == [examcompile.STATUS_NOCOMPILER]
+
+
+def test_unchanged_source_and_images_reuse_the_cached_pdf(tmp_path, fakecompiler):
+    folder = tmp_path / "exams"
+    folder.mkdir()
+    (tmp_path / "images").mkdir()
+    imagepath = tmp_path / "images" / "fig.png"
+    imagepath.write_bytes(b"first image")
+    cachedir = str(tmp_path / "pdfcache")
+    body = "\\includegraphics[width=.9\\linewidth]{../images/fig.png}"
+    texpaths = [maketex(folder, "a.tex", body), maketex(folder, "b.tex", "no images")]
+
+    first = examcompile.compilealltex(texpaths, workers=2, cachedir=cachedir)
+    assert [r["status"] for r in first] == [examcompile.STATUS_OK, examcompile.STATUS_OK]
+    assert sorted(os.listdir(cachedir)) == sorted(r["hash"] + ".pdf" for r in first)
+
+    os.remove(first[0]["pdf"])
+    second = examcompile.compilealltex(texpaths, cachedir=cachedir)
+    assert [r["status"] for r in second] == [examcompile.STATUS_CACHED, examcompile.STATUS_CACHED]
+    assert [r["hash"] for r in second] == [r["hash"] for r in first]
+    assert os.path.isfile(first[0]["pdf"])
+
+    # changing an image the .tex file includes means compiling it again, but not the other one
+    imagepath.write_bytes(b"second image")
+    third = examcompile.compilealltex(texpaths, cachedir=cachedir)
+    assert [r["status"] for r in third] == [examcompile.STATUS_OK, examcompile.STATUS_CACHED]
+    assert third[0]["hash"] != first[0]["hash"]
+    assert len(os.listdir(cachedir)) == 3
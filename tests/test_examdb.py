@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import pickle
+from datetime import date
+from Exam import Question
+import examio
+from examdb import ExamStore
+
+EXISTINGEXAMSFILE = "existingexams_donotedit"
+
+
+def makequestions(numquestions):
+    return [Question("q" + str(i), "phon", "easy", "src" + str(i), date(2026, 1, 1), ("UR",) if i == 0 else ())
+            for i in range(numquestions)]
+
+
+def test_round_trip(tmp_path):
+    qs = makequestions(4)
+    store = ExamStore(str(tmp_path / "exams.db"))
+    store.addexam("s1", "midterm", [qs[2], qs[0]], date(2026, 3, 2), [1, 3])
+    store.addexam("s2", "midterm", [qs[1]])
+    store.close()
+
+    store = ExamStore(str(tmp_path / "exams.db"))
+    stored = store.readexams()
+    assert stored["exams"] == {"s1": {"midterm": ["q2", "q0"]}, "s2": {"midterm": ["q1"]}}
+    assert stored["questions"]["q0"] == ("phon", "easy", "src0", ["UR"])
+
+    assert store.replacequestion("s1", "midterm", "q0", qs[3]) == 1
+    assert store.getexamquestionids("s1", "midterm") == ["q2", "q3"]
+    assert store.removeexam("s2", "midterm")
+    assert not store.removeexam("s2", "midterm")
+    assert store.getsids() == ["s1"]
+    store.close()
+
+
+def test_replacement_changes_one_slot(tmp_path):
+    qs = makequestions(5)
+    store = ExamStore(str(tmp_path / "exams.db"))
+    store.addexam("s1", "midterm", [qs[0], qs[1], qs[0]])
+
+    # the first copy, unless another slot is given
+    assert store.replacequestion("s1", "midterm", "q0", qs[3]) == 1
+    assert store.getexamquestionids("s1", "midterm") == ["q3", "q1", "q0"]
+    assert store.replacequestion("s1", "midterm", "q0", qs[4], position=1) == 0
+    assert store.replacequestion("s1", "midterm", "q0", qs[4], position=2) == 1
+    assert store.getexamquestionids("s1", "midterm") == ["q3", "q1", "q4"]
+    assert store.replacequestion("s1", "midterm", "q0", qs[2]) == 0
+    store.close()
+
+
+def test_failed_transaction_changes_nothing(tmp_path):
+    qs = makequestions(2)
+    store = ExamStore(str(tmp_path / "exams.db"))
+    store.addexam("s1", "midterm", [qs[0]])
+    try:
+        with store.transaction():
+            store.addexam("s2", "midterm", [qs[1]])
+            store.removeexam("s1", "midterm")
+            raise ValueError("stop")
+    except ValueError:
+        pass
+    assert store.readexams()["exams"] == {"s1": {"midterm": ["q0"]}}
+    store.close()
+
+
+def test_recordexams_writes_only_what_changed(tmp_path):
+    qs = makequestions(4)
+    store = ExamStore(str(tmp_path / "exams.db"))
+    existing = {"s1": {"midterm": [qs[0], qs[1]]}, "s2": {"midterm": [qs[2]]}}
+    details = {("s1", "midterm"): {"examdate": date(2026, 3, 2), "tiers": [1, 1]}}
+    assert store.recordexams(existing, details) == 2
+    assert store.recordexams(existing) == 0
+
+    # a changed exam recorded without details keeps its stored date
+    existing["s1"]["midterm"] = [qs[0], qs[3]]
+    assert store.recordexams(existing) == 1
+    assert store.getexamquestionids("s1", "midterm") == ["q0", "q3"]
+    storeddate = store.connection.execute(
+        "SELECT examdate FROM exams WHERE sid = 's1' AND examtype = 'midterm'").fetchone()[0]
+    assert storeddate == "2026-03-02"
+
+    # only the exams said to have changed are looked at
+    existing["s2"]["midterm"] = [qs[1]]
+    existing["s3"] = {"final": [qs[2]]}
+    assert store.recordexams(existing, changed=[("s3", "final")]) == 1
+    assert store.getexamquestionids("s2", "midterm") == ["q2"]
+    assert store.getexamquestionids("s3", "final") == ["q2"]
+    store.close()
+
+
+def test_snapshot_is_imported_into_new_database(tmp_path):
+    qs = makequestions(3)
+    # an old-style snapshot holding whole Questions, and an older one that should be ignored
+    snapshotname = EXISTINGEXAMSFILE + examio.SNAPSHOTSUFFIX
+    with open(os.path.join(str(tmp_path), snapshotname + "20200101000000"), "wb") as f:
+        pickle.dump({"s9": {"midterm": [qs[0]]}}, f)
+    with open(os.path.join(str(tmp_path), snapshotname + "20210101000000"), "wb") as f:
+        pickle.dump({"s1": {"midterm": [qs[1], qs[2]]}}, f)
+
+    existing = examio.readexistingexamsfromfile(EXISTINGEXAMSFILE, str(tmp_path), {"phon": {"easy": qs}})
+    assert list(existing.keys()) == ["s1"]
+    assert existing["s1"]["midterm"][0] is qs[1]
+    assert os.path.isfile(os.path.join(str(tmp_path), EXISTINGEXAMSFILE + examio.HISTORYDBSUFFIX))
+
+    # only imported the first time: later changes to the database aren't overwritten by the snapshot
+    store = examio.openexamstore(EXISTINGEXAMSFILE, str(tmp_path))
+    store.removeexam("s1", "midterm")
+    store.close()
+    assert examio.readexistingexamsfromfile(EXISTINGEXAMSFILE, str(tmp_path)) == {}
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import io
+import csv
+import json
+from datetime import date
+import pandas as pd
+import pytest
+from Exam import Question
+import examexport
+import generateexams
+from test_generateexams import makesignupsession, makerichbank
+
+# values that a naive join would split across columns or lines
+AWKWARD = ["plain", "with, comma", "with\ttab", 'with "quotes"', "with\nnewline", "ʃ ŋ ə"]
+
+
+def makerecords():
+    qs = [Question("q" + str(i), "phon", "easy", value, date(2026, 1, 1), instructions="do " + str(i))
+          for i, value in enumerate(AWKWARD)]
+    return [examexport.makerecord("s1", "final", date(2026, 4, 2), "9:00", i + 1, q, value)
+            for i, (q, value) in enumerate(zip(qs, AWKWARD))]
+
+
+def test_tsv_lines_keep_awkward_values_in_their_columns():
+    line = generateexams.maketsvline(["s1"] + AWKWARD)
+    assert line.endswith("\n")
+    assert next(csv.reader(io.StringIO(line), delimiter="\t")) == ["s1"] + AWKWARD
+    # nothing that doesn't need quoting gets it
+    assert generateexams.maketsvline(["s1", "plain"]) == "s1\tplain\n"
+
+
+def test_csv_export_round_trips(tmp_path):
+    records = makerecords()
+    exporter = examexport.makeexporter(examexport.EXPORT_CSV, str(tmp_path / "assignments"))
+    for record in records:
+        exporter.write(record)
+    exporter.close()
+
+    assert exporter.numrecords == len(records)
+    table = pd.read_csv(exporter.path, dtype=str, keep_default_na=False)
+    assert list(table.columns) == examexport.EXPORTFIELDS
+    assert list(table["Source"]) == AWKWARD
+    assert list(table["Question_latex"]) == AWKWARD
+
+
+def test_jsonl_export_is_one_object_per_line(tmp_path):
+    records = makerecords()
+    exporter = examexport.makeexporter(examexport.EXPORT_JSONL, str(tmp_path / "assignments"))
+    for record in records:
+        exporter.write(record)
+    exporter.close()
+
+    with open(exporter.path, encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    assert lines[-1] == ""
+    assert [json.loads(line)["Source"] for line in lines[:-1]] == AWKWARD
+
+
+def test_parquet_export_writes_part_files(tmp_path, monkeypatch):
+    engine = examexport.getparquetengine()
+    if engine is None:
+        pytest.skip("needs " + " or ".join(examexport.PARQUETENGINES))
+    monkeypatch.setattr(examexport, "PARQUETCHUNKROWS", 4)
+    records = makerecords() * 2
+    exporter = examexport.makeexporter(examexport.EXPORT_PARQUET, str(tmp_path / "assignments"))
+    for record in records:
+        exporter.write(record)
+    exporter.close()
+
+    assert exporter.numparts == 3
+    assert sorted(p.name for p in (tmp_path / "assignments.parquet").iterdir()) == \
+        ["part-00000.parquet", "part-00001.parquet", "part-00002.parquet"]
+    table = pd.read_parquet(exporter.path)
+    assert len(table) == len(records)
+    assert list(table["Source"]) == AWKWARD * 2
+
+
+def test_exported_records_do_not_depend_on_workers(tmp_path):
+    exported = []
+    for workers in [1, 3]:
+        session = makesignupsession(makerichbank(), ["phon", "morph"], ["easy", "hard"], randomseed="export")
+        folder = tmp_path / str(workers)
+        folder.mkdir()
+        session.exporter = examexport.makeexporter(examexport.EXPORT_CSV, str(folder / "assignments"))
+        session.generatelatexexams(str(folder), date(2026, 4, 30), workers=workers)
+        session.exporter.close()
+        with open(session.exporter.path, encoding="utf-8") as f:
+            exported.append(f.read())
+        # one record per question on each exam written, including s1's on both days they're signed up for
+        numwritten = sum(1 for slots in session.signups.values() for time, sid in slots if sid != "")
+        assert session.exporter.numrecords == 2 * numwritten
+    assert exported[0] == exported[1]
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import io
+import pickle
+from datetime import date
+import pandas as pd
+from Exam import Question
+import examio
+
+EXISTINGEXAMSFILE = "existingexams_donotedit"
+
+SAMPLEBANK = os.path.join(os.path.dirname(__file__), "..", "data", "samplequestionbank.tsv")
+FIELDS = ["uniqueid", "topic", "difficulty", "source", "datecompleted", "questiontypes", "instructions", "data1",
+          "data2", "image1", "image1caption", "image2", "image2caption", "imagearrangement", "notes", "omit",
+          "instrnotes"]
+
+
+# Returns the given question bank parsed one row at a time, the way it used to be, as a list of tuples of FIELDS
+#   (in bank order, omitted and incomplete questions left out)
+def parserowbyrow(questionsfilepath):
+    with io.open(questionsfilepath, "r", encoding="utf-8") as qfile:
+        df = pd.read_csv(qfile, sep="\t", keep_default_na=False, dtype=str)
+    df.columns = [cname.lower() for cname in df.columns]
+    col = {prefix: next(c for c in df.columns if c.startswith(prefix))
+           for prefix in ["uniqueid", "topic", "difficulty", "datecompleted", "questiontype", "instructions", "data1",
+                          "data2", "imagearrangement", "notes", "omit"]}
+    sourcecol = [c for c in df.columns if c.startswith("source")][-1]
+    rows = []
+    for index, row in df.iterrows():
+        if row[col["omit"]] != "" or row[col["topic"]] == "" or row[col["difficulty"]] == "":
+            continue
+        qtypes = [t.strip() for t in row[col["questiontype"]].split(",")] if row[col["questiontype"]] != "" else []
+        rows.append((row[col["uniqueid"]], row[col["topic"]], row[col["difficulty"]], row[sourcecol],
+                     examio.makedate(row[col["datecompleted"]]), sorted(qtypes), row[col["instructions"]],
+                     row[col["data1"]], row[col["data2"]], row["image1"], row["image1caption"], row["image2"],
+                     row["image2caption"], row[col["imagearrangement"]], row[col["notes"]], False,
+                     row["instructor_comments"]))
+    return rows
+
+
+# Returns the given parsed question bank (topic --> difficulty --> [list of Questions]) as tuples of FIELDS,
+#   in bank order
+def astuples(allquestions, bankorder):
+    questions = [q for topic in allquestions.values() for qs in topic.values() for q in qs]
+    questions.sort(key=lambda q: bankorder.index(q.uniqueid))
+    return [tuple(sorted(getattr(q, f)) if f == "questiontypes" else getattr(q, f) for f in FIELDS)
+            for q in questions]
+
+
+def test_columnwise_parse_matches_row_by_row(tmp_path):
+    expected = parserowbyrow(SAMPLEBANK)
+    bankorder = [row[0] for row in expected]
+    assert astuples(examio.readquestionsfromfile(SAMPLEBANK), bankorder) == expected
+
+    # the awkward cases: omitted and incomplete rows, a later source column, odd dates and question types,
+    #   and numeric-looking text
+    with open(SAMPLEBANK, encoding="utf-8") as f:
+        header = f.readline().rstrip("\n").split("\t")
+    header[header.index("Source")] = "Source2020"
+    header.append("Source2021S")
+    rows = [
+        ["Q1", "phon", "easy", "old", "2026-01-05 (Mon)", " UR , SR", "0012", "3.50", "", "", "", "", "", "", "", "", "",
+         "new"],
+        ["Q2", "phon", "easy", "old", "", "", "instr", "", "", "", "", "", "", "", "", "x", "", "new"],
+        ["Q3", "", "easy", "old", "2026-01-05", "", "instr", "", "", "", "", "", "", "", "", "", "", "new"],
+        ["Q4", "phon", "hard", "old", "sometime", "UR", "instr", "", "", "", "", "", "", "", "", "", "", ""],
+    ]
+    bankpath = str(tmp_path / "bank.tsv")
+    with open(bankpath, "w", encoding="utf-8") as f:
+        for row in [header] + rows:
+            f.write("\t".join(row) + "\n")
+    expected = parserowbyrow(bankpath)
+    assert [row[0] for row in expected] == ["Q1", "Q4"]
+    assert expected[0][3:8] == ("new", examio.makedate("2026-01-05"), ["SR", "UR"], "0012", "3.50")
+    assert astuples(examio.readquestionsfromfile(bankpath), ["Q1", "Q4"]) == expected
+
+
+# Returns a question bank of numquestions "phon" / "easy" questions, the first of which has the question type "UR"
+def makebank(numquestions):
+    return {"phon": {"easy": [Question("q" + str(i), "phon", "easy", "src" + str(i), date(2026, 1, 1),
+                                       ("UR",) if i == 0 else (), "instructions " + str(i))
+                              for i in range(numquestions)]}}
+
+
+def test_existing_exams_are_stored_as_ids(tmp_path):
+    qs = makebank(3)["phon"]["easy"]
+    existing = {"s1": {"midterm": [qs[2], qs[0]]}, "s2": {"midterm": [qs[1]], "final": [qs[0]]}}
+    compact = examio.compactexistingexams(existing)
+    assert compact["exams"] == {"s1": {"midterm": ["q2", "q0"]}, "s2": {"midterm": ["q1"], "final": ["q0"]}}
+    assert compact["questions"]["q0"] == ("phon", "easy", "src0", ["UR"])
+
+    # resolved against the bank (so with its current text), or with just the stored details if it's gone from it
+    newbank = makebank(3)
+    del newbank["phon"]["easy"][1]
+    expanded = examio.expandexistingexams(compact, newbank)
+    assert expanded["s1"]["midterm"][1] is newbank["phon"]["easy"][0]
+    gone = expanded["s2"]["midterm"][0]
+    assert (gone.uniqueid, gone.topic, gone.source, gone.questiontypes, gone.instructions) == \
+        ("q1", "phon", "src1", frozenset(), "")
+
+    examio.recordexistingexamstofile(existing, EXISTINGEXAMSFILE, str(tmp_path))
+    reread = examio.readexistingexamsfromfile(EXISTINGEXAMSFILE, str(tmp_path), newbank)
+    assert {sid: {t: [q.uniqueid for q in qs] for t, qs in exams.items()} for sid, exams in reread.items()} == \
+        compact["exams"]
+    assert reread["s2"]["final"][0] is newbank["phon"]["easy"][0]
+
+
+def test_old_whole_question_files_still_load(tmp_path):
+    bank = makebank(2)
+    qs = bank["phon"]["easy"]
+    snapshotname = EXISTINGEXAMSFILE + examio.SNAPSHOTSUFFIX
+    with open(os.path.join(str(tmp_path), snapshotname + "20210101000000"), "wb") as f:
+        pickle.dump({"s1": {"midterm": [qs[1], qs[0]]}}, f)
+    newbank = makebank(2)
+    existing = examio.readexistingexamsfromfile(EXISTINGEXAMSFILE, str(tmp_path), newbank)
+    assert existing == {"s1": {"midterm": newbank["phon"]["easy"][::-1]}}
+    assert existing["s1"]["midterm"][0] is newbank["phon"]["easy"][1]
+    # and from then on they're read from the database
+    assert examio.readexistingexamsfromfile(EXISTINGEXAMSFILE, str(tmp_path)) == existing
+
+
+def test_student_groups_are_indexed_across_groups():
+    groups = examio.indexstudentgroups([["s1", "s2"], ["s3", "s1", ""], ["s4"]])
+    assert groups == {"s1": {"s2", "s3"}, "s2": {"s1"}, "s3": {"s1"}, "s4": set()}
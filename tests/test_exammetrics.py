@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import json
+from datetime import date
+import exammetrics
+from test_generateexams import makesignupsession, makerichbank, readoutputs
+
+
+def generate(folder, workers):
+    session = makesignupsession(makerichbank(), ["phon", "morph"], ["easy", "hard"], randomseed="metrics")
+    folder.mkdir()
+    session.generatelatexexams(str(folder), date(2026, 4, 30), workers=workers)
+    return readoutputs(str(folder))
+
+
+def test_collecting_metrics_does_not_change_the_exams(tmp_path):
+    for workers in [1, 3]:
+        off = generate(tmp_path / ("off" + str(workers)), workers)
+        exammetrics.enable()
+        try:
+            on = generate(tmp_path / ("on" + str(workers)), workers)
+            report = exammetrics.getreport()
+        finally:
+            exammetrics.disable()
+            exammetrics.reset()
+        assert on == off
+        # s1 is signed up on two days but only gets one exam
+        assert report["counters"]["exams"] == 5
+        assert report["counters"]["questions"] == 10
+        assert report["phases"]["selection"]["calls"] > 0
+        assert set(report["bystudent"].keys()) == {"s1", "s2", "s3", "s4", "s5"}
+
+
+def test_nothing_is_collected_while_disabled(tmp_path):
+    exammetrics.reset()
+    generate(tmp_path / "off", 1)
+    reportpath = str(tmp_path / "runreport.json")
+    exammetrics.writereport(reportpath)
+    with open(reportpath, encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["run"] == {}
+    assert report["phases"] == {}
+    assert report["counters"] == {}
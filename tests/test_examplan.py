@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import random
+from datetime import date
+from Exam import Question
+import examselect
+from examplan import JointPlanner
+
+
+# Returns a QuestionSelector over numquestions "phon" / "easy" questions, each from its own source
+# Parameters:   numquestions (integer): how many questions
+def makeselector(numquestions):
+    questions = [Question("q" + str(i), "phon", "easy", "src" + str(i), date(2026, 1, 1)) for i in range(numquestions)]
+    return examselect.QuestionSelector({"phon": {"easy": questions}})
+
+
+def test_usage_is_balanced_within_a_cell():
+    # enough candidates that the random quick pick would be tried if usage weren't being balanced
+    numquestions = examselect.QUICKPICKMINCANDIDATES * 2
+    selector = makeselector(numquestions)
+    for seed in range(5):
+        planner = JointPlanner("midterm", {}, {}, {}, {}, random.Random(seed))
+        for i in range(150):
+            planner.addexam("s" + str(i), selector, ["phon"] * 3, ["easy"] * 3)
+        plan = planner.solve()
+        counts = {"q" + str(i): 0 for i in range(numquestions)}
+        for questions, tiers in plan.values():
+            assert tiers == [examselect.TIER_STRICT] * 3
+            for q in questions:
+                counts[q.uniqueid] += 1
+        assert max(counts.values()) - min(counts.values()) <= 1
+
+
+def test_group_members_share_no_questions_when_there_are_enough():
+    selector = makeselector(12)
+    groups = [["s0", "s1", "s2"], ["s3", "s4", "s5"]]
+    groupmembers = {sid: set(group) - {sid} for group in groups for sid in group}
+    for seed in range(20):
+        planner = JointPlanner("midterm", groupmembers, {}, {}, {}, random.Random(seed))
+        for sid in sorted(groupmembers.keys()):
+            planner.addexam(sid, selector, ["phon"] * 4, ["easy"] * 4)
+        plan = planner.solve()
+        for group in groups:
+            ids = [q.uniqueid for sid in group for q in plan[sid][0]]
+            assert len(set(ids)) == len(ids)
+        assert planner.report["tiersafter"] == {examselect.TIER_STRICT: 24}
+
+
+def test_existing_exams_of_group_members_are_avoided():
+    selector = makeselector(6)
+    existing = {"s0": {"midterm": selector.getcandidates("phon", "easy")[:4]}}
+    groupmembers = {"s0": {"s1"}, "s1": {"s0"}}
+    for seed in range(20):
+        planner = JointPlanner("midterm", groupmembers, existing, {}, {}, random.Random(seed))
+        planner.addexam("s1", selector, ["phon"] * 3, ["easy"] * 3)
+        questions, tiers = planner.solve()["s1"]
+        # only two questions aren't on s0's exam, so one has to overlap
+        assert {"q4", "q5"} <= {q.uniqueid for q in questions}
+        assert sorted(tiers) == [examselect.TIER_STRICT, examselect.TIER_STRICT, examselect.TIER_GROUPOVERLAP]
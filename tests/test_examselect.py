@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import random
+from datetime import date, timedelta
+from Exam import Question
+import examselect
+from examselect import QuestionSelector, DatedQuestionIndex
+
+
+# Returns a question bank (topic --> difficulty --> [list of Questions]) of one cell, "phon" / "easy",
+#   with numquestions questions each from its own source
+# Parameters:   numquestions (integer): how many questions
+#               qtypes (dictionary of uniqueid --> tuple of strings): question types for particular questions
+def makecell(numquestions, qtypes={}):
+    questions = [Question("q" + str(i), "phon", "easy", "src" + str(i), date(2026, 1, 1), qtypes.get("q" + str(i), ()))
+                 for i in range(numquestions)]
+    return {"phon": {"easy": questions}}
+
+
+def allids(numquestions):
+    return {"q" + str(i) for i in range(numquestions)}
+
+
+def test_strict_pick_avoids_every_constraint():
+    selector = QuestionSelector(makecell(6, {"q0": ("UR",), "q1": ("UR",)}))
+    onexam = [selector.getcandidates("phon", "easy")[0]]  # q0, so q1 clashes by question type
+    for seed in range(50):
+        question, tier = selector.selectquestion("phon", "easy", onexam, groupids={"q2"},
+                                                 seensources={"src3", "src4"}, rng=random.Random(seed))
+        assert tier == examselect.TIER_STRICT
+        assert question.uniqueid == "q5"
+
+
+def test_each_tier_is_reached_in_order():
+    selector = QuestionSelector(makecell(3, {"q0": ("UR",), "q1": ("UR",), "q2": ("UR",)}))
+    q0, q1, q2 = selector.getcandidates("phon", "easy")
+
+    # q1 on a group member's exam, q2's source already seen: only overlapping with the group is left
+    question, tier = selector.selectquestion("phon", "easy", [], groupids={"q0", "q1"}, seensources={"src2"})
+    assert tier == examselect.TIER_GROUPOVERLAP
+    assert question.uniqueid in {"q0", "q1"}
+
+    # every source seen, but not the questions themselves
+    question, tier = selector.selectquestion("phon", "easy", [], seensources={"src0", "src1", "src2"})
+    assert tier == examselect.TIER_REPEATSOURCE
+
+    # q0 is on the exam, and the other two share its question type
+    question, tier = selector.selectquestion("phon", "easy", [q0], seensources={"src1", "src2"})
+    assert tier == examselect.TIER_REPEATQTYPE
+    assert question.uniqueid in {"q1", "q2"}
+
+    # q0 on the exam and everything else seen before
+    question, tier = selector.selectquestion("phon", "easy", [q0], seenids={"q1", "q2"}, seensources={"src1", "src2"})
+    assert tier == examselect.TIER_ANYTHING
+    assert question.uniqueid in {"q1", "q2"}
+
+
+def test_tier_emptiness_is_exact_with_many_candidates():
+    # a tier must never be reported as empty (or the one eligible question missed) however many candidates there are
+    numquestions = examselect.QUICKPICKMINCANDIDATES * 4
+    selector = QuestionSelector(makecell(numquestions))
+
+    onlyone = allids(numquestions) - {"q7"}
+    for seed in range(200):
+        question, tier = selector.selectquestion("phon", "easy", [], groupids=onlyone, rng=random.Random(seed))
+        assert (question.uniqueid, tier) == ("q7", examselect.TIER_STRICT)
+
+    for seed in range(50):
+        question, tier = selector.selectquestion("phon", "easy", [], groupids=allids(numquestions),
+                                                 rng=random.Random(seed))
+        assert tier == examselect.TIER_GROUPOVERLAP
+
+
+def test_usage_picks_a_least_used_question():
+    numquestions = examselect.QUICKPICKMINCANDIDATES * 2
+    selector = QuestionSelector(makecell(numquestions))
+    usage = examselect.UsageCounts({qid: 5 for qid in allids(numquestions)})
+    usage.add("q42", -4)
+    for seed in range(50):
+        question, tier = selector.selectquestion("phon", "easy", [], usage=usage, rng=random.Random(seed))
+        assert question.uniqueid == "q42"
+
+    # the least used of those eligible at the first tier that has any
+    question, tier = selector.selectquestion("phon", "easy", [], groupids={"q42"}, usage=usage)
+    assert tier == examselect.TIER_STRICT
+    assert usage.get(question.uniqueid) == 5
+
+
+def test_usage_counts_by_level():
+    usage = examselect.UsageCounts({"q0": 2, "q1": 1})
+    usage.add("q2")
+    usage.add("q1", -1)
+    assert [usage.get(qid) for qid in ["q0", "q1", "q2", "q3"]] == [2, 0, 1, 0]
+    assert usage.getleastused({"q0", "q1", "q2"}) == {"q1"}
+    assert usage.getleastused({"q0", "q1", "q2"}, [{"q1"}]) == {"q2"}
+    assert usage.getleastused({"q0", "q2"}, [{"q2"}, {"q0"}]) == set()
+    assert usage.levels == {1: {"q2"}, 2: {"q0"}}
+
+
+def test_no_candidates_at_all():
+    selector = QuestionSelector(makecell(3))
+    assert selector.selectquestion("phon", "hard") == (None, None)
+    assert selector.selectquestion("morph", "easy") == (None, None)
+
+
+def test_any_difficulty():
+    bank = makecell(2)
+    bank["phon"]["hard"] = [Question("h0", "phon", "hard", "srch0", date(2026, 1, 1))]
+    selector = QuestionSelector(bank)
+    assert len(selector.getcandidates("phon")) == 3
+    question, tier = selector.selectquestion("phon", "hard")
+    assert (question.uniqueid, tier) == ("h0", examselect.TIER_STRICT)
+
+
+def test_dated_pools_by_cutoff():
+    questions = [Question("q" + str(day), "phon", "easy", "s", date(2026, 1, day)) for day in [5, 1, 3]]
+    questions.append(Question("undated", "phon", "easy", "s", None))
+    index = DatedQuestionIndex({"phon": {"easy": questions}})
+    assert index.getpool(date(2025, 12, 31)) == {}
+    assert [q.uniqueid for q in index.getpool(date(2026, 1, 3))["phon"]["easy"]] == ["q1", "q3"]
+    assert [q.uniqueid for q in index.getpool(date(2026, 2, 1))["phon"]["easy"]] == ["q1", "q3", "q5"]
+    assert index.getpool(date(2026, 1, 3)) is index.getpool(date(2026, 1, 3))
+
+
+def test_dated_pools_match_a_linear_filter():
+    rng = random.Random(3)
+    start = date(2026, 1, 1)
+    bank = {}
+    for i in range(500):
+        datecompleted = None if rng.random() < 0.1 else start + timedelta(days=rng.randrange(60))
+        q = Question("q" + str(i), rng.choice(["phon", "morph"]), rng.choice(["easy", "hard"]), "s", datecompleted)
+        bank.setdefault(q.topic, {}).setdefault(q.difficulty, []).append(q)
+    index = DatedQuestionIndex(bank)
+    for cutoff in [start - timedelta(days=1)] + [start + timedelta(days=d) for d in range(0, 62, 3)]:
+        expected = {}
+        for topic in bank.keys():
+            for difficulty in bank[topic].keys():
+                eligible = [q for q in bank[topic][difficulty]
+                            if q.datecompleted is not None and q.datecompleted <= cutoff]
+                if len(eligible) > 0:
+                    expected.setdefault(topic, {})[difficulty] = eligible
+        pool = index.getpool(cutoff)
+        assert pool.keys() == expected.keys()
+        for topic in expected.keys():
+            assert pool[topic].keys() == expected[topic].keys()
+            for difficulty in expected[topic].keys():
+                # the same questions, in date order (and bank order within a date)
+                assert pool[topic][difficulty] == sorted(expected[topic][difficulty], key=lambda q: q.datecompleted)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+from datetime import date
+from Exam import Question
+import examselect
+import examstats
+from examdb import ExamStore
+
+
+def test_question_usage_and_exposure(tmp_path):
+    qs = [Question("q" + str(i), "phon", "easy", "src" + str(i), date(2026, 1, 1)) for i in range(4)]
+    store = ExamStore(str(tmp_path / "exams.db"))
+    store.addexam("s1", "midterm", [qs[0], qs[1]], date(2026, 3, 2))
+    store.addexam("s2", "midterm", [qs[0], qs[2]], date(2026, 3, 4))
+    store.addexam("s1", "final", [qs[0]], date(2026, 4, 20))
+    # q3 isn't used at all, and q9 isn't in the bank any more
+    store.addexam("s3", "midterm", [Question("q9", "phon", "easy", "src9")], date(2026, 3, 3))
+
+    stats = examstats.getstats(store, {"phon": {"easy": qs}})
+    usage = stats["questions"].set_index("uniqueid")
+    assert usage.loc["q0", ["uses", "students", "repeats"]].tolist() == [3, 2, 1]
+    assert usage.loc["q0", "firstexam"].date() == date(2026, 3, 2)
+    assert usage.loc["q0", "lastexam"].date() == date(2026, 4, 20)
+    # 5 uses over the bank's 4 questions
+    assert usage.loc["q0", "exposure"] == 2.4
+    assert usage.loc["q3", "uses"] == 0
+    assert not usage.loc["q9", "inbank"]
+    assert stats["questions"]["uniqueid"].tolist()[0] == "q0"
+    cell = stats["cells"].iloc[0]
+    assert (cell["questions"], cell["usedquestions"], cell["uses"]) == (4, 3, 5)
+    store.close()
+
+
+def test_group_overlaps_come_from_the_exams(tmp_path):
+    qs = [Question("q" + str(i), "phon", "easy", "src" + str(i), date(2026, 1, 1)) for i in range(5)]
+    store = ExamStore(str(tmp_path / "exams.db"))
+    # s1 and s2 share two midterm questions, chosen before tiers were recorded; s3 shares one with s1 on purpose
+    #   (chosen at the group overlap tier), but isn't in a group with s1 any more; the finals don't count
+    store.addexam("s1", "midterm", [qs[0], qs[1], qs[2]])
+    store.addexam("s2", "midterm", [qs[1], qs[0], qs[3]])
+    store.addexam("s3", "midterm", [qs[2], qs[4]], tiers=[examselect.TIER_GROUPOVERLAP, examselect.TIER_STRICT])
+    store.addexam("s2", "final", [qs[2]])
+    bank = {"phon": {"easy": qs}}
+
+    stats = examstats.getstats(store, bank, [["s2", "s1"], ["s3", "s4", ""]])
+    overlaps = stats["groupoverlaps"]
+    assert overlaps[["sid", "othersid", "examtype", "sharedquestions", "uniqueids"]].values.tolist() == \
+        [["s1", "s2", "midterm", 2, "q0 q1"]]
+    assert stats["summary"]["groupoverlaps"] == 2
+
+    stats = examstats.getstats(store, bank, [])
+    assert len(stats["groupoverlaps"]) == 0
+    assert stats["summary"]["groupoverlaps"] == 0
+
+    stats = examstats.getstats(store, bank)
+    assert stats["groupoverlaps"] is None
+    assert stats["summary"]["groupoverlaps"] is None
+    examstats.writestats(stats, str(tmp_path / "stats"))
+    assert not (tmp_path / "stats" / examstats.STATSFILES["groupoverlaps"]).exists()
+    store.close()
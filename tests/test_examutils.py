@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import os
+import sys
+import random
+import shutil
+import subprocess
+from datetime import date
+import pytest
+import examio
+import examselect
+import examutils
+
+SRCDIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+SAMPLEBANK = os.path.join(os.path.dirname(__file__), "..", "data", "samplequestionbank.tsv")
+
+
+def test_startup_leaves_slow_modules_unimported():
+    # import examutils in a fresh interpreter, so that modules imported by other tests don't count
+    check = ("import sys; import examutils; "
+             "print(' '.join(m for m in ['pandas', 'dateutil', 'examcompile', 'examarchive', 'examexport'] "
+             "if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", check], cwd=SRCDIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+def test_startup_is_within_budget(tmp_path):
+    # examutils reads existing exams from ../exams, relative to where it's run
+    (tmp_path / "exams").mkdir()
+    rundir = tmp_path / "src"
+    rundir.mkdir()
+    result = subprocess.run([sys.executable, os.path.join(SRCDIR, "examutils.py"), "--startuptime"], cwd=str(rundir),
+                            env=dict(os.environ, PYTHONPATH=SRCDIR), capture_output=True, text=True)
+    assert "ready for the menu in" in result.stdout
+    assert result.returncode == 0, result.stdout
+
+
+# Sets up a copy of the sample question bank and an empty exams folder, working from a folder next to it
+#   (as examutils expects to be run from src); returns the path to the bank and the bank itself
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    os.makedirs(str(tmp_path / "exams"))
+    os.makedirs(str(tmp_path / "src"))
+    bankpath = str(tmp_path / "bank.tsv")
+    shutil.copy(SAMPLEBANK, bankpath)
+    monkeypatch.chdir(str(tmp_path / "src"))
+    return bankpath, examio.readquestionsfromfile(bankpath)
+
+
+# Returns the existing exams as stored in the database: studentID --> examtype --> [list of uniqueids]
+def readstoredids():
+    exams = examio.readexistingexamsfromfile(examio.EXISTINGEXAMSFILE, "../exams")
+    return {sid: {extype: [q.uniqueid for q in qs] for extype, qs in exams[sid].items()} for sid in exams.keys()}
+
+
+# Writes a batch file with the given rows (each a list of BATCHCOLUMNS values); returns its path
+def writebatch(tmp_path, rows):
+    batchpath = str(tmp_path / "batch.tsv")
+    with open(batchpath, "w", encoding="utf-8") as f:
+        for row in [examutils.BATCHCOLUMNS] + rows:
+            f.write("\t".join(row) + "\n")
+    return batchpath
+
+
+def setupexams(allqs):
+    easy1 = allqs["Topic1"]["easy"]
+    easy2 = allqs["Topic2"]["easy"]
+    exams = {"s1": {"midterm": [easy1[0], easy2[0]], "final": [easy1[2]]},
+             "s2": {"midterm": [easy1[1], easy2[1]]}}
+    examio.recordexistingexamstofile(exams, examio.EXISTINGEXAMSFILE, "../exams")
+    return readstoredids()
+
+
+def test_batch_is_all_or_nothing(workspace, tmp_path, capsys):
+    bankpath, allqs = workspace
+    before = setupexams(allqs)
+    easy1 = [q.uniqueid for q in allqs["Topic1"]["easy"]]
+    good = ["replace", "midterm", "s1", easy1[0], easy1[3]]
+    remove = ["remove", "midterm", "s2", "", ""]
+
+    # the second row fails, so the first isn't written either
+    batchpath = writebatch(tmp_path, [good, ["remove", "midterm", "s9", "", ""], remove])
+    assert not examutils.runbatch(batchpath, bankpath)
+    assert "1 of 3 change(s) couldn't be made" in capsys.readouterr().out
+    assert readstoredids() == before
+
+    # and a dry run of good changes doesn't write them
+    batchpath = writebatch(tmp_path, [good, remove])
+    assert examutils.runbatch(batchpath, bankpath, dryrun=True)
+    assert readstoredids() == before
+
+    assert examutils.runbatch(batchpath, bankpath)
+    assert readstoredids() == {"s1": {"midterm": [easy1[3], before["s1"]["midterm"][1]], "final": [easy1[2]]}}
+
+
+def test_batch_replacement_must_fit_the_exam(workspace, tmp_path, capsys):
+    bankpath, allqs = workspace
+    before = setupexams(allqs)
+    easy1 = [q.uniqueid for q in allqs["Topic1"]["easy"]]
+    hard1 = allqs["Topic1"]["hard"][0].uniqueid
+
+    batchpath = writebatch(tmp_path, [["replace", "midterm", "s1", easy1[0], hard1]])
+    assert not examutils.runbatch(batchpath, bankpath)
+    assert "is Topic1 / hard, but " + easy1[0] + " is Topic1 / easy" in capsys.readouterr().out
+
+    # easy1[2] is already on s1's final
+    batchpath = writebatch(tmp_path, [["replace", "midterm", "s1", easy1[0], easy1[2]]])
+    assert not examutils.runbatch(batchpath, bankpath)
+    assert "already on student #s1's final exam" in capsys.readouterr().out
+    assert readstoredids() == before
+
+    # but it's fine for a different student
+    batchpath = writebatch(tmp_path, [["replace", "midterm", "s2", easy1[1], easy1[2]]])
+    assert examutils.runbatch(batchpath, bankpath)
+    assert readstoredids()["s2"]["midterm"][0] == easy1[2]
+
+
+def test_menu_replacement_only_warns(workspace, capsys):
+    bankpath, allqs = workspace
+    setupexams(allqs)
+    allexams = examio.readexistingexamsfromfile(examio.EXISTINGEXAMSFILE, "../exams")
+    easy1 = [q.uniqueid for q in allqs["Topic1"]["easy"]]
+    hard1 = allqs["Topic1"]["hard"][0].uniqueid
+
+    result = examutils.replacequestioninexam("midterm", "s1", easy1[0], hard1, bankpath, allexams)
+    assert result == examutils.DONE
+    assert "warning: Question " + hard1 + " is Topic1 / hard" in capsys.readouterr().out
+    assert readstoredids()["s1"]["midterm"][0] == hard1
+
+
+# Records the given exams (studentID --> examtype --> [list of Questions]), each dated examdate (None: no date)
+def recordexams(exams, examdate):
+    details = {(sid, extype): {"examdate": examdate, "tiers": [1] * len(qs)}
+               for sid in exams.keys() for extype, qs in exams[sid].items()}
+    examio.recordexistingexamstofile(exams, examio.EXISTINGEXAMSFILE, "../exams", details)
+
+
+# Writes a config file for midterms with the given signups (list of (date string, studentID)) and student groups;
+#   returns it as read by examio.readconfigfile
+def writeconfig(tmp_path, signups, groups=""):
+    signupspath = str(tmp_path / "signups.tsv")
+    with open(signupspath, "w", encoding="utf-8") as f:
+        f.write("Day\tTime\tSID\n")
+        for day, sid in signups:
+            f.write(day + "\t9:00\t" + sid + "\n")
+    configpath = str(tmp_path / "retire.cfg")
+    with open(configpath, "w", encoding="utf-8") as f:
+        f.write("questions: bank.tsv\nsignups: " + signupspath + "\nexam type: midterm\nstudent groups: " + groups +
+                "\n")
+    return examio.readconfigfile(configpath)
+
+
+# Returns the uniqueid of the question that replaced retiredid on sid's exam, as printed by retirequestion
+def getsubstitute(out, sid, retiredid):
+    line = next(line for line in out.splitlines() if "student #" + sid + "'s" in line and "-->" in line)
+    assert retiredid + " --> " in line
+    return line.split("--> ")[1].split(" ")[0]
+
+
+def test_retire_needs_exam_dates(workspace, tmp_path, capsys):
+    bankpath, allqs = workspace
+    easy1 = allqs["Topic1"]["easy"]
+    recordexams({"s1": {"midterm": [easy1[0], easy1[1]]}}, None)
+    retiredid = easy1[0].uniqueid
+
+    assert examutils.retirequestion(retiredid, bankpath, date(2026, 1, 1)) is None
+    assert "#s1 midterm" in capsys.readouterr().out
+    assert readstoredids()["s1"]["midterm"][0] == retiredid
+
+    # scheduled before the given date in the config's signups, so already written
+    config = writeconfig(tmp_path, [("2025-12-15", "s1")])
+    assert examutils.retirequestion(retiredid, bankpath, date(2026, 1, 1), config=config) == 0
+    assert "dated before 2026-01-01 (already written)" in capsys.readouterr().out
+
+    config = writeconfig(tmp_path, [("2026-02-02", "s1")])
+    assert examutils.retirequestion(retiredid, bankpath, date(2026, 1, 1), dryrun=True, config=config) == 1
+    assert "(2026-02-02)" in capsys.readouterr().out
+    assert examutils.retirequestion(retiredid, bankpath, date(2026, 1, 1), assumeunwritten=True) == 1
+    assert readstoredids()["s1"]["midterm"][0] != retiredid
+
+
+def test_retire_avoids_group_members_questions(workspace, tmp_path, capsys):
+    bankpath, allqs = workspace
+    easy1 = allqs["Topic1"]["easy"]
+    # s2 has every other easy Topic1 question but the last, and s3 (not in the group) has that one, so it isn't
+    #   any less used than the others
+    recordexams({"s1": {"midterm": [easy1[0]]}, "s2": {"midterm": easy1[1:-1]}, "s3": {"midterm": [easy1[-1]]}},
+                date(2026, 2, 2))
+    retiredid = easy1[0].uniqueid
+    config = writeconfig(tmp_path, [], "s1,s2")
+    substitutes = set()
+    for seed in range(10):
+        examutils.retirequestion(retiredid, bankpath, date(2026, 1, 1), dryrun=True, rng=random.Random(seed),
+                                 config=config)
+        out = capsys.readouterr().out
+        assert getsubstitute(out, "s1", retiredid) == easy1[-1].uniqueid
+        assert "(" + examselect.TIERNAMES[examselect.TIER_STRICT] + ")" in out
+
+        examutils.retirequestion(retiredid, bankpath, date(2026, 1, 1), dryrun=True, rng=random.Random(seed))
+        substitutes.add(getsubstitute(capsys.readouterr().out, "s1", retiredid))
+    # without the groups, any of them will do
+    assert len(substitutes) > 1
+
+    # the menu's copy of the exams is kept up to date, with Questions from the bank
+    menuexams = examio.readexistingexamsfromfile(examio.EXISTINGEXAMSFILE, "../exams")
+    assert examutils.retirequestion(retiredid, bankpath, date(2026, 1, 1), allexams=menuexams, config=config) == 1
+    newq = menuexams["s1"]["midterm"][0]
+    assert newq.uniqueid == easy1[-1].uniqueid
+    assert newq.instructions == easy1[-1].instructions
+    assert readstoredids()["s1"]["midterm"] == [easy1[-1].uniqueid]
+
+
+def test_repeated_question_is_replaced_one_copy_at_a_time(workspace, capsys):
+    bankpath, allqs = workspace
+    easy1 = allqs["Topic1"]["easy"]
+    recordexams({"s1": {"midterm": [easy1[0], easy1[1], easy1[0]]}}, date(2026, 2, 2))
+    allexams = examio.readexistingexamsfromfile(examio.EXISTINGEXAMSFILE, "../exams")
+
+    assert examutils.replacequestioninexam("midterm", "s1", easy1[0].uniqueid, easy1[2].uniqueid, bankpath,
+                                           allexams) == examutils.DONE
+    expected = [easy1[2].uniqueid, easy1[1].uniqueid, easy1[0].uniqueid]
+    assert [q.uniqueid for q in allexams["s1"]["midterm"]] == expected
+    assert readstoredids()["s1"]["midterm"] == expected
+
+    # retiring it replaces each copy in its own slot
+    recordexams({"s1": {"midterm": [easy1[0], easy1[1], easy1[0]]}}, date(2026, 2, 2))
+    assert examutils.retirequestion(easy1[0].uniqueid, bankpath, date(2026, 1, 1), rng=random.Random(0)) == 2
+    stored = readstoredids()["s1"]["midterm"]
+    assert easy1[0].uniqueid not in stored
+    assert stored[1] == easy1[1].uniqueid
+    assert len(set(stored)) == 3
+
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import io
+import os
+from datetime import date
+from Exam import Question
+import generateexams
+from generateexams import ExamSession
+
+
+def makesession(existingexams, numquestions=6, examtype="final", randomseed=None):
+    # q0 and q1 share a source, so seeing one rules out the other
+    qs = [Question("q" + str(i), "phon", "easy", "src" + str(max(i, 1)), date(2026, 1, 1))
+          for i in range(numquestions)]
+    session = ExamSession(course="LIN", examtype=examtype, allquestions={"phon": {"easy": qs}},
+                          existingexams=existingexams, startdate=date(2026, 4, 1), topics=["phon"], diffs=["easy"],
+                          randomseed=randomseed)
+    return session, qs
+
+
+def test_seen_sets_are_built_from_existing_exams():
+    qs = [Question("q" + str(i), "phon", "easy", "src" + str(i)) for i in range(3)]
+    session, _ = makesession({"s1": {"midterm": [qs[0], qs[1]]}, "s2": {"quiz": [qs[2]]}})
+    assert session.seenids == {"s1": {"q0", "q1"}, "s2": {"q2"}}
+    assert session.seensources == {"s1": {"src0", "src1"}, "s2": {"src2"}}
+    assert session.getexistingexamtypes() == ["midterm", "quiz"]
+
+
+def test_seen_sets_follow_new_exams():
+    session, qs = makesession({"s1": {"midterm": [Question("q1", "phon", "easy", "src1")]}})
+    picked = session.collectquestionsforoneexam("s1", date(2026, 4, 2))
+    assert [q.uniqueid for q in picked] not in (["q0"], ["q1"])
+    # asking again for the same student and exam type gives back the same exam
+    assert session.collectquestionsforoneexam("s1", date(2026, 4, 2)) == picked
+
+    assert session.seenids["s1"] == {"q1", picked[0].uniqueid}
+    assert session.seensources["s1"] == {"src1", picked[0].source}
+    assert session.getexistingexamtypes() == ["final", "midterm"]
+
+    session.collectquestionsforoneexam("s2", date(2026, 4, 2))
+    assert set(session.seenids.keys()) == {"s1", "s2"}
+    # the running sets match what rebuilding them from scratch gives
+    runningids, runningsources = session.seenids, session.seensources
+    session.indexexistingexams()
+    assert session.seenids == runningids and session.seensources == runningsources
+
+
+def test_group_members_exams_are_avoided():
+    session, qs = makesession({"s2": {"final": [Question("q2", "phon", "easy", "src2")],
+                                      "midterm": [Question("q3", "phon", "easy", "src3")]}})
+    session.studentgroups = [["s1", "s2"], ["s1", "s3"]]
+    session.indexstudentgroups()
+    session.indexexistingexams()
+    assert session.getgroupmembers("s1") == ["s2", "s3"]
+    # only group members' exams of this session's type count
+    assert session.groupquestionids == {"s1": {"q2"}}
+
+    picked = session.collectquestionsforoneexam("s1", date(2026, 4, 2))
+    assert picked[0].uniqueid != "q2"
+    assert session.groupquestionids["s2"] == {picked[0].uniqueid}
+    assert session.groupquestionids["s3"] == {picked[0].uniqueid}
+    picked = session.collectquestionsforoneexam("s3", date(2026, 4, 2))
+    assert picked[0].uniqueid not in session.seenids["s1"]
+
+
+# Returns an exam session with signups on several days, where anyone scheduled on two days or grouped across days
+#   has to be handled before the days are spread across processes
+def makesignupsession(qs, topics, diffs, randomseed=None):
+    signups = {date(2026, 4, 6): [("10:00", "s1"), ("9:00", "s2"), ("11:00", "")],
+               date(2026, 4, 7): [("9:00", "s3"), ("9:30", "s1")],
+               date(2026, 4, 8): [("9:00", "s4"), ("9:30", "s5")]}
+    bank = {}
+    for q in qs:
+        bank.setdefault(q.topic, {}).setdefault(q.difficulty, []).append(q)
+    return ExamSession(course="LIN", examtype="oral", hassignupslots=True, allquestions=bank, signups=signups,
+                       studentgroups=[["s2", "s4"]], existingexams={}, startdate=date(2026, 4, 1),
+                       topics=topics, diffs=diffs, randomseed=randomseed)
+
+
+# Returns dictionary of filename --> contents for everything generated in folder
+def readoutputs(folder):
+    outputs = {}
+    for name in sorted(os.listdir(folder)):
+        with open(os.path.join(folder, name), "rb") as f:
+            outputs[name] = f.read()
+    return outputs
+
+
+def test_parallel_days_match_serial_days(tmp_path):
+    # one question per topic/difficulty, so every exam has to be the same whichever process chooses it
+    qs = [Question("q" + str(i), topic, "easy", "src" + str(i), date(2026, 1, 1), instructions="do " + str(i))
+          for i, topic in enumerate(["phon", "morph", "syn"])]
+    outputs = []
+    for workers in [1, 3]:
+        session = makesignupsession(qs, ["phon", "morph", "syn"], ["easy", "easy", "easy"])
+        folder = tmp_path / str(workers)
+        folder.mkdir()
+        session.generatelatexexams(str(folder), date(2026, 4, 30), workers=workers)
+        outputs.append((readoutputs(str(folder)), {sid: {t: [q.uniqueid for q in exqs] for t, exqs in exams.items()}
+                                                   for sid, exams in session.existingexams.items()},
+                        list(session.examdetails.keys())))
+    assert outputs[0][0] == outputs[1][0]
+    assert outputs[0][1] == outputs[1][1]
+    assert sorted(outputs[0][2]) == sorted(outputs[1][2])
+
+
+def test_parallel_days_keep_cross_day_students_apart(tmp_path):
+    qs = [Question("q" + str(i), "phon", "easy", "src" + str(i), date(2026, 1, 1)) for i in range(40)]
+    session = makesignupsession(qs, ["phon", "phon"], ["easy", "easy"])
+    session.generatelatexexams(str(tmp_path), date(2026, 4, 30), workers=3)
+
+    ids = {sid: [q.uniqueid for q in exams["oral"]] for sid, exams in session.existingexams.items()}
+    assert sorted(ids.keys()) == ["s1", "s2", "s3", "s4", "s5"]
+    # s1 is scheduled on two days but only gets one exam; s2 and s4 are grouped across days
+    assert ids["s1"] == [q.uniqueid for q in session.collectquestionsforoneexam("s1", date(2026, 4, 7))]
+    assert set(ids["s2"]).isdisjoint(ids["s4"])
+    assert session.seenids["s4"] == set(ids["s4"])
+    assert session.groupquestionids["s2"] == set(ids["s4"])
+    assert len(readoutputs(str(tmp_path))) == 9
+
+
+# Returns a bank with several topics and difficulties, plenty of questions in each, and some shared sources
+def makerichbank():
+    return [Question("q" + str(i), topic, diff, "src" + str(i // 2), date(2026, 1, 1), instructions="do " + str(i))
+            for i, (topic, diff) in enumerate((t, d) for t in ["phon", "morph", "syn"] for d in ["easy", "hard"]
+                                              for n in range(12))]
+
+
+def test_seeded_exams_do_not_depend_on_order():
+    students = ["s" + str(i) for i in range(8)]
+    exams = []
+    for order in [students, students[::-1]]:
+        session, _ = makesession({}, numquestions=30, randomseed="wugz")
+        session.topics, session.difficulties = ["phon", "phon", "phon"], ["easy", "easy", "easy"]
+        exams.append({sid: [q.uniqueid for q in session.collectquestionsforoneexam(sid, date(2026, 4, 2))]
+                      for sid in order})
+        assert all(session.verifyexam(sid, date(2026, 4, 2)) for sid in students)
+    assert exams[0] == exams[1]
+
+    session, _ = makesession({}, numquestions=30, randomseed="another seed")
+    session.topics, session.difficulties = ["phon", "phon", "phon"], ["easy", "easy", "easy"]
+    assert {sid: [q.uniqueid for q in session.collectquestionsforoneexam(sid, date(2026, 4, 2))]
+            for sid in students} != exams[0]
+
+
+def test_seeded_parallel_days_match_serial_days(tmp_path):
+    outputs = []
+    for workers in [1, 3, 1]:
+        session = makesignupsession(makerichbank(), ["phon", "morph", "syn", "WILD"], ["easy", "hard", "easy", "hard"],
+                                    randomseed="wugz")
+        session.wildcardtopics = ["phon", "syn"]
+        folder = tmp_path / str(len(outputs))
+        folder.mkdir()
+        session.generatelatexexams(str(folder), date(2026, 4, 30), workers=workers)
+        outputs.append(readoutputs(str(folder)))
+    assert outputs[0] == outputs[1] == outputs[2]
+
+
+def test_rendered_fragments_match_rendering_every_time(monkeypatch):
+    qs = makerichbank()[:4]
+    fragments = generateexams.QuestionFragments()
+    written = []
+    for usefragments in [False, True, True]:
+        texf, instrf, tsvf = io.StringIO(), io.StringIO(), io.StringIO()
+        for i, q in enumerate(qs):
+            generateexams.writeexamquestiontex(i + 1, q, texf, rubric="rubric",
+                                               fragments=fragments if usefragments else None)
+            generateexams.writeexamquestiontex(i + 1, q, instrf, instrcopy=True,
+                                               fragments=fragments if usefragments else None)
+            generateexams.writeexamquestiontsv("s1", q, tsvf, fragments=fragments if usefragments else None)
+        generateexams.writequestionbank(texf, "phon", "easy", qs, fragments if usefragments else None)
+        written.append((texf.getvalue(), instrf.getvalue(), tsvf.getvalue()))
+    assert written[0] == written[1] == written[2]
+
+    # once rendered, a question's markup isn't made again
+    rendered = []
+    monkeypatch.setattr(generateexams, "makequestiontex", lambda *args, **kwargs: rendered.append(args) or "")
+    generateexams.writeexamquestiontex(1, qs[0], io.StringIO(), fragments=fragments)
+    generateexams.writeexamquestiontsv("s2", qs[0], io.StringIO(), fragments=fragments)
+    assert rendered == []
+
+
+def test_documents_are_written_in_a_few_large_writes(tmp_path):
+    stats = {}
+    path = str(tmp_path / "doc.tex")
+    pieces = ["line " + str(i) + " é\n" for i in range(generateexams.FLUSHPARTS * 3 + 5)]
+    with generateexams.DocumentBuilder(path, stats) as doc:
+        for piece in pieces:
+            doc.write(piece)
+            doc.flushifbig()
+    with open(str(tmp_path / "plain.tex"), "w", encoding="utf-8") as plain:
+        plain.write("".join(pieces))
+    with open(path, "rb") as f, open(str(tmp_path / "plain.tex"), "rb") as g:
+        assert f.read() == g.read()
+    assert stats[path] == {"bytes": os.path.getsize(path), "writes": 4}
+
+
+def test_output_stats_cover_every_file_written(tmp_path):
+    session = makesignupsession(makerichbank(), ["phon", "morph"], ["easy", "hard"], randomseed="wugz")
+    session.generatelatexexams(str(tmp_path), date(2026, 4, 30))
+    outputs = readoutputs(str(tmp_path))
+    assert sorted(os.path.basename(path) for path in session.outputstats.keys()) == sorted(outputs.keys())
+    for path, stats in session.outputstats.items():
+        assert stats["bytes"] == len(outputs[os.path.basename(path)])
+        assert stats["writes"] <= 2
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import pickle
+from datetime import date
+import Exam
+from Exam import Question
+
+
+# stands in for Question as it was before __slots__: a plain class whose pickled state is its __dict__
+class OldQuestion:
+    pass
+
+
+# Returns old-style pickles (one per protocol) of a Question with the given attributes
+def pickleoldquestion(monkeypatch, attributes):
+    OldQuestion.__module__ = "Exam"
+    OldQuestion.__qualname__ = OldQuestion.__name__ = "Question"
+    old = OldQuestion()
+    old.__dict__.update(attributes)
+    with monkeypatch.context() as m:
+        m.setattr(Exam, "Question", OldQuestion)
+        return [pickle.dumps([old, old], protocol) for protocol in range(pickle.HIGHEST_PROTOCOL + 1)]
+
+
+def test_old_pickles_still_load(monkeypatch):
+    # an old Question with its mutable list of question types, and without the newest attributes
+    attributes = {"uniqueid": "q1", "topic": "phon", "difficulty": "easy", "source": "Quiz 1",
+                  "datecompleted": date(2021, 1, 8), "questiontypes": ["UR", "SR"], "instructions": "Do this.",
+                  "image1": "a.png"}
+    for data in pickleoldquestion(monkeypatch, attributes):
+        first, second = pickle.loads(data)
+        assert type(first) is Question
+        assert first is second
+        assert (first.uniqueid, first.topic, first.source, first.datecompleted, first.instructions, first.image1) == \
+            ("q1", "phon", "Quiz 1", date(2021, 1, 8), "Do this.", "a.png")
+        assert first.questiontypes == frozenset(["UR", "SR"])
+        # missing attributes get the same defaults as a new Question
+        assert (first.notes, first.omit, first.imagearrangement) == ("", False, Question().imagearrangement)
+        # and the categorical fields are shared with new Questions
+        assert first.topic is Question("q2", "".join(["ph", "on"])).topic
+        assert first.questiontypes is Question("q3", questiontypes=["SR", "UR"]).questiontypes
+
+
+def test_slotted_questions_round_trip():
+    q = Question("q1", "phon", "easy", "Quiz 1", date(2021, 1, 8), ["UR"], "Do this.")
+    copy = pickle.loads(pickle.dumps(q))
+    assert not hasattr(copy, "__dict__")
+    assert copy == q and hash(copy) == hash(q)
+    assert [getattr(copy, attr) for attr in Question.__slots__] == [getattr(q, attr) for attr in Question.__slots__]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+written Oct 2026
+"""
+
+import random
+from datetime import date
+import pytest
+from Exam import Question
+import generateexams
+from generateexams import ExamSession, solvetopicdiffcombo, getcombocounts, WILD
+
+
+# Checks that combo uses the needed difficulties, and no combination more often than it has questions
+def checkcombo(combo, diffsneeded, availability):
+    assert combo is not None
+    topicslist, diffslist = combo
+    assert sorted(diffslist) == sorted(diffsneeded)
+    for (t, d), count in getcombocounts(topicslist, diffslist).items():
+        assert count <= availability.get((t, d), 0)
+
+
+def test_needs_backtracking():
+    # phon only has hard questions and morph only has one easy one, so most random first choices are dead ends
+    availability = {("phon", "hard"): 2, ("morph", "easy"): 1, ("morph", "hard"): 5, ("syn", "easy"): 3}
+    topics = ["phon", "phon", "morph", "syn"]
+    diffs = ["easy", "hard", "hard", "easy"]
+    for seed in range(100):
+        combo = solvetopicdiffcombo(topics, diffs, [], availability, [], random.Random(seed))
+        checkcombo(combo, diffs, availability)
+        assert sorted(zip(*combo)) == [("morph", "easy"), ("phon", "hard"), ("phon", "hard"), ("syn", "easy")]
+
+
+def test_wildcards_and_pairs():
+    availability = {("phon", "easy"): 1, ("morph", "easy"): 1, ("syn", "hard"): 1, ("sem", "hard"): 2}
+    topics = ["syn", WILD, WILD]
+    diffs = ["hard", "easy", "easy"]
+    pairs = [("sem", "hard")]
+    for seed in range(100):
+        combo = solvetopicdiffcombo(topics, diffs, ["phon", "morph", "sem"], availability, pairs, random.Random(seed))
+        checkcombo(combo, diffs + ["hard"], availability)
+        topicslist, diffslist = combo
+        # the specific pair comes last, and the two wildcards are different topics with easy questions
+        assert (topicslist[-1], diffslist[-1]) == ("sem", "hard")
+        assert sorted(topicslist[:-1]) == ["morph", "phon", "syn"]
+
+
+def test_no_combination():
+    availability = {("phon", "easy"): 1, ("phon", "hard"): 3}
+    assert solvetopicdiffcombo(["phon", "phon"], ["easy", "easy"], [], availability) is None
+    # wildcards without a difficulty must all be different topics
+    assert solvetopicdiffcombo([WILD, WILD], ["hard", "hard"], ["phon"], availability) is None
+
+
+# Returns an ExamSession whose exams need two easy phonology questions, with only one in the bank
+def makeshortsession():
+    bank = {"phon": {"easy": [Question("q0", "phon", "easy", "s0", date(2026, 1, 1))],
+                     "hard": [Question("q1", "phon", "hard", "s1", date(2026, 1, 1))]}}
+    return ExamSession("LING 200", "midterm", True, bank, {}, [], {}, date(2026, 3, 2),
+                       topics=["phon", "phon"], diffs=["easy", "easy"], randomseed="test")
+
+
+def test_repeated_combination_is_refused_by_default(capsys):
+    session = makeshortsession()
+    with pytest.raises(SystemExit):
+        session.choosequestionsforoneexam(date(2026, 3, 2), set(), set(), set(), random.Random(1), "s1")
+    out = capsys.readouterr().out
+    assert "There is no way to combine" in out
+    assert "repeat combinations: yes" in out
+
+
+def test_repeated_combination_is_named_when_allowed(capsys):
+    session = makeshortsession()
+    session.allowrepeatedcombos = True
+    questions, tiers = session.choosequestionsforoneexam(date(2026, 3, 2), set(), set(), set(), random.Random(1),
+                                                         "s1")
+    assert [q.uniqueid for q in questions] == ["q0", "q0"]
+    assert tiers[1] == generateexams.examselect.TIER_ANYTHING
+    out = capsys.readouterr().out
+    assert "Warning: the exam for s1 dated 2026-03-02 has 2 questions of phon / easy" in out